@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""
+Compares the results of two runs of the benchmarks (json files written
+by hot_paths.py or hot_paths.cpp): for each benchmark run by both,
+prints the best times and their ratio (current / reference), flagging
+the benchmarks slower (or faster) by more than the threshold.
+Exits with status 1 if any benchmark is slower.
+"""
+
+import sys
+import json
+import argparse
+import typing
+
+
+def _load(path: str) -> typing.Dict[str, float]:
+    """
+    Returns the best time of each benchmark of the json file.
+    """
+    with open(path) as f:
+        results = json.load(f)["results"]
+    return {result["name"]: result["best_s"] for result in results}
+
+
+def run() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("reference", type=str, help="json file of the reference run")
+    parser.add_argument("current", type=str, help="json file of the current run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="relative change considered significant (default: 0.1, i.e. 10%%)",
+    )
+    args = parser.parse_args()
+
+    reference = _load(args.reference)
+    current = _load(args.current)
+
+    slower = []
+    for name, reference_time in reference.items():
+        if name not in current:
+            print("{:40} (not in {})".format(name, args.current))
+            continue
+        ratio = current[name] / reference_time
+        flag = ""
+        if ratio > 1.0 + args.threshold:
+            flag = "slower"
+            slower.append(name)
+        elif ratio < 1.0 - args.threshold:
+            flag = "faster"
+        print(
+            "{:40} {:12.6f} ms -> {:12.6f} ms  x{:6.2f} {}".format(
+                name, reference_time * 1e3, current[name] * 1e3, ratio, flag
+            )
+        )
+    for name in current:
+        if name not in reference:
+            print("{:40} (not in {})".format(name, args.reference))
+
+    if slower:
+        print("\n{} benchmark(s) slower: {}".format(len(slower), ", ".join(slower)))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,216 @@
+/**
+ * Benchmark of the native per step updates of the control loop
+ * (Ball::update, LowPassFilter::get, Rotation::rotate and BallStatus::update)
+ * and of their batch versions, over a synthetic ball trajectory.
+ *
+ * usage: context_hot_paths [repeat] [path of the json result file]
+ *
+ * The json file has the same format as the one written by hot_paths.py,
+ * see compare.py for the comparison of the results of two runs.
+ */
+
+#include <algorithm>
+#include <chrono>
+#include <cmath>
+#include <cstdlib>
+#include <fstream>
+#include <functional>
+#include <iostream>
+#include <string>
+#include <vector>
+
+#include "context/ball.hpp"
+#include "context/ball_status.hpp"
+#include "context/low_pass_filter.hpp"
+#include "context/rotation.hpp"
+
+using namespace context;
+
+namespace
+{
+struct Result
+{
+    std::string name;
+    double best_s;
+    double mean_s;
+    int number;
+    int repeat;
+};
+
+// best and mean time per call of function (over repeat runs of number calls)
+Result time(const std::string& name,
+            const std::function<void()>& function,
+            int number,
+            int repeat)
+{
+    std::vector<double> times;
+    for (int r = 0; r < repeat; r++)
+    {
+        auto start = std::chrono::steady_clock::now();
+        for (int n = 0; n < number; n++)
+        {
+            function();
+        }
+        std::chrono::duration<double> duration =
+            std::chrono::steady_clock::now() - start;
+        times.push_back(duration.count() / number);
+    }
+    double sum = 0;
+    for (double t : times)
+    {
+        sum += t;
+    }
+    return {name,
+            *std::min_element(times.begin(), times.end()),
+            sum / times.size(),
+            number,
+            repeat};
+}
+
+// ball flight sampled at 200Hz
+void trajectory(std::size_t nb_points,
+                std::vector<long>& stamps,
+                std::vector<double>& positions)
+{
+    stamps.resize(nb_points);
+    positions.resize(3 * nb_points);
+    for (std::size_t i = 0; i < nb_points; i++)
+    {
+        double t = i * 0.005;
+        stamps[i] = static_cast<long>(i * 5000);
+        positions[3 * i] = 0.5 + 0.2 * t;
+        positions[3 * i + 1] = 3.5 - 4.0 * t;
+        positions[3 * i + 2] = 1.0 + 1.0 * t - 0.5 * 9.81 * t * t;
+    }
+}
+
+void write_json(const std::string& path,
+                const std::vector<Result>& results,
+                std::size_t nb_points)
+{
+    std::ofstream f(path);
+    f.precision(12);
+    f << "{\n  \"suite\": \"cpp\",\n  \"nb_points\": " << nb_points
+      << ",\n  \"results\": [\n";
+    for (std::size_t i = 0; i < results.size(); i++)
+    {
+        const Result& r = results[i];
+        f << "    {\"name\": \"" << r.name << "\", \"best_s\": " << r.best_s
+          << ", \"mean_s\": " << r.mean_s << ", \"number\": " << r.number
+          << ", \"repeat\": " << r.repeat << "}"
+          << (i + 1 < results.size() ? ",\n" : "\n");
+    }
+    f << "  ]\n}\n";
+}
+
+}  // namespace
+
+int main(int argc, char** argv)
+{
+    int repeat = argc > 1 ? std::atoi(argv[1]) : 5;
+    const std::size_t nb_points = 300;
+    const int number = 1000;
+
+    std::vector<long> stamps;
+    std::vector<double> positions;
+    trajectory(nb_points, stamps, positions);
+    std::vector<double> states(6 * nb_points);
+    std::vector<double> output(3 * nb_points);
+    // read at the end, so that the compiler does not
+    // optimize the benchmarked calls away
+    double sink = 0;
+
+    std::vector<Result> results;
+
+    Ball ball(10);
+    results.push_back(time(
+        "Ball::update (trajectory)",
+        [&]() {
+            for (std::size_t i = 0; i < nb_points; i++)
+            {
+                const double* p = &positions[3 * i];
+                sink += ball.update(stamps[i], {p[0], p[1], p[2]}).velocity[0];
+            }
+        },
+        number,
+        repeat));
+    results.push_back(time(
+        "Ball::update_batch (trajectory)",
+        [&]() {
+            ball.update_batch(
+                nb_points, stamps.data(), positions.data(), states.data());
+            sink += states[3];
+        },
+        number,
+        repeat));
+
+    LowPassFilter low_pass_filter(10);
+    results.push_back(time(
+        "LowPassFilter::get (trajectory)",
+        [&]() {
+            for (std::size_t i = 0; i < nb_points; i++)
+            {
+                sink += low_pass_filter.get(positions[3 * i + 2]);
+            }
+        },
+        number,
+        repeat));
+    results.push_back(time(
+        "LowPassFilter::filter (trajectory)",
+        [&]() {
+            low_pass_filter.filter(nb_points, positions.data(), output.data());
+            sink += output[0];
+        },
+        number,
+        repeat));
+
+    Rotation rotation(0.1, 0.2, 0.3);
+    results.push_back(time(
+        "Rotation::rotate (trajectory)",
+        [&]() {
+            for (std::size_t i = 0; i < nb_points; i++)
+            {
+                const double* p = &positions[3 * i];
+                Coordinates c{p[0], p[1], p[2]};
+                rotation.rotate(c);
+                sink += c[0];
+            }
+        },
+        number,
+        repeat));
+    results.push_back(time(
+        "Rotation::rotate batch (trajectory)",
+        [&]() {
+            rotation.rotate(nb_points, positions.data(), output.data());
+            sink += output[0];
+        },
+        number,
+        repeat));
+
+    BallStatus ball_status({0.5, 2.0, 0.8});
+    ContactInformation contact;
+    results.push_back(time(
+        "BallStatus::update (episode)",
+        [&]() {
+            ball_status.reset();
+            for (std::size_t i = 0; i < nb_points; i++)
+            {
+                const double* p = &positions[3 * i];
+                ball_status.update({p[0], p[1], p[2]}, {0, 0, 0}, contact);
+            }
+            sink += ball_status.min_z;
+        },
+        number,
+        repeat));
+
+    for (const Result& r : results)
+    {
+        std::cout << r.name << ": best " << r.best_s * 1e3 << " ms, mean "
+                  << r.mean_s * 1e3 << " ms\n";
+    }
+    if (argc > 2)
+    {
+        write_json(argv[2], results, nb_points);
+    }
+    return std::isnan(sink) ? 1 : 0;
+}
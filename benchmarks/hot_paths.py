@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the hot paths of the package.
+
+Synthetic ball trajectories (see storage_options.synthetic_trajectories)
+are written to a temporary hdf5 file (one group per layout), and the
+script times:
+
+- the loading of a group (BallTrajectories)
+- the reading of trajectories (RecordedBallTrajectories.get_stamped_trajectory)
+- the playing of trajectories (BallTrajectories.iterate, iterate_chunks
+  and the line trajectories generators)
+- the adding of trajectories to a hdf5 file (the methods behind the
+  add-json and add-tennicam commands of pam_ball_trajectories)
+- the per step updates of the control loop (BallStatus, and the python
+  bindings of Ball, LowPassFilter and Rotation)
+
+The native C++ versions of the per step updates are benchmarked by
+hot_paths.cpp. For each benchmark, the best and mean time per call
+(over repeat runs) is printed and (optionally) saved as json. See
+compare.py for the comparison of the results of two runs.
+"""
+
+import sys
+import time
+import json
+import random
+import argparse
+import pathlib
+import platform
+import tempfile
+import contextlib
+import typing
+import numpy as np
+import context
+import context.ball_trajectories as bt
+from context import ball_status
+from storage_options import synthetic_trajectories
+
+_PACKED = "packed"
+_LEGACY = "legacy"
+
+# a benchmark setup: context manager yielding the function to time
+_Setup = typing.Callable[[], typing.ContextManager[typing.Callable[[], typing.Any]]]
+
+
+class _Benchmark(typing.NamedTuple):
+    name: str
+    setup: _Setup
+    # number of calls per run
+    number: int
+
+
+class _Data(typing.NamedTuple):
+    directory: pathlib.Path
+    # hdf5 file with the _PACKED and _LEGACY groups
+    path: pathlib.Path
+    trajectories: bt.StampedTrajectories
+    # optional folder of tennicam files (can not be generated)
+    tennicam_path: typing.Optional[pathlib.Path]
+
+
+class _ContactInformation(typing.NamedTuple):
+    # (the attributes of context.ContactInformation used by BallStatus)
+    contact_occured: bool
+    minimal_distance: float
+
+
+def _create_file(
+    directory: pathlib.Path, trajectories: bt.StampedTrajectories
+) -> pathlib.Path:
+    path = directory / "benchmark.hdf5"
+    with open(path, "wb"):
+        pass
+    with bt.MutableRecordedBallTrajectories(path) as rbt:
+        rbt.add_stamped_trajectories(_PACKED, trajectories, packed=True)
+        rbt.add_stamped_trajectories(_LEGACY, trajectories, packed=False)
+    return path
+
+
+def _write_json_files(
+    directory: pathlib.Path, trajectories: bt.StampedTrajectories
+) -> pathlib.Path:
+    """
+    Writes the trajectories in the format expected by add_json_trajectories
+    (velocities set to 0).
+    """
+    json_path = directory / "json"
+    json_path.mkdir()
+    for index, (_, positions) in enumerate(trajectories):
+        ob = np.zeros((len(positions), 6))
+        ob[:, :3] = positions
+        with open(json_path / "{}.json".format(index), "w") as f:
+            json.dump({"ob": ob.tolist()}, f)
+    return json_path
+
+
+@contextlib.contextmanager
+def _constant(function: typing.Callable[[], typing.Any]):
+    yield function
+
+
+@contextlib.contextmanager
+def _get_stamped_trajectory(data: _Data, group: str):
+    rng = random.Random(0)
+    with bt.RecordedBallTrajectories(data.path) as rbt:
+        indexes = rbt.get_indexes(group)
+        yield lambda: rbt.get_stamped_trajectory(
+            group, rng.choice(indexes), direct=True
+        )
+
+
+@contextlib.contextmanager
+def _played(data: _Data, play: typing.Callable[[bt.StampedTrajectory], typing.Any]):
+    trajectory = data.trajectories[0]
+    yield lambda: play(trajectory)
+
+
+def _iterate(trajectory: bt.StampedTrajectory) -> None:
+    for _ in bt.BallTrajectories.iterate(trajectory):
+        pass
+
+
+def _iterate_chunks(trajectory: bt.StampedTrajectory) -> None:
+    for _ in bt.BallTrajectories.iterate_chunks(trajectory):
+        pass
+
+
+@contextlib.contextmanager
+def _ingest(data: _Data, add: typing.Callable[..., int]):
+    """
+    Yields a function calling add (with a MutableRecordedBallTrajectories
+    instance and the name of a new group as arguments) on a new hdf5 file.
+    """
+    path = data.directory / "ingest.hdf5"
+    with open(path, "wb"):
+        pass
+    groups = iter(range(sys.maxsize))
+
+    def _add():
+        with bt.MutableRecordedBallTrajectories(path) as rbt:
+            add(rbt, str(next(groups)))
+
+    try:
+        yield _add
+    finally:
+        path.unlink()
+
+
+@contextlib.contextmanager
+def _add_json(data: _Data):
+    json_path = _write_json_files(data.directory, data.trajectories)
+    with _ingest(
+        data,
+        lambda rbt, group: rbt.add_json_trajectories(
+            group, json_path, 5000, packed=True
+        ),
+    ) as function:
+        yield function
+
+
+@contextlib.contextmanager
+def _ball_status(data: _Data):
+    positions = data.trajectories[0][1].astype(np.float64)
+    # velocities: anything of the right shape
+    velocities = np.diff(positions, axis=0, prepend=positions[:1]).tolist()
+    positions = positions.tolist()
+    contacts = [_ContactInformation(False, 1.0)] * (len(positions) // 2)
+    contacts += [_ContactInformation(True, 0.0)]
+    contacts += [_ContactInformation(False, 0.0)] * (len(positions) - len(contacts))
+    status = ball_status.BallStatus([0.5, 2.0, 0.8])
+
+    def _episode():
+        status.reset()
+        for position, velocity, contact in zip(positions, velocities, contacts):
+            status.update(position, velocity, contact)
+
+    yield _episode
+
+
+@contextlib.contextmanager
+def _ball_update(data: _Data):
+    stamps, positions = data.trajectories[0]
+    stamps, positions = stamps.tolist(), positions.astype(np.float64).tolist()
+    ball = context.Ball(10)
+
+    def _updates():
+        for stamp, position in zip(stamps, positions):
+            ball.update(stamp, position)
+
+    yield _updates
+
+
+@contextlib.contextmanager
+def _low_pass_filter_get(data: _Data):
+    values = data.trajectories[0][1][:, 2].astype(np.float64).tolist()
+    low_pass_filter = context.LowPassFilter(10)
+
+    def _gets():
+        for value in values:
+            low_pass_filter.get(value)
+
+    yield _gets
+
+
+@contextlib.contextmanager
+def _rotate(data: _Data):
+    positions = data.trajectories[0][1].astype(np.float64)
+    rotation = context.Rotation(0.1, 0.2, 0.3)
+    coordinates = positions.tolist()
+
+    def _rotations():
+        for c in coordinates:
+            rotation.rotate(c)
+
+    yield _rotations
+
+
+def _benchmarks(data: _Data) -> typing.List[_Benchmark]:
+    trajectories = data.trajectories
+    path = data.path
+    starts = [positions[0] for _, positions in trajectories[:100]]
+    ends = [positions[-1] for _, positions in trajectories[:100]]
+    benchmarks = [
+        _Benchmark(
+            "BallTrajectories(packed)",
+            lambda: _constant(lambda: bt.BallTrajectories(_PACKED, path)),
+            1,
+        ),
+        _Benchmark(
+            "BallTrajectories(legacy)",
+            lambda: _constant(lambda: bt.BallTrajectories(_LEGACY, path)),
+            1,
+        ),
+        _Benchmark(
+            "BallTrajectories(packed, lazy)",
+            lambda: _constant(
+                lambda: bt.BallTrajectories(_PACKED, path, lazy=True).close()
+            ),
+            10,
+        ),
+        _Benchmark(
+            "get_stamped_trajectory(packed)",
+            lambda: _get_stamped_trajectory(data, _PACKED),
+            100,
+        ),
+        _Benchmark(
+            "get_stamped_trajectory(legacy)",
+            lambda: _get_stamped_trajectory(data, _LEGACY),
+            100,
+        ),
+        _Benchmark("BallTrajectories.iterate", lambda: _played(data, _iterate), 10),
+        _Benchmark(
+            "BallTrajectories.iterate_chunks",
+            lambda: _played(data, _iterate_chunks),
+            100,
+        ),
+        _Benchmark(
+            "velocity_line_trajectory",
+            lambda: _constant(
+                lambda: bt.velocity_line_trajectory(starts[0], ends[0], 1.0)
+            ),
+            1000,
+        ),
+        _Benchmark(
+            "duration_line_trajectory",
+            lambda: _constant(
+                lambda: bt.duration_line_trajectory(starts[0], ends[0], 1500.0)
+            ),
+            1000,
+        ),
+        _Benchmark(
+            "velocity_line_trajectories(100)",
+            lambda: _constant(lambda: bt.velocity_line_trajectories(starts, ends, 1.0)),
+            100,
+        ),
+        _Benchmark(
+            "add_stamped_trajectories(packed)",
+            lambda: _ingest(
+                data,
+                lambda rbt, group: rbt.add_stamped_trajectories(
+                    group, trajectories, packed=True
+                ),
+            ),
+            1,
+        ),
+        _Benchmark(
+            "add_stamped_trajectories(legacy)",
+            lambda: _ingest(
+                data,
+                lambda rbt, group: rbt.add_stamped_trajectories(
+                    group, trajectories, packed=False
+                ),
+            ),
+            1,
+        ),
+        _Benchmark("add_json_trajectories", lambda: _add_json(data), 1),
+        _Benchmark("BallStatus.update (episode)", lambda: _ball_status(data), 10),
+    ]
+    if data.tennicam_path is not None:
+        tennicam_path = data.tennicam_path
+        benchmarks.append(
+            _Benchmark(
+                "add_tennicam_trajectories",
+                lambda: _ingest(
+                    data,
+                    lambda rbt, group: rbt.add_tennicam_trajectories(
+                        group, tennicam_path, packed=True
+                    ),
+                ),
+                1,
+            )
+        )
+    # python bindings (i.e. including the conversion overhead),
+    # see hot_paths.cpp for the native ones
+    if hasattr(context, "Ball"):
+        benchmarks += [
+            _Benchmark("Ball.update (trajectory)", lambda: _ball_update(data), 10),
+            _Benchmark(
+                "LowPassFilter.get (trajectory)",
+                lambda: _low_pass_filter_get(data),
+                10,
+            ),
+            _Benchmark("Rotation.rotate (trajectory)", lambda: _rotate(data), 10),
+        ]
+    return benchmarks
+
+
+def _time(
+    function: typing.Callable[[], typing.Any], number: int, repeat: int
+) -> typing.Dict[str, typing.Any]:
+    """
+    Returns the best and mean time per call over repeat runs
+    of number calls.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {
+        "best_s": min(times),
+        "mean_s": sum(times) / len(times),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--nb-trajectories", type=int, default=200, help="size of the groups"
+    )
+    parser.add_argument(
+        "--nb-points", type=int, default=300, help="average points per trajectory"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of runs per benchmark"
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        required=False,
+        help="run only the benchmarks whose name contains this string",
+    )
+    parser.add_argument(
+        "--tennicam-path",
+        type=str,
+        required=False,
+        help="folder of tennicam files (for benchmarking add_tennicam_trajectories)",
+    )
+    parser.add_argument(
+        "--output", type=str, required=False, help="path of the json result file"
+    )
+    args = parser.parse_args()
+
+    trajectories = synthetic_trajectories(args.nb_trajectories, args.nb_points)
+    tennicam_path = pathlib.Path(args.tennicam_path) if args.tennicam_path else None
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        data = _Data(
+            pathlib.Path(directory),
+            _create_file(pathlib.Path(directory), trajectories),
+            trajectories,
+            tennicam_path,
+        )
+        for benchmark in _benchmarks(data):
+            if args.filter and args.filter not in benchmark.name:
+                continue
+            with benchmark.setup() as function:
+                result = _time(function, benchmark.number, args.repeat)
+            result["name"] = benchmark.name
+            results.append(result)
+            print(
+                "{:40} best {:12.6f} ms  mean {:12.6f} ms".format(
+                    benchmark.name, result["best_s"] * 1e3, result["mean_s"] * 1e3
+                )
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "suite": "python",
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "nb_trajectories": args.nb_trajectories,
+                    "nb_points": args.nb_points,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    run()
+    sys.exit(0)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark of the storage options of the ball trajectories hdf5 file.
+
+For each configuration (layout, chunking, compression, shuffle and
+time stamps dtype), a group of synthetic ball trajectories is written
+into a new hdf5 file, and the script reports the size of the file,
+the writing time and the throughput of loading the whole group
+(via context.BallTrajectories).
+"""
+
+import sys
+import time
+import json
+import argparse
+import pathlib
+import tempfile
+import typing
+import numpy as np
+import context.ball_trajectories as bt
+
+_GROUP = "benchmark"
+
+
+class _Configuration(typing.NamedTuple):
+    packed: bool
+    storage: bt.StorageOptions
+
+    def name(self) -> str:
+        storage = self.storage
+        compression = storage.compression or "none"
+        if storage.compression_level is not None:
+            compression += "-{}".format(storage.compression_level)
+        return "{} chunks={} compression={}{} stamps={}".format(
+            "packed" if self.packed else "legacy",
+            storage.chunks,
+            compression,
+            " shuffle" if storage.shuffle else "",
+            storage.stamp_dtype or "uint64",
+        )
+
+
+def _configurations() -> typing.List[_Configuration]:
+    packed_storages = [
+        bt.StorageOptions(),
+        bt.StorageOptions(stamp_dtype="uint32"),
+        bt.StorageOptions(chunks=4096, compression="lzf"),
+        bt.StorageOptions(chunks=4096, compression="lzf", shuffle=True),
+        bt.StorageOptions(chunks=4096, compression="gzip", compression_level=1),
+        bt.StorageOptions(
+            chunks=4096, compression="gzip", compression_level=4, shuffle=True
+        ),
+        bt.StorageOptions(
+            chunks=4096,
+            compression="gzip",
+            compression_level=4,
+            shuffle=True,
+            stamp_dtype="uint32",
+        ),
+        bt.StorageOptions(
+            chunks=65536,
+            compression="gzip",
+            compression_level=9,
+            shuffle=True,
+            stamp_dtype="uint32",
+        ),
+    ]
+    legacy_storages = [
+        bt.StorageOptions(),
+        bt.StorageOptions(compression="gzip", compression_level=4, shuffle=True),
+    ]
+    return [_Configuration(False, storage) for storage in legacy_storages] + [
+        _Configuration(True, storage) for storage in packed_storages
+    ]
+
+
+def synthetic_trajectories(
+    nb_trajectories: int, nb_points: int, seed: int = 0
+) -> bt.StampedTrajectories:
+    """
+    Returns ball flights (parabolas with measurement noise),
+    sampled at about 200Hz with jittery time stamps.
+    """
+    rng = np.random.default_rng(seed)
+    trajectories = []
+    for _ in range(nb_trajectories):
+        size = int(nb_points * rng.uniform(0.8, 1.2))
+        durations = rng.integers(4500, 5500, size)
+        stamps = np.zeros(size, np.uint)
+        stamps[1:] = np.cumsum(durations[:-1])
+        t = stamps * 1e-6
+        start = rng.uniform((0.0, 3.0, 0.8), (1.0, 4.0, 1.2))
+        velocity = rng.uniform((-1.0, -5.0, 0.5), (1.0, -3.0, 2.0))
+        positions = start + np.outer(t, velocity)
+        positions[:, 2] -= 0.5 * 9.81 * t**2
+        positions += rng.normal(0.0, 0.002, positions.shape)
+        trajectories.append((stamps, positions.astype(np.float32)))
+    return trajectories
+
+
+def _benchmark(
+    configuration: _Configuration,
+    stamped_trajectories: bt.StampedTrajectories,
+    directory: pathlib.Path,
+    repeat: int,
+) -> typing.Dict[str, typing.Any]:
+    path = directory / "{}.hdf5".format(abs(hash(configuration)))
+    with open(path, "wb"):
+        pass
+
+    start = time.perf_counter()
+    with bt.MutableRecordedBallTrajectories(path) as rbt:
+        rbt.add_stamped_trajectories(
+            _GROUP,
+            stamped_trajectories,
+            packed=configuration.packed,
+            storage=configuration.storage,
+        )
+    write_time = time.perf_counter() - start
+
+    load_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bt.BallTrajectories(_GROUP, path)
+        load_times.append(time.perf_counter() - start)
+    load_time = min(load_times)
+
+    nb_points = sum([len(stamps) for stamps, _ in stamped_trajectories])
+    # size of the trajectories once loaded (uint64 stamps, float32 positions)
+    nb_bytes = nb_points * (8 + 3 * 4)
+    file_size = path.stat().st_size
+    path.unlink()
+
+    return {
+        "configuration": configuration.name(),
+        "packed": configuration.packed,
+        "storage": configuration.storage._asdict(),
+        "file_size_bytes": file_size,
+        "write_time_s": write_time,
+        "load_time_s": load_time,
+        "load_points_per_s": nb_points / load_time,
+        "load_mb_per_s": nb_bytes / load_time / 1e6,
+    }
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--nb-trajectories", type=int, default=1000, help="size of the group"
+    )
+    parser.add_argument(
+        "--nb-points", type=int, default=300, help="average points per trajectory"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="number of loads (best one reported)"
+    )
+    parser.add_argument(
+        "--output", type=str, required=False, help="path of the json result file"
+    )
+    args = parser.parse_args()
+
+    stamped_trajectories = synthetic_trajectories(args.nb_trajectories, args.nb_points)
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for configuration in _configurations():
+            result = _benchmark(
+                configuration,
+                stamped_trajectories,
+                pathlib.Path(directory),
+                args.repeat,
+            )
+            results.append(result)
+            print(
+                "{:80} {:10.2f} MB  write {:7.3f} s  load {:7.3f} s "
+                "({:8.1f} MB/s)".format(
+                    result["configuration"],
+                    result["file_size_bytes"] / 1e6,
+                    result["write_time_s"],
+                    result["load_time_s"],
+                    result["load_mb_per_s"],
+                )
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "nb_trajectories": args.nb_trajectories,
+                    "nb_points": args.nb_points,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    run()
+    sys.exit(0)
@@ -5,7 +5,11 @@ For manipulating a ball trajectory hdf5 file:
 - adding trajectories to it (via json or tennicam files)
 - for deleting trajectories
 - for getting info about the file
-- for translating all the points of a group of trajectories.
+- for translating all the points of a group of trajectories
+- for applying a rigid transformation (rotation and translation)
+  to all the points of a group of trajectories
+- for converting a group of trajectories to the packed layout
+- for resampling a group of trajectories at a fixed period.
 """
 
 import sys
@@ -13,23 +17,24 @@ import argparse
 import logging
 import pathlib
 import typing
-import numpy as np
 import context.ball_trajectories as bt
 
 
 def _info_group(rbt: bt.RecordedBallTrajectories, group_name: str):
 
-    indexes = rbt.get_indexes(group_name)
+    summaries = rbt.get_summary(group_name)
+    cleaning = rbt.get_cleaning_parameters(group_name)
 
-    print("\ngroup: {} , found {} trajectories".format(group_name, len(indexes)))
-    for index in sorted(indexes):
-        stamps, positions = rbt.get_stamped_trajectory(group_name, index)
-        nb_points = len(stamps)
-        duration = (stamps[-1] - stamps[0]) * 1e-6
-        first_position = str("{:.2f} " * 3).format(*list(positions[0, :]))
+    print("\ngroup: {} , found {} trajectories".format(group_name, len(summaries)))
+    if cleaning is not None:
+        print("cleaned at import: {}".format(cleaning))
+    for index in sorted(summaries):
+        summary = summaries[index]
+        duration = summary.duration_us * 1e-6
+        first_position = str("{:.2f} " * 3).format(*summary.first_position)
         print(
             "\tindex: {}\t {} points\t{:.2f} seconds ( first: {})".format(
-                index, nb_points, duration, first_position
+                index, summary.nb_points, duration, first_position
             )
         )
     print()
@@ -43,8 +48,12 @@ def _info_whole_file(rbt: bt.RecordedBallTrajectories):
     print()
 
 
-def _info(hdf5_path: pathlib.Path, group_name: str = None):
-    with bt.RecordedBallTrajectories(hdf5_path) as rbt:
+def _info(
+    hdf5_path: pathlib.Path,
+    group_name: str = None,
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
+    with bt.RecordedBallTrajectories(hdf5_path, profile=profile) as rbt:
         print("\nhdf5 trajectories file: {}".format(hdf5_path))
         if group_name:
             _info_group(rbt, group_name)
@@ -52,38 +61,212 @@ def _info(hdf5_path: pathlib.Path, group_name: str = None):
             _info_whole_file(rbt)
 
 
-def _add_json(hdf5_path: pathlib.Path, group_name: str, sampling: int):
+def _add_storage_arguments(parser: argparse.ArgumentParser):
+    # options on how the datasets of a new group are stored
+    parser.add_argument(
+        "--chunks",
+        type=int,
+        required=False,
+        help="number of points per dataset chunk (default: contiguous storage)",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        required=False,
+        choices=["gzip", "lzf"],
+        help="compression filter (default: no compression)",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        required=False,
+        help="compression level (gzip only, 0 to 9)",
+    )
+    parser.add_argument(
+        "--shuffle",
+        action="store_true",
+        help="apply the shuffle filter before compression",
+    )
+    parser.add_argument(
+        "--stamp-dtype",
+        type=str,
+        required=False,
+        choices=["uint32", "uint64", "int64"],
+        help="data type of the stored time stamps",
+    )
+
+
+def _storage_options(args: argparse.Namespace) -> bt.StorageOptions:
+    return bt.StorageOptions(
+        chunks=args.chunks,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        shuffle=args.shuffle,
+        stamp_dtype=args.stamp_dtype,
+    )
+
+
+def _add_cleaning_arguments(parser: argparse.ArgumentParser):
+    # options on how raw recordings are cleaned at import
+    defaults = bt.CleaningParameters()
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="clean the recordings (outliers, duplicated stamps, gaps, flight phase)",
+    )
+    parser.add_argument(
+        "--max-speed",
+        type=float,
+        default=defaults.max_speed,
+        help="speed (m/s) above which a sample is an outlier (0: no rejection)",
+    )
+    parser.add_argument(
+        "--max-gap-us",
+        type=int,
+        default=defaults.max_gap_us,
+        help="gap (microseconds) at which recordings are split (0: no split)",
+    )
+    parser.add_argument(
+        "--min-flight-speed",
+        type=float,
+        default=defaults.min_flight_speed,
+        help="speed (m/s) of the ball in flight (0: no trimming)",
+    )
+    parser.add_argument(
+        "--min-points",
+        type=int,
+        default=defaults.min_points,
+        help="trajectories with less points are discarded",
+    )
+
+
+def _cleaning_parameters(
+    args: argparse.Namespace,
+) -> typing.Optional[bt.CleaningParameters]:
+    if not args.clean:
+        return None
+    return bt.CleaningParameters(
+        max_speed=args.max_speed or None,
+        max_gap_us=args.max_gap_us or None,
+        min_flight_speed=args.min_flight_speed or None,
+        min_points=args.min_points,
+    )
+
+
+def _add_json(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    sampling: int,
+    packed: bool,
+    jobs: typing.Optional[int],
+    storage: bt.StorageOptions,
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
     logging.info("recording trajectories in {}".format(hdf5_path))
-    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path, profile=profile) as rbt:
         if group_name in rbt.get_groups():
-            raise ValueError("group {} already present in the file")
-        nb_added = rbt.add_json_trajectories(group_name, pathlib.Path.cwd(), sampling)
+            raise ValueError("group {} already present in the file".format(group_name))
+        nb_added = rbt.add_json_trajectories(
+            group_name,
+            pathlib.Path.cwd(),
+            sampling,
+            packed=packed,
+            jobs=jobs,
+            storage=storage,
+        )
     logging.info("added {} trajectories".format(nb_added))
 
 
-def _add_tennicam(hdf5_path: pathlib.Path, group_name: str):
+def _add_tennicam(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    packed: bool,
+    jobs: typing.Optional[int],
+    storage: bt.StorageOptions,
+    cleaning: typing.Optional[bt.CleaningParameters],
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
     logging.info("recording trajectories in {}".format(hdf5_path))
-    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path, profile=profile) as rbt:
         if group_name in rbt.get_groups():
-            raise ValueError("group {} already present in the file")
-    nb_added = rbt.add_tennicam_trajectories(group_name, pathlib.Path.cwd())
+            raise ValueError("group {} already present in the file".format(group_name))
+        nb_added = rbt.add_tennicam_trajectories(
+            group_name,
+            pathlib.Path.cwd(),
+            packed=packed,
+            jobs=jobs,
+            storage=storage,
+            cleaning=cleaning,
+        )
     logging.info("added {} trajectories".format(nb_added))
 
 
-def _rm_group(hdf5_path: pathlib.Path, group_name: str):
-    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
-        rbt.rm_group(group_name)
+def _pack(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path, profile=profile) as rbt:
+        nb_trajectories = rbt.pack_group(group_name)
+    logging.info(
+        "group {} ({} trajectories) uses the packed layout".format(
+            group_name, nb_trajectories
+        )
+    )
 
 
-def _translate(hdf5_path: pathlib.Path, group_name: str, coords: typing.List[float]):
-    coords = np.array(coords, np.float32)
-    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
-        for index in rbt.get_indexes(group_name):
-            stamps, trajectory = rbt.get_stamped_trajectory(
-                group_name, index, direct=True
+def _resample(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    resampled_group_name: str,
+    period_us: int,
+    method: str,
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path, profile=profile) as rbt:
+        if resampled_group_name in rbt.get_groups():
+            raise ValueError(
+                "group {} already present in the file {}".format(
+                    resampled_group_name, hdf5_path
+                )
             )
-            trajectory += coords
-            rbt.overwrite(group_name, index, (stamps, trajectory))
+        nb_trajectories = rbt.add_resampled_group(
+            group_name, resampled_group_name, period_us, method
+        )
+    logging.info(
+        "added {} trajectories (resampled at {} microseconds) "
+        "to group {}".format(nb_trajectories, period_us, resampled_group_name)
+    )
+
+
+def _rm_group(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path, profile=profile) as rbt:
+        rbt.rm_group(group_name)
+
+
+def _translate(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    coords: typing.List[float],
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
+    _transform(hdf5_path, group_name, [0.0, 0.0, 0.0], coords, profile)
+
+
+def _transform(
+    hdf5_path: pathlib.Path,
+    group_name: str,
+    rotation: typing.List[float],
+    translation: typing.List[float],
+    profile: typing.Union[bool, bt.Profiler] = False,
+):
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path, profile=profile) as rbt:
+        nb_trajectories = rbt.transform(group_name, *rotation, translation=translation)
+    logging.info("transformed {} trajectories".format(nb_trajectories))
 
 
 def run():
@@ -100,8 +283,16 @@ def run():
         help="path to the hdf5 file encapsulating the ball trajectories",
     )
 
-    # 5 commands supported: info, add-json, add-tennicam,
-    # rm and translate.
+    # for printing the time spent (and data processed) per stage
+    # of the reading / writing of the trajectories
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the time spent per stage (parsing, reading, writing ...)",
+    )
+
+    # 8 commands supported: info, add-json, add-tennicam,
+    # rm, translate, transform, pack and resample.
     subparser = parser.add_subparsers(dest="command", required=True)
 
     # for displaying info about the hdf5 file
@@ -130,6 +321,19 @@ def run():
         required=True,
         help="record sampling rate, in microseconds (int)",
     )
+    add_json.add_argument(
+        "--packed",
+        action="store_true",
+        help="store the group using the packed layout",
+    )
+    add_json.add_argument(
+        "--jobs",
+        type=int,
+        required=False,
+        default=1,
+        help="number of processes parsing the json files (0: one per CPU)",
+    )
+    _add_storage_arguments(add_json)
 
     # for adding the tennicam files of the current folder
     # to a hdf5 trajectory file
@@ -140,6 +344,20 @@ def run():
     add_tennicam.add_argument(
         "--group", type=str, required=True, help="the group of trajectories"
     )
+    add_tennicam.add_argument(
+        "--packed",
+        action="store_true",
+        help="store the group using the packed layout",
+    )
+    add_tennicam.add_argument(
+        "--jobs",
+        type=int,
+        required=False,
+        default=1,
+        help="number of processes parsing the tennicam files (0: one per CPU)",
+    )
+    _add_storage_arguments(add_tennicam)
+    _add_cleaning_arguments(add_tennicam)
 
     # for removing a group from the hdf5 file
     rm_group = subparser.add_parser(
@@ -160,6 +378,62 @@ def run():
         "--coords", type=float, nargs=3, required=True, help="x y z coordinates (float)"
     )
 
+    # for rotating and translating all points in all the trajectories of the group
+    transform = subparser.add_parser(
+        "transform",
+        help="""rotate (around x, then y, then z) and translate all the positions
+        of all trajectories of the group""",
+    )
+    transform.add_argument(
+        "--group", type=str, required=True, help="the group of trajectories"
+    )
+    transform.add_argument(
+        "--rotation",
+        type=float,
+        nargs=3,
+        default=[0.0, 0.0, 0.0],
+        help="rotation around x, y and z (radians, float)",
+    )
+    transform.add_argument(
+        "--translation",
+        type=float,
+        nargs=3,
+        default=[0.0, 0.0, 0.0],
+        help="x y z coordinates (float)",
+    )
+
+    # for converting a group to the packed layout (all trajectories
+    # concatenated in contiguous datasets)
+    pack = subparser.add_parser(
+        "pack", help="convert the group of trajectories to the packed layout"
+    )
+    pack.add_argument(
+        "--group", type=str, required=True, help="the group of trajectories"
+    )
+
+    # for resampling all the trajectories of a group at fixed period,
+    # saving them in a new group
+    resample = subparser.add_parser(
+        "resample",
+        help="resample the trajectories of a group into a new group",
+    )
+    resample.add_argument(
+        "--group", type=str, required=True, help="the group of trajectories"
+    )
+    resample.add_argument(
+        "--output-group", type=str, required=True, help="the group to create"
+    )
+    resample.add_argument(
+        "--period-us", type=int, required=True, help="period (microseconds)"
+    )
+    resample.add_argument(
+        "--method",
+        type=str,
+        choices=["linear", "cubic"],
+        default="linear",
+        help="interpolation method",
+    )
+
     # parsing the arguments
     args = parser.parse_args()
 
@@ -174,21 +448,60 @@ def run():
     if not pathlib.Path(hdf5_path).is_file():
         raise FileNotFoundError("failed to find the file {}".format(hdf5_path))
 
+    # shared by all the instances of RecordedBallTrajectories created
+    # by the command
+    profile = bt.Profiler() if args.profile else False
+
     # going ahead based on the arguments
     if args.command == "info":
-        _info(hdf5_path, args.group)
+        _info(hdf5_path, args.group, profile)
 
     elif args.command == "add-json":
-        _add_json(hdf5_path, args.group, args.sampling_rate_us)
+        _add_json(
+            hdf5_path,
+            args.group,
+            args.sampling_rate_us,
+            args.packed,
+            args.jobs or None,
+            _storage_options(args),
+            profile,
+        )
 
     elif args.command == "add-tennicam":
-        _add_tennicam(hdf5_path, args.group)
+        _add_tennicam(
+            hdf5_path,
+            args.group,
+            args.packed,
+            args.jobs or None,
+            _storage_options(args),
+            _cleaning_parameters(args),
+            profile,
+        )
 
     elif args.command == "rm":
-        _rm_group(hdf5_path, args.group)
+        _rm_group(hdf5_path, args.group, profile)
 
     elif args.command == "translate":
-        _translate(hdf5_path, args.group, args.coords)
+        _translate(hdf5_path, args.group, args.coords, profile)
+
+    elif args.command == "transform":
+        _transform(hdf5_path, args.group, args.rotation, args.translation, profile)
+
+    elif args.command == "pack":
+        _pack(hdf5_path, args.group, profile)
+
+    elif args.command == "resample":
+        _resample(
+            hdf5_path,
+            args.group,
+            args.output_group,
+            args.period_us,
+            args.method,
+            profile,
+        )
+
+    if args.profile:
+        print(typing.cast(bt.Profiler, profile).stats().report())
 
 
 if __name__ == "__main__":
@@ -1,5 +1,8 @@
 #pragma once
 
+#include <algorithm>
+#include <cstddef>
+
 #include "shared_memory/serializer.hpp"
 
 #include <context/coordinates.hpp>
@@ -30,6 +33,37 @@ public:
      */
     const State& update(long time_stamp, const Coordinates& position);
 
+    /**
+     * Equivalent to calling update on each of the nb_points time stamps
+     * and positions (3 values per point), the successive states
+     * (position then velocity, i.e. 6 values per point) being
+     * written in states (which should have room for 6 * nb_points values).
+     * The internal state of the instance is then the same as after
+     * the corresponding sequence of calls to update.
+     */
+    template <typename Stamp, typename Real>
+    void update_batch(std::size_t nb_points,
+                      const Stamp* time_stamps,
+                      const Real* positions,
+                      double* states)
+    {
+        Coordinates position;
+        for (std::size_t i = 0; i < nb_points; i++)
+        {
+            for (std::size_t d = 0; d < 3; d++)
+            {
+                position[d] = static_cast<double>(positions[3 * i + d]);
+            }
+            const State& state =
+                update(static_cast<long>(time_stamps[i]), position);
+            std::copy(
+                state.position.begin(), state.position.end(), states + 6 * i);
+            std::copy(state.velocity.begin(),
+                      state.velocity.end(),
+                      states + 6 * i + 3);
+        }
+    }
+
     /**
      * @returns the state as computed the latest time update was called
      */
@@ -0,0 +1,88 @@
+#pragma once
+
+#include <cmath>
+#include <limits>
+
+#include "shared_memory/serializer.hpp"
+
+#include "context/contact_information.hpp"
+#include "context/coordinates.hpp"
+#include "context/state.hpp"
+
+namespace context
+{
+/*! Native version of the python class context.BallStatus:
+ *  monitors the ball during an episode (lowest and furthest
+ *  positions, contact with the racket, minimal distance to
+ *  the target and maximal velocity after contact).
+ *  All the state is stored in fixed size members, i.e. update
+ *  does not allocate memory.
+ */
+class BallStatus
+{
+public:
+    BallStatus();
+    /**
+     * @param target_position: position the ball should reach
+     *        after contact with the racket
+     * @param target_distance_z_epsilon: the distance ball/target
+     *        is monitored only when the ball is at the height of
+     *        the target (+/- epsilon)
+     */
+    BallStatus(const Coordinates& target_position,
+               double target_distance_z_epsilon = 0.05);
+
+    void reset();
+
+    /**
+     * Update the status with the current position and velocity of the
+     * ball and the current contact information ball/racket.
+     */
+    void update(const Coordinates& ball_position,
+                const Coordinates& ball_velocity,
+                const ContactInformation& racket_contact_information);
+
+    /**
+     * Update the status with the current state of the ball
+     * (e.g. as returned by Ball::update)
+     */
+    void update(const State& ball_state,
+                const ContactInformation& racket_contact_information);
+
+    bool contact_occured() const;
+
+    template <class Archive>
+    void serialize(Archive& archive)
+    {
+        archive(target_position,
+                target_distance_z_epsilon,
+                hit_racket,
+                min_position_ball_target,
+                min_position_ball_target_set,
+                min_distance_ball_racket,
+                min_distance_ball_target,
+                max_ball_velocity,
+                min_z,
+                max_y,
+                ball_position,
+                ball_velocity);
+    }
+
+public:
+    Coordinates target_position;
+    double target_distance_z_epsilon;
+    bool hit_racket;
+    // meaningful only if min_position_ball_target_set is true
+    Coordinates min_position_ball_target;
+    bool min_position_ball_target_set;
+    // meaningful only if hit_racket is false
+    double min_distance_ball_racket;
+    double min_distance_ball_target;
+    double max_ball_velocity;
+    double min_z;
+    double max_y;
+    Coordinates ball_position;
+    Coordinates ball_velocity;
+};
+
+}  // namespace context
@@ -0,0 +1,54 @@
+#pragma once
+
+#include "shared_memory/serializer.hpp"
+
+#include "context/contact_information.hpp"
+#include "context/coordinates.hpp"
+#include "context/state.hpp"
+
+namespace context
+{
+/*! Native version of the python class context.HitPoint:
+ *  the position of the ball when, after contact with the racket,
+ *  it first goes below the height of the table (+2cm).
+ */
+class HitPoint
+{
+public:
+    HitPoint();
+    HitPoint(double table_height,
+             const Coordinates& default_position = {-10, -10, -10});
+
+    void reset();
+
+    /**
+     * @returns the hit position if already found or found with this
+     *          update, the default position otherwise
+     */
+    const Coordinates& update(
+        const Coordinates& ball_position,
+        const ContactInformation& racket_contact_information);
+
+    /**
+     * Update with the current state of the ball
+     * (e.g. as returned by Ball::update)
+     */
+    const Coordinates& update(
+        const State& ball_state,
+        const ContactInformation& racket_contact_information);
+
+    template <class Archive>
+    void serialize(Archive& archive)
+    {
+        archive(table_height, default_position, hit_position, hit);
+    }
+
+public:
+    double table_height;
+    Coordinates default_position;
+    // meaningful only if hit is true
+    Coordinates hit_position;
+    bool hit;
+};
+
+}  // namespace context
@@ -1,6 +1,7 @@
 #pragma once
 
-#include <deque>
+#include <cstddef>
+#include <vector>
 
 #include "shared_memory/serializer.hpp"
 
@@ -8,6 +9,12 @@ namespace context
 {
 /*! Implements a low pass filter via a moving window average.
  *  By default the moving window size is of 1, i.e. no filtering.
+ *  Until the window is full, the average is computed over the
+ *  values received so far.
+ *  The window is a fixed capacity ring buffer, i.e. no memory
+ *  is allocated after construction (or call to set_average_size).
+ *  The running sum is recomputed exactly each time the ring buffer
+ *  wraps around, so that floating point errors do not accumulate.
  */
 class LowPassFilter
 {
@@ -16,29 +23,43 @@ public:
 
     /**
      * Set a filter with the specified moving window size
+     * (throws std::invalid_argument if lower than 1)
      */
-    LowPassFilter(size_t average_size);
+    LowPassFilter(int average_size);
 
     /**
-     * Reset the moving averaging window size to a new value.
+     * Reset the moving averaging window size to a new value
+     * (and empty the moving window). Throws std::invalid_argument
+     * if average_size is lower than 1.
      * Call to this function may impact real time.
      */
-    void set_average_size(size_t average_size);
+    void set_average_size(int average_size);
 
     /**
      * Apply the filter
      */
     double get(double value);
 
+    /**
+     * Apply the filter to nb_values successive values,
+     * the filtered values being written to output
+     * (which may be the same buffer as input).
+     */
+    void filter(size_t nb_values, const double* input, double* output);
+
     template <class Archive>
     void serialize(Archive &archive)
     {
-        archive(average_size_, values_, sum_);
+        archive(average_size_, values_, head_, count_, sum_);
     }
 
 private:
     size_t average_size_;
-    std::deque<double> values_;
+    // ring buffer: values_[head_] is the next value to be replaced,
+    // count_ the number of values received (up to average_size_)
+    std::vector<double> values_;
+    size_t head_;
+    size_t count_;
     double sum_;
 };
 }  // namespace context
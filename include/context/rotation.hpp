@@ -1,6 +1,7 @@
 #pragma once
 
 #include <cmath>
+#include <cstddef>
 #include <eigen3/Eigen/Core>
 
 #include "context/coordinates.hpp"
@@ -18,13 +19,52 @@ public:
      * @param gamma: rotation around z
      */
     Rotation(double alpha, double beta, double gamma);
+    /**
+     * Construct the rotation from its (orthonormal) matrix.
+     */
+    Rotation(const Eigen::Matrix3d& matrix);
     /**
      * Apply the rotation to coordinates
      */
-    void rotate(Coordinates& coordinates);
+    void rotate(Coordinates& coordinates) const;
+    /**
+     * Apply the rotation to nb_points points (3 values per point,
+     * i.e. a row major nb_points x 3 array), writing the rotated points
+     * to output (which may be the same buffer as input).
+     */
+    template <typename Real>
+    void rotate(std::size_t nb_points, const Real* input, Real* output) const;
+    /**
+     * The inverse rotation
+     */
+    Rotation inverse() const;
+    /**
+     * The rotation applying first other, then this rotation.
+     */
+    Rotation compose(const Rotation& other) const;
+    /**
+     * The rotation matrix
+     */
+    const Eigen::Matrix3d& matrix() const;
 
 private:
     Eigen::Matrix3d rotation_;
 };
 
+template <typename Real>
+using Points = Eigen::Matrix<Real, Eigen::Dynamic, 3, Eigen::RowMajor>;
+
+template <typename Real>
+void Rotation::rotate(std::size_t nb_points,
+                      const Real* input,
+                      Real* output) const
+{
+    Eigen::Map<const Points<Real>> in(input, nb_points, 3);
+    Eigen::Map<Points<Real>> out(output, nb_points, 3);
+    // computed in double precision; the product is evaluated in a
+    // temporary, so input and output may be the same buffer
+    out = (in.template cast<double>() * rotation_.transpose())
+              .template cast<Real>();
+}
+
 }  // namespace context
@@ -0,0 +1,201 @@
+#pragma once
+
+#include <algorithm>
+#include <array>
+#include <cstddef>
+#include <stdexcept>
+#include <string>
+
+#include "shared_memory/serializer.hpp"
+
+#include "context/coordinates.hpp"
+
+namespace context
+{
+/*! A chunk of (at most CAPACITY) points of a stamped trajectory:
+ *  time stamps and positions, and optionally velocities, stored
+ *  in contiguous fixed size arrays. Its serialized size does not
+ *  depend on its content, so that a chunk can be sent as a single
+ *  message via shared_memory / o80 (rather than one message
+ *  per point).
+ */
+template <int CAPACITY>
+class StampedTrajectoryChunk
+{
+public:
+    static constexpr int capacity = CAPACITY;
+
+    StampedTrajectoryChunk() : size_(0), has_velocities_(false)
+    {
+        stamps_.fill(0);
+        positions_.fill(0);
+        velocities_.fill(0);
+    }
+
+    /**
+     * Remove all the points
+     */
+    void clear()
+    {
+        size_ = 0;
+        has_velocities_ = false;
+    }
+
+    int size() const
+    {
+        return size_;
+    }
+
+    bool full() const
+    {
+        return size_ == CAPACITY;
+    }
+
+    /**
+     * True if the points have been added with their velocities
+     */
+    bool has_velocities() const
+    {
+        return has_velocities_;
+    }
+
+    /**
+     * Add a point (without velocity) if the chunk is not full.
+     * If the chunk has velocities, the velocity of the point is
+     * set to zero.
+     * @returns false if the chunk was full
+     */
+    bool push_back(long stamp, const Coordinates& position)
+    {
+        if (full())
+        {
+            return false;
+        }
+        std::fill_n(&velocities_[3 * size_], 3, 0.);
+        return push_point(stamp, position);
+    }
+
+    /**
+     * Add a point and its velocity if the chunk is not full.
+     * @returns false if the chunk was full
+     */
+    bool push_back(long stamp,
+                   const Coordinates& position,
+                   const Coordinates& velocity)
+    {
+        if (full())
+        {
+            return false;
+        }
+        std::copy(velocity.begin(), velocity.end(), &velocities_[3 * size_]);
+        has_velocities_ = true;
+        return push_point(stamp, position);
+    }
+
+    /**
+     * Replace the content of the chunk by (at most CAPACITY of)
+     * the nb_points time stamps and positions (3 values per point),
+     * and velocities (3 values per point, may be nullptr, the velocities
+     * being then set to zero).
+     * @returns the number of points copied into the chunk
+     */
+    template <typename Stamp, typename Real>
+    std::size_t fill(std::size_t nb_points,
+                     const Stamp* stamps,
+                     const Real* positions,
+                     const Real* velocities = nullptr)
+    {
+        std::size_t size =
+            std::min(nb_points, static_cast<std::size_t>(CAPACITY));
+        std::copy(stamps, stamps + size, stamps_.begin());
+        std::copy(positions, positions + 3 * size, positions_.begin());
+        has_velocities_ = velocities != nullptr;
+        if (has_velocities_)
+        {
+            std::copy(velocities, velocities + 3 * size, velocities_.begin());
+        }
+        else
+        {
+            std::fill_n(velocities_.begin(), 3 * size, 0.);
+        }
+        size_ = static_cast<int>(size);
+        return size;
+    }
+
+    /**
+     * Time stamp, position and velocity of a point of the chunk
+     * (throw std::out_of_range if index is not lower than size)
+     */
+    long stamp(int index) const
+    {
+        check_index(index);
+        return stamps_[index];
+    }
+
+    Coordinates position(int index) const
+    {
+        check_index(index);
+        return {positions_[3 * index],
+                positions_[3 * index + 1],
+                positions_[3 * index + 2]};
+    }
+
+    Coordinates velocity(int index) const
+    {
+        check_index(index);
+        return {velocities_[3 * index],
+                velocities_[3 * index + 1],
+                velocities_[3 * index + 2]};
+    }
+
+    /**
+     * Contiguous arrays of all the (CAPACITY) time stamps, positions
+     * and velocities, only the size first points being meaningful
+     */
+    long* stamps()
+    {
+        return stamps_.data();
+    }
+    double* positions()
+    {
+        return positions_.data();
+    }
+    double* velocities()
+    {
+        return velocities_.data();
+    }
+
+    template <class Archive>
+    void serialize(Archive& archive)
+    {
+        archive(size_, has_velocities_, stamps_, positions_, velocities_);
+    }
+
+private:
+    bool push_point(long stamp, const Coordinates& position)
+    {
+        stamps_[size_] = stamp;
+        std::copy(position.begin(), position.end(), &positions_[3 * size_]);
+        size_++;
+        return true;
+    }
+
+    void check_index(int index) const
+    {
+        if (index < 0 || index >= size_)
+        {
+            throw std::out_of_range("StampedTrajectoryChunk: index " +
+                                    std::to_string(index) +
+                                    " out of range (size " +
+                                    std::to_string(size_) + ")");
+        }
+    }
+
+    int size_;
+    bool has_velocities_;
+    std::array<long, CAPACITY> stamps_;
+    std::array<double, 3 * CAPACITY> positions_;
+    std::array<double, 3 * CAPACITY> velocities_;
+};
+
+}  // namespace context
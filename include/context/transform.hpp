@@ -16,14 +16,51 @@ public:
      * @param translation: translation
      */
     Transform(double alpha, double beta, double gamma, Coordinates translation);
+    /**
+     * Construct the transformation from its rotation and translation
+     */
+    Transform(const Rotation& rotation, Coordinates translation);
     /**
      * Apply the transformation to coordinates
      */
-    void apply(Coordinates& coordinates);
+    void apply(Coordinates& coordinates) const;
+    /**
+     * Apply the transformation to nb_points points (3 values per point,
+     * i.e. a row major nb_points x 3 array), writing the transformed
+     * points to output (which may be the same buffer as input).
+     */
+    template <typename Real>
+    void apply(std::size_t nb_points, const Real* input, Real* output) const;
+    /**
+     * The inverse transformation
+     */
+    Transform inverse() const;
+    /**
+     * The transformation applying first other, then this transformation.
+     */
+    Transform compose(const Transform& other) const;
+    const Rotation& rotation() const;
+    const Coordinates& translation() const;
 
 private:
     Rotation rotation_;
     Coordinates translation_;
 };
 
+template <typename Real>
+void Transform::apply(std::size_t nb_points,
+                      const Real* input,
+                      Real* output) const
+{
+    Eigen::Map<const Points<Real>> in(input, nb_points, 3);
+    Eigen::Map<Points<Real>> out(output, nb_points, 3);
+    Eigen::RowVector3d translation(
+        translation_[0], translation_[1], translation_[2]);
+    // computed in double precision (see Rotation::rotate)
+    Points<double> transformed =
+        in.template cast<double>() * rotation_.matrix().transpose();
+    transformed.rowwise() += translation;
+    out = transformed.template cast<Real>();
+}
+
 }  // namespace context
@@ -26,7 +26,8 @@ public:
     void set_average_size(int average_size);
 
     /** Apply finit difference and low pass filtering,
-     *  and return the computed velocity */
+     *  and return the computed velocity. The finite difference
+     *  is 0 if diff_time is 0 (e.g. first call). */
     double get(long diff_time, double position);
 
     template <class Archive>
@@ -1,4 +1,56 @@
-from context_wrp import *
 from .ball_status import BallStatus
 from .hit_point import HitPoint
-from .ball_trajectories import BallTrajectories
+
+# The native bindings (context_wrp, e.g. context.Ball, context.State ...)
+# and BallTrajectories (which depends on numpy and h5py) are imported
+# when first accessed, so that processes using only BallStatus or
+# HitPoint start quickly.
+
+
+def _public_names():
+    """
+    Names exported by the package (see __all__).
+    """
+    names = ["BallStatus", "BallTrajectories", "HitPoint"]
+    try:
+        import context_wrp
+
+        names += [name for name in dir(context_wrp) if not name.startswith("_")]
+    except ImportError:
+        pass
+    return sorted(set(names))
+
+
+def __getattr__(name: str):
+    if name == "__all__":
+        # computed on first access (e.g. "from context import *"),
+        # as it requires importing context_wrp
+        value = _public_names()
+        globals()[name] = value
+        return value
+    if name.startswith("_"):
+        # (e.g. probed by inspect or pickle, not worth importing context_wrp)
+        raise AttributeError("module 'context' has no attribute '{}'".format(name))
+    if name == "BallTrajectories":
+        from .ball_trajectories import BallTrajectories
+
+        return BallTrajectories
+    try:
+        import context_wrp
+    except ImportError as error:
+        raise AttributeError(
+            "module 'context' has no attribute '{}' "
+            "(failed to import context_wrp: {})".format(name, error)
+        ) from error
+    try:
+        value = getattr(context_wrp, name)
+    except AttributeError:
+        raise AttributeError(
+            "module 'context' has no attribute '{}'".format(name)
+        ) from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_public_names()))
@@ -0,0 +1,52 @@
+"""
+Type aliases of the ball trajectories (see ball_trajectories), in
+their own module as nptyping is slow to import: ball_trajectories
+imports this module only when one of the aliases is first accessed.
+"""
+
+import typing
+import nptyping as npt
+import numpy as np
+
+if typing.TYPE_CHECKING:
+    import o80
+
+assert int(npt.__version__[0]) >= 2, "Need nptyping >=2."
+
+# 3: 3d position , Any: nb of points in trajectory
+Trajectory = npt.NDArray[npt.Shape["*, 3"], npt.Float32]
+
+# List of time stamps, in microseconds
+TimeStamps = npt.NDArray[
+    npt.Shape["*"],
+    npt.UInt,
+]
+
+# List of time durations, in microseconds
+Durations = npt.NDArray[
+    npt.Shape["*"],
+    npt.UInt,
+]
+
+# set of trajectories
+Trajectories = typing.Sequence[Trajectory]
+
+# trajectories and related time stamps
+StampedTrajectory = typing.Tuple[TimeStamps, Trajectory]
+StampedTrajectories = typing.Sequence[StampedTrajectory]
+
+# durations (microseconds), positions, velocities
+DurationTrajectory = typing.Tuple[Durations, Trajectory, Trajectory]
+DurationTrajectories = typing.Sequence[DurationTrajectory]
+DurationPoint = typing.Tuple[np.uint, "o80.Item3dState"]
+
+# Start of each trajectory in packed arrays (i.e. all trajectories
+# concatenated). Has one more element than the number of trajectories,
+# the last one being the total number of points.
+Offsets = npt.NDArray[npt.Shape["*"], npt.Int64]
+
+# all time stamps, all positions, offsets
+PackedStampedTrajectories = typing.Tuple[TimeStamps, Trajectory, Offsets]
+
+# all durations, all positions, all velocities, offsets
+PackedDurationTrajectories = typing.Tuple[Durations, Trajectory, Trajectory, Offsets]
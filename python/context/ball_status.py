@@ -1,15 +1,44 @@
+from __future__ import annotations
+
 import math
+import typing
+
+# numpy is imported by the evaluate functions (only), so that
+# processes using only BallStatus do not pay for its import
+if typing.TYPE_CHECKING:
+    import numpy as np
 
 
 def _distance(p1, p2):
-    return math.sqrt(sum([(p2_ - p1_) ** 2 for p1_, p2_ in zip(p1, p2)]))
+    # squares summed in the same order as sum([...]),
+    # without allocating a list
+    d0, d1, d2 = p2[0] - p1[0], p2[1] - p1[1], p2[2] - p1[2]
+    return math.sqrt(d0 * d0 + d1 * d1 + d2 * d2)
 
 
 def _norm(p):
-    return math.sqrt(sum([p_**2 for p_ in p]))
+    return math.sqrt(p[0] * p[0] + p[1] * p[1] + p[2] * p[2])
 
 
 class BallStatus:
+
+    # see context_wrp.CompactBallStatus for a native version
+    __slots__ = (
+        "target_position",
+        "target_distance_z_epsilon",
+        "hit_racket",
+        "min_position_ball_target",
+        "min_distance_ball_racket",
+        "min_distance_ball_target",
+        "max_ball_velocity",
+        "table_contact_position",
+        "min_z",
+        "max_y",
+        "ball_position",
+        "ball_velocity",
+        "_min_position_buffer",
+    )
+
     def __init__(self, target_position):
 
         self.target_position = target_position
@@ -30,6 +59,8 @@ class BallStatus:
         self.max_y = float("-inf")
         self.ball_position = [None] * 3
         self.ball_velocity = [None] * 3
+        # min_position_ball_target: None, or this list once set
+        self._min_position_buffer = [None] * 3
 
     def contact_occured(self):
         return self.min_distance_ball_racket is None
@@ -38,13 +69,18 @@ class BallStatus:
         self, ball_position, ball_velocity, racket_contact_information
     ):  # instance of context.ContactInformation
 
-        self.ball_position = ball_position
-        self.ball_velocity = ball_velocity
+        # copied in the preallocated lists (rather than keeping
+        # references to the caller's sequences)
+        self.ball_position[:] = ball_position
+        self.ball_velocity[:] = ball_velocity
 
         # updating lowest and furthest ever observed position
         # of the ball
-        self.min_z = min(ball_position[2], self.min_z)
-        self.max_y = max(ball_position[1], self.max_y)
+        z = ball_position[2]
+        if z < self.min_z:
+            self.min_z = z
+        if ball_position[1] > self.max_y:
+            self.max_y = ball_position[1]
 
         # updating min distance ball/racket
         if racket_contact_information.contact_occured:
@@ -53,18 +89,175 @@ class BallStatus:
         elif not self.hit_racket:
             self.min_distance_ball_racket = racket_contact_information.minimal_distance
 
-        # if post contact with racket, updating min distance ball/target
-        if self.hit_racket:
-            if (
-                abs(self.ball_position[2] - self.target_position[2])
-                <= self.target_distance_z_epsilon
-            ):
-                d = _distance(self.ball_position, self.target_position)
-                self.min_distance_ball_target = min(d, self.min_distance_ball_target)
-                if d == self.min_distance_ball_target:
-                    self.min_position_ball_target = ball_position
-
-        # if post contact with racket, updating max ball velocity
-        if self.hit_racket:
-            v = _norm(self.ball_velocity)
-            self.max_ball_velocity = max(self.max_ball_velocity, v)
+        if not self.hit_racket:
+            return
+
+        # post contact with racket, updating min distance ball/target
+        if abs(z - self.target_position[2]) <= self.target_distance_z_epsilon:
+            d = _distance(ball_position, self.target_position)
+            if d <= self.min_distance_ball_target:
+                self.min_distance_ball_target = d
+                self._min_position_buffer[:] = ball_position
+                self.min_position_ball_target = self._min_position_buffer
+
+        # post contact with racket, updating max ball velocity
+        v = _norm(ball_velocity)
+        if v > self.max_ball_velocity:
+            self.max_ball_velocity = v
+
+
+def _pack_episodes(
+    positions, velocities, contact_flags, min_distances, offsets
+) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the (float64, bool) arrays of all the steps of all the
+    episodes, and the offsets of the episodes (episode i being the
+    steps offsets[i] to offsets[i+1]).
+    """
+    import numpy as np
+
+    positions = np.asarray(positions, np.float64)
+    velocities = np.asarray(velocities, np.float64)
+    contact_flags = np.asarray(contact_flags, bool)
+    min_distances = np.asarray(min_distances, np.float64)
+    if offsets is None:
+        # episodes of the same length: (nb_episodes, nb_steps, ...) arrays
+        nb_episodes, nb_steps = positions.shape[:2]
+        offsets = np.arange(nb_episodes + 1) * nb_steps
+        positions = positions.reshape(-1, 3)
+        velocities = velocities.reshape(-1, 3)
+        contact_flags = contact_flags.reshape(-1)
+        min_distances = min_distances.reshape(-1)
+    offsets = np.asarray(offsets, np.int64)
+    if not (
+        len(positions) == len(velocities) == len(contact_flags) == len(min_distances)
+    ) or offsets[-1] != len(positions):
+        raise ValueError("evaluate: inconsistent number of steps")
+    return positions, velocities, contact_flags, min_distances, offsets
+
+
+def evaluate_batch(
+    positions,
+    velocities,
+    contact_flags,
+    min_distances,
+    target,
+    offsets=None,
+    target_distance_z_epsilon: float = 0.05,
+) -> typing.List[BallStatus]:
+    """
+    Batch version of evaluate. The episodes are either provided as
+    (nb_episodes, nb_steps, ...) arrays (all episodes having the same
+    number of steps), or concatenated, offsets then being the index of
+    the first step of each episode, followed by the total number of
+    steps. target is either a single position, or one position per
+    episode. All episodes are evaluated with array operations over all
+    their steps. Returns one BallStatus per episode.
+    """
+    import numpy as np
+
+    positions, velocities, contact_flags, min_distances, offsets = _pack_episodes(
+        positions, velocities, contact_flags, min_distances, offsets
+    )
+    nb_episodes = len(offsets) - 1
+    sizes = np.diff(offsets)
+    single_target = np.ndim(target) == 1
+    targets = np.broadcast_to(np.asarray(target, np.float64), (nb_episodes, 3))
+    episodes = np.repeat(np.arange(nb_episodes), sizes)
+    steps = np.arange(len(positions))
+    not_empty = sizes > 0
+    starts = offsets[:-1][not_empty]
+
+    def _reduce(ufunc, values, default):
+        # per episode reduction (default for empty episodes)
+        reduced = np.full(nb_episodes, default, values.dtype)
+        if starts.size:
+            reduced[not_empty] = ufunc.reduceat(values, starts)
+        return reduced
+
+    min_z = _reduce(np.minimum, positions[:, 2], np.inf)
+    max_y = _reduce(np.maximum, positions[:, 1], -np.inf)
+
+    # steps from the first contact with the racket (included)
+    first_contacts = _reduce(
+        np.minimum, np.where(contact_flags, steps, len(steps)), len(steps)
+    )
+    hit_racket = first_contacts < len(steps)
+    post_contact = steps >= first_contacts[episodes]
+
+    # distance to the target, for the post contact steps at the
+    # height of the target. Operations in the same order as
+    # _distance, for bit compatibility.
+    differences = targets[episodes] - positions
+    squares = differences**2
+    distances = np.sqrt(squares[:, 0] + squares[:, 1] + squares[:, 2])
+    at_target = post_contact & (
+        np.abs(positions[:, 2] - targets[episodes, 2]) <= target_distance_z_epsilon
+    )
+    distances = np.where(at_target, distances, np.inf)
+    min_distances_target = _reduce(np.minimum, distances, np.inf)
+    # BallStatus keeps the last position at the minimal distance
+    closest = _reduce(
+        np.maximum,
+        np.where(at_target & (distances == min_distances_target[episodes]), steps, -1),
+        -1,
+    )
+
+    squares = velocities**2
+    speeds = np.sqrt(squares[:, 0] + squares[:, 1] + squares[:, 2])
+    max_speeds = _reduce(np.maximum, np.where(post_contact, speeds, 0.0), 0.0)
+
+    statuses = []
+    for episode in range(nb_episodes):
+        status = BallStatus(target if single_target else targets[episode].tolist())
+        status.target_distance_z_epsilon = target_distance_z_epsilon
+        size = sizes[episode]
+        if size:
+            last = offsets[episode + 1] - 1
+            status.min_z = float(min_z[episode])
+            status.max_y = float(max_y[episode])
+            status.ball_position = positions[last].tolist()
+            status.ball_velocity = velocities[last].tolist()
+            if hit_racket[episode]:
+                status.hit_racket = True
+                status.min_distance_ball_racket = None
+            else:
+                status.min_distance_ball_racket = float(min_distances[last])
+            status.min_distance_ball_target = float(min_distances_target[episode])
+            if closest[episode] >= 0:
+                status.min_position_ball_target = positions[closest[episode]].tolist()
+            if max_speeds[episode] > 0:
+                status.max_ball_velocity = float(max_speeds[episode])
+        statuses.append(status)
+    return statuses
+
+
+def evaluate(
+    positions,
+    velocities,
+    contact_flags,
+    min_distances,
+    target,
+    target_distance_z_epsilon: float = 0.05,
+) -> BallStatus:
+    """
+    Returns the BallStatus resulting from the successive calls to
+    BallStatus.update over an episode, i.e. over the ball positions
+    and velocities (one row per step), the flags of contact with the
+    racket and the minimal distances ball/racket (as provided by the
+    instances of context.ContactInformation, one per step), but computed
+    with array operations over the whole episode. The results are
+    bit-compatible with the ones of BallStatus (for values provided
+    as python floats, i.e. float64).
+    """
+    import numpy as np
+
+    positions = np.asarray(positions, np.float64)
+    return evaluate_batch(
+        positions[np.newaxis],
+        np.asarray(velocities, np.float64)[np.newaxis],
+        np.asarray(contact_flags, bool)[np.newaxis],
+        np.asarray(min_distances, np.float64)[np.newaxis],
+        target,
+        target_distance_z_epsilon=target_distance_z_epsilon,
+    )[0]
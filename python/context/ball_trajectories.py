@@ -7,47 +7,377 @@ It also provides method for generating ball trajectories.
 # for typing
 from __future__ import annotations
 import typing
-import nptyping as npt
 
-import random
+import os
+import re
+import sys
 import math
+import mmap
+import time
+import queue
+import fcntl
+import functools
+import random
+import hashlib
+import io
 import pathlib
-import h5py
+import tempfile
+import weakref
+import threading
+import contextlib
+import collections
+import concurrent.futures
+from multiprocessing import shared_memory, resource_tracker
 import numpy as np
 
-import o80
-import pam_configuration
-import tennicam_client
+# h5py, o80, pam_configuration and tennicam_client are imported by
+# the functions using them, and the type aliases (which depend on
+# nptyping, see _types) when first accessed (see __getattr__), so that
+# importing this module is fast
+if typing.TYPE_CHECKING:
+    import h5py
+    import nptyping as npt
+    from ._types import (  # noqa: F401 (aliases also used by other modules)
+        Trajectory,
+        TimeStamps,
+        Durations,
+        Trajectories,
+        StampedTrajectory,
+        StampedTrajectories,
+        DurationTrajectory,
+        DurationTrajectories,
+        DurationPoint,
+        Offsets,
+        PackedStampedTrajectories,
+        PackedDurationTrajectories,
+    )
+
+_TYPE_ALIASES = (
+    "Trajectory",
+    "TimeStamps",
+    "Durations",
+    "Trajectories",
+    "StampedTrajectory",
+    "StampedTrajectories",
+    "DurationTrajectory",
+    "DurationTrajectories",
+    "DurationPoint",
+    "Offsets",
+    "PackedStampedTrajectories",
+    "PackedDurationTrajectories",
+)
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in _TYPE_ALIASES:
+        from . import _types
+
+        value = getattr(_types, name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+
+
+class TrajectorySummary(typing.NamedTuple):
+    """
+    Summary of a stamped trajectory: number of points, duration
+    (microseconds), first and last positions, bounding box (min and
+    max positions) and maximal speed (meters per second, estimated
+    by finite differences).
+    """
+
+    nb_points: int
+    duration_us: int
+    first_position: typing.Tuple[float, float, float]
+    last_position: typing.Tuple[float, float, float]
+    min_position: typing.Tuple[float, float, float]
+    max_position: typing.Tuple[float, float, float]
+    max_speed: float
+
+
+# numpy version of TrajectorySummary, as stored in the hdf5 file
+_SUMMARY_DTYPE = np.dtype(
+    [
+        ("nb_points", np.int64),
+        ("duration_us", np.int64),
+        ("first_position", np.float64, (3,)),
+        ("last_position", np.float64, (3,)),
+        ("min_position", np.float64, (3,)),
+        ("max_position", np.float64, (3,)),
+        ("max_speed", np.float64),
+    ]
+)
+
+
+class StorageOptions(typing.NamedTuple):
+    """
+    How the datasets of a group are stored in the hdf5 file.
+
+    Attributes
+    ----------
+    chunks:
+      number of points per chunk (None: contiguous storage, unless
+      compression is used, in which case h5py selects the chunk shape)
+    compression:
+      compression filter ("gzip" or "lzf"), or None
+    compression_level:
+      compression level (0 to 9, gzip only), None for the default level
+    shuffle:
+      if True, the shuffle filter is applied before compression
+    stamp_dtype:
+      numpy dtype of the stored time stamps (e.g. "uint32", enough for
+      trajectories of less than 71 minutes), None for keeping the dtype
+      of the time stamps provided when writing
+    """
+
+    chunks: typing.Optional[int] = None
+    compression: typing.Optional[str] = None
+    compression_level: typing.Optional[int] = None
+    shuffle: bool = False
+    stamp_dtype: typing.Optional[str] = None
+
+    def dataset_kwargs(self, data: npt.NDArray) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the keyword arguments to pass to h5py's create_dataset
+        for storing the data.
+        """
+        kwargs: typing.Dict[str, typing.Any] = {}
+        if self.chunks is not None and len(data) > 0:
+            kwargs["chunks"] = (min(self.chunks, len(data)),) + data.shape[1:]
+        if self.compression is not None:
+            kwargs["compression"] = self.compression
+            if self.compression_level is not None:
+                kwargs["compression_opts"] = self.compression_level
+        if self.shuffle:
+            kwargs["shuffle"] = True
+        return kwargs
+
+    def convert_stamps(self, time_stamps: TimeStamps) -> npt.NDArray:
+        """
+        Returns the time stamps casted to stamp_dtype, or raise
+        a ValueError if some time stamps can not be represented
+        with this dtype.
+        """
+        time_stamps = np.asarray(time_stamps)
+        if self.stamp_dtype is None:
+            return time_stamps
+        dtype = np.dtype(self.stamp_dtype)
+        if time_stamps.size and dtype.kind in "iu":
+            info = np.iinfo(dtype)
+            if time_stamps.min() < info.min or time_stamps.max() > info.max:
+                raise ValueError(
+                    "time stamps can not be stored as {}".format(self.stamp_dtype)
+                )
+        return time_stamps.astype(dtype)
+
+
+class CacheInfo(typing.NamedTuple):
+    """
+    Statistics of the cache of decoded trajectories
+    used by BallTrajectories in lazy mode.
+    """
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class CleaningParameters(typing.NamedTuple):
+    """
+    Configuration of the cleaning of raw recordings (see clean_trajectory).
+    Setting an attribute to None disables the corresponding step.
+
+    Attributes
+    ----------
+    max_speed:
+      samples implying a speed (meters per second) above this value
+      with both their previous and next samples are rejected as outliers
+    max_gap_us:
+      trajectories are split where two successive samples are more
+      than max_gap_us microseconds apart
+    min_flight_speed:
+      trajectories are trimmed to the flight phase, i.e. from the first
+      to the last sample moving faster than min_flight_speed (meters per
+      second), removing the pre-throw and post-landing tails
+    min_points:
+      trajectories with less points are discarded
+    """
+
+    max_speed: typing.Optional[float] = 50.0
+    max_gap_us: typing.Optional[int] = 100000
+    min_flight_speed: typing.Optional[float] = 0.5
+    min_points: int = 10
+
+
+class StageStats(typing.NamedTuple):
+    """
+    Statistics of a stage of the reading or writing of
+    trajectories, as recorded by Profiler.
+    """
+
+    calls: int
+    time_s: float
+    bytes_read: int
+    bytes_written: int
+    trajectories: int
+
+
+class ProfileStats(typing.NamedTuple):
+    """
+    Statistics recorded when profiling RecordedBallTrajectories,
+    MutableRecordedBallTrajectories or BallTrajectories (see their
+    profile argument), per stage:
+
+    - open: opening of the hdf5 file
+    - list_files: listing of the files to import (add_* methods)
+    - parse: parsing (and cleaning) of the files to import
+    - read: reading of trajectories from the hdf5 file
+    - convert: conversion of trajectories to (or from) the packed
+      form, or from json trajectories to stamped trajectories
+    - write: writing of trajectories to the hdf5 file
+    - shared: creation of (or attachment to) the shared memory
+      hosting the trajectories (BallTrajectories in shared mode)
+
+    (bytes read by the parse stage are the sizes of the parsed files)
+    """
+
+    stages: typing.Dict[str, StageStats]
+
+    def report(self) -> str:
+        """
+        Returns the statistics as a (printable) table.
+        """
+        lines = [
+            "{:12} {:>8} {:>12} {:>15} {:>15} {:>12}".format(
+                "stage",
+                "calls",
+                "time (s)",
+                "read (bytes)",
+                "written (bytes)",
+                "trajectories",
+            )
+        ]
+        for name, stats in self.stages.items():
+            lines.append(
+                "{:12} {:>8} {:>12.6f} {:>15} {:>15} {:>12}".format(name, *stats)
+            )
+        return "\n".join(lines)
+
+
+class _Stage:
+    """
+    Context manager timing a stage (see Profiler.stage).
+    """
+
+    __slots__ = ("_values", "_start")
+
+    def __init__(self, values: typing.List[typing.Any]):
+        self._values = values
+        self._start = 0.0
+
+    def __enter__(self) -> _Stage:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._values[0] += 1
+        self._values[1] += time.perf_counter() - self._start
+
+    def add(self, bytes_read: int = 0, bytes_written: int = 0, trajectories: int = 0):
+        """
+        Adds to the stage statistics the quantities of data processed.
+        """
+        self._values[2] += bytes_read
+        self._values[3] += bytes_written
+        self._values[4] += trajectories
+
+
+class Profiler:
+    """
+    Records, per stage (see ProfileStats), the wall time, the bytes
+    read and written and the number of trajectories processed.
+    A stage is timed via:
+
+    ```
+    with profiler.stage(name) as stage:
+        ...
+        stage.add(bytes_read=..., trajectories=...)
+    ```
+
+    An instance may be shared by several RecordedBallTrajectories
+    or BallTrajectories instances (see their profile argument),
+    the statistics then being accumulated.
+    """
+
+    # False for the profiler used when profiling is disabled,
+    # which records nothing
+    enabled = True
 
+    def __init__(self):
+        self._stages: typing.Dict[str, typing.List[typing.Any]] = {}
 
-assert int(npt.__version__[0]) >= 2, "Need nptyping >=2."
+    def stage(self, name: str) -> _Stage:
+        try:
+            values = self._stages[name]
+        except KeyError:
+            values = [0, 0.0, 0, 0, 0]
+            self._stages[name] = values
+        return _Stage(values)
 
-# 3: 3d position , Any: nb of points in trajectory
-Trajectory = npt.NDArray[npt.Shape["*, 3"], npt.Float32]
+    def stats(self) -> ProfileStats:
+        return ProfileStats(
+            {name: StageStats(*values) for name, values in self._stages.items()}
+        )
+
+    def reset(self) -> None:
+        self._stages.clear()
+
+
+class _NullStage:
+    """
+    Stage of _NullProfiler, doing nothing.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> _NullStage:
+        return self
+
+    def __exit__(self, type, value, traceback):
+        pass
+
+    def add(self, bytes_read: int = 0, bytes_written: int = 0, trajectories: int = 0):
+        pass
+
+
+class _NullProfiler(Profiler):
+    """
+    Profiler recording nothing, used when profiling is disabled.
+    """
 
-# List of time stamps, in microseconds
-TimeStamps = npt.NDArray[
-    npt.Shape["*"],
-    npt.UInt,
-]
+    enabled = False
 
-# List of time durations, in microseconds
-Durations = npt.NDArray[
-    npt.Shape["*"],
-    npt.UInt,
-]
+    def stage(self, name: str) -> _Stage:
+        return typing.cast(_Stage, _NULL_STAGE)
 
-# set of trajectories
-Trajectories = typing.Sequence[Trajectory]
+    def stats(self) -> ProfileStats:
+        return ProfileStats({})
 
-# trajectories and related time stamps
-StampedTrajectory = typing.Tuple[TimeStamps, Trajectory]
-StampedTrajectories = typing.Sequence[StampedTrajectory]
 
-# durations (microseconds), positions, velocities
-DurationTrajectory = typing.Tuple[Durations, Trajectory, Trajectory]
-DurationTrajectories = typing.Sequence[DurationTrajectory]
-DurationPoint = typing.Tuple[np.uint, o80.Item3dState]
+_NULL_STAGE = _NullStage()
+_NULL_PROFILER = _NullProfiler()
+
+
+def _profiler(profile: typing.Union[bool, Profiler]) -> Profiler:
+    """
+    Returns the profiler corresponding to the profile argument of
+    RecordedBallTrajectories and BallTrajectories, i.e. either
+    a profiler instance, or True (new profiler) or False (disabled).
+    """
+    if isinstance(profile, Profiler):
+        return profile
+    return Profiler() if profile else _NULL_PROFILER
 
 
 def _list_files(
@@ -69,6 +399,530 @@ def _list_files(
     return paths
 
 
+_Item = typing.TypeVar("_Item")
+_Result = typing.TypeVar("_Result")
+
+
+def _parallel_map(
+    function: typing.Callable[[_Item], _Result],
+    items: typing.Sequence[_Item],
+    jobs: typing.Optional[int] = 1,
+) -> typing.List[_Result]:
+    """
+    Returns [function(item) for item in items]. If jobs is larger
+    than 1, the calls are distributed over a pool of (at most) jobs
+    processes (function must then be picklable, i.e. defined at the
+    top level of a module). If jobs is None, one process per CPU is used.
+    The order of the results is the order of the items.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 1:
+        raise ValueError("number of jobs should be at least 1 ({} given)".format(jobs))
+    jobs = min(jobs, len(items))
+    if jobs <= 1:
+        return [function(item) for item in items]
+    # several items per task, to amortize the inter-process communication
+    chunksize = max(1, len(items) // (jobs * 4))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(function, items, chunksize=chunksize))
+
+
+def _read_tennicam_trajectory(tennicam_file: pathlib.Path) -> StampedTrajectory:
+    """
+    Parse the file (as generated by tennicam_client_logger) and
+    returned the corresponding stamped trajectory. Time stamps are
+    converted to microseconds and start at 0, and observations
+    with a negative ball id are ignored.
+    """
+    import tennicam_client
+
+    parsed = [
+        (ball_id, time_stamp, position)
+        for ball_id, time_stamp, position, _ in tennicam_client.parse(tennicam_file)
+    ]
+    if not parsed:
+        return np.zeros(0, np.uint), np.zeros((0, 3), np.float32)
+    ball_ids, time_stamps, positions = zip(*parsed)
+    valid = np.array(ball_ids) >= 0
+    # from nano to micro seconds
+    stamps = (np.array(time_stamps, np.float64)[valid] * 1e-3).astype(np.int64)
+    if stamps.size:
+        stamps -= stamps[0]
+    trajectory = np.array(positions, np.float32).reshape(-1, 3)[valid]
+    return stamps.astype(np.uint), trajectory
+
+
+def _speeds(time_stamps: npt.NDArray, positions: npt.NDArray) -> npt.NDArray:
+    """
+    Returns the speeds (meters per second) between successive samples.
+    """
+    distances = np.linalg.norm(np.diff(positions.astype(np.float64), axis=0), axis=1)
+    durations = np.diff(time_stamps.astype(np.int64)) * 1e-6
+    return np.divide(
+        distances, durations, out=np.full(len(distances), np.inf), where=durations > 0
+    )
+
+
+def clean_trajectory(
+    stamped_trajectory: StampedTrajectory,
+    parameters: CleaningParameters = CleaningParameters(),
+) -> StampedTrajectories:
+    """
+    Clean a raw recording, which may result in 0, 1 or several
+    trajectories. The steps are (see CleaningParameters):
+    removal of duplicated (or non increasing) time stamps, rejection of
+    outliers, splitting at large gaps, trimming to the flight phase and
+    rejection of trajectories with too few points. The time stamps of the
+    returned trajectories start at 0.
+    """
+    time_stamps = np.asarray(stamped_trajectory[0]).astype(np.int64)
+    positions = np.asarray(stamped_trajectory[1], np.float32).reshape(-1, 3)
+
+    # duplicated time stamps: keeping only the samples more recent
+    # than all the previous ones
+    if len(time_stamps) > 1:
+        keep = np.ones(len(time_stamps), bool)
+        keep[1:] = time_stamps[1:] > np.maximum.accumulate(time_stamps)[:-1]
+        time_stamps, positions = time_stamps[keep], positions[keep]
+
+    # outliers: samples "far" (too fast) from both their neighbours, or,
+    # for the extremities, far from a neighbour which is itself consistent
+    # with its other neighbour (repeated, as removing an outlier may
+    # uncover another one)
+    if parameters.max_speed is not None:
+        while len(time_stamps) > 2:
+            too_fast = _speeds(time_stamps, positions) > parameters.max_speed
+            outliers = np.zeros(len(time_stamps), bool)
+            outliers[1:-1] = too_fast[:-1] & too_fast[1:]
+            outliers[0] = too_fast[0] and not too_fast[1]
+            outliers[-1] = too_fast[-1] and not too_fast[-2]
+            if not outliers.any():
+                break
+            time_stamps, positions = time_stamps[~outliers], positions[~outliers]
+
+    # splitting at gaps
+    if parameters.max_gap_us is not None and len(time_stamps) > 1:
+        splits = np.flatnonzero(np.diff(time_stamps) > parameters.max_gap_us) + 1
+    else:
+        splits = np.zeros(0, np.int64)
+    segments = zip(np.split(time_stamps, splits), np.split(positions, splits))
+
+    cleaned: StampedTrajectories = []
+    for segment_stamps, segment_positions in segments:
+        # trimming to the flight phase
+        if parameters.min_flight_speed is not None and len(segment_stamps) > 1:
+            speeds = _speeds(segment_stamps, segment_positions)
+            moving = np.flatnonzero(speeds >= parameters.min_flight_speed)
+            if not moving.size:
+                continue
+            segment_stamps = segment_stamps[moving[0] : moving[-1] + 2]
+            segment_positions = segment_positions[moving[0] : moving[-1] + 2]
+        if len(segment_stamps) < max(parameters.min_points, 1):
+            continue
+        cleaned.append(
+            ((segment_stamps - segment_stamps[0]).astype(np.uint), segment_positions)
+        )
+    return cleaned
+
+
+def _read_clean_tennicam_trajectories(
+    parameters: CleaningParameters, tennicam_file: pathlib.Path
+) -> StampedTrajectories:
+    """
+    Parse the file (see _read_tennicam_trajectory) and clean the
+    recording (see clean_trajectory).
+    """
+    return clean_trajectory(_read_tennicam_trajectory(tennicam_file), parameters)
+
+
+# start of the "ob" array in a json trajectory file, i.e. 'ob': [
+_JSON_OB_KEY = re.compile(rb"""["']ob["']\s*:\s*\[""")
+# end of an empty array
+_JSON_EMPTY_ARRAY = re.compile(rb"\s*\]")
+# end of a 2d array, i.e. ]]
+_JSON_ARRAY_END = re.compile(rb"\]\s*\]")
+# characters that may be found in a list of (comma separated) floats
+_JSON_NUMBER_CHARS = b"0123456789+-.eEnaifNAIF,\t\r\n "
+# new lines (replaced by spaces, rows being then separated by new lines)
+_JSON_NO_NEWLINES = bytes.maketrans(b"\r\n", b"  ")
+# separation between two rows (once the opening brackets removed), i.e. ] ,
+_JSON_ROW_SEPARATOR = re.compile(rb"\]\s*,")
+# (approximate) number of bytes of the "ob" array parsed at once
+_JSON_BLOCK_SIZE = 1 << 20
+
+
+def _parse_json_rows(
+    content: mmap.mmap,
+    start: int,
+    end: int,
+    nb_columns: int,
+    trajectory: Trajectory,
+    json_file: pathlib.Path,
+) -> int:
+    """
+    Parse the rows of the "ob" array found between start and end
+    (the opening bracket of the first row and the closing bracket
+    of the last row) into trajectory (3 first columns only), one
+    block of complete rows at a time: the block is reshaped into one
+    line per row, the number of values of each row is checked and the
+    lines are decoded by np.loadtxt. Returns the number of parsed rows.
+    """
+    nb_rows = 0
+    while start < end:
+        # block ending with a complete row
+        block_end = content.rfind(b"]", start, min(start + _JSON_BLOCK_SIZE, end))
+        if block_end < 0:
+            block_end = content.find(b"]", start, end)
+        block = content[start : block_end + 1]
+        rows = block.count(b"[")
+        # one line per row: "x, y, z, ...\n x, y, z, ...\n ..."
+        block = block.translate(_JSON_NO_NEWLINES, b"[")[:-1].replace(b"],", b"\n")
+        if b"]" in block:
+            # (spaces between the end of a row and the comma)
+            block = _JSON_ROW_SEPARATOR.sub(b"\n", block + b"]")[:-1]
+        if block.translate(None, _JSON_NUMBER_CHARS):
+            raise ValueError("unexpected 'ob' array in {}".format(json_file))
+        # number of values of each row
+        chars = np.frombuffer(block, np.uint8)
+        commas = np.flatnonzero(chars == ord(","))
+        row_ends = np.append(np.flatnonzero(chars == ord("\n")), len(chars))
+        if len(row_ends) != rows or np.any(
+            np.diff(np.searchsorted(commas, row_ends), prepend=0) != nb_columns - 1
+        ):
+            raise ValueError("inconsistent row sizes of 'ob' in {}".format(json_file))
+        if nb_rows + rows > len(trajectory):
+            raise ValueError("unexpected 'ob' array in {}".format(json_file))
+        trajectory[nb_rows : nb_rows + rows] = np.loadtxt(
+            io.BytesIO(block), delimiter=",", usecols=(0, 1, 2), ndmin=2
+        )
+        nb_rows += rows
+        # opening bracket of the next row
+        start = content.find(b"[", block_end, end)
+        if start < 0:
+            break
+    return nb_rows
+
+
+def parse_json_trajectory(json_file: pathlib.Path) -> Trajectory:
+    """
+    Parse the json file and return the trajectory it hosts, i.e.
+    the 3 first columns (positions) of the 2d array associated with
+    the "ob" key. The file is memory mapped and the array is decoded
+    by numpy block by block (see _JSON_BLOCK_SIZE) into a preallocated
+    array, without evaluating the content of the file nor copying it
+    entirely. Raises a ValueError if the file does not host
+    a (well formed) "ob" array.
+    """
+    with open(json_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("failed to find the 'ob' array in {}".format(json_file))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            key = _JSON_OB_KEY.search(content)
+            if key is None:
+                raise ValueError(
+                    "failed to find the 'ob' array in {}".format(json_file)
+                )
+            start = key.end()
+            if _JSON_EMPTY_ARRAY.match(content, start):
+                return np.zeros((0, 3), np.float32)
+            end = _JSON_ARRAY_END.search(content, start)
+            if end is None:
+                raise ValueError(
+                    "failed to find the end of 'ob' in {}".format(json_file)
+                )
+            # first pass: number of rows, i.e. of "[" in
+            # "[x, y, z, ...], [x, y, z, ...], ..., [x, y, z, ...]"
+            end = end.start() + 1
+            nb_rows = 0
+            for block_start in range(start, end, _JSON_BLOCK_SIZE):
+                block_end = min(block_start + _JSON_BLOCK_SIZE, end)
+                nb_rows += content[block_start:block_end].count(b"[")
+            first = content.find(b"[", start, end)
+            if first < 0:
+                raise ValueError("unexpected 'ob' array in {}".format(json_file))
+            nb_columns = content[first : content.find(b"]", first, end)].count(b",") + 1
+            if nb_columns < 3:
+                raise ValueError("unexpected 'ob' array in {}".format(json_file))
+            # second pass: parsing the values
+            trajectory = np.empty((nb_rows, 3), np.float32)
+            nb_parsed = _parse_json_rows(
+                content, first, end, nb_columns, trajectory, json_file
+            )
+            if nb_parsed != nb_rows:
+                raise ValueError("unexpected 'ob' array in {}".format(json_file))
+    return trajectory
+
+
+def pack(stamped_trajectories: StampedTrajectories) -> PackedStampedTrajectories:
+    """
+    Concatenates the stamped trajectories into two contiguous
+    arrays (time stamps and positions), and returns them along
+    with the offsets of each trajectory.
+    """
+    sizes = [len(stamps) for stamps, _ in stamped_trajectories]
+    offsets = np.zeros(len(sizes) + 1, np.int64)
+    offsets[1:] = np.cumsum(sizes)
+    if not sizes:
+        return np.zeros(0, np.uint), np.zeros((0, 3), np.float32), offsets
+    stamps = np.concatenate([stamps for stamps, _ in stamped_trajectories])
+    positions = np.concatenate(
+        [positions for _, positions in stamped_trajectories]
+    ).astype(np.float32, copy=False)
+    return stamps, positions, offsets
+
+
+def unpack(packed: PackedStampedTrajectories) -> typing.List[StampedTrajectory]:
+    """
+    Inverse of the pack function. The returned arrays are views
+    over the packed arrays.
+    """
+    stamps, positions, offsets = packed
+    return [
+        (stamps[start:end], positions[start:end])
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+def summarize_packed(packed: PackedStampedTrajectories) -> npt.NDArray:
+    """
+    Returns the summaries of all the packed trajectories, as a structured
+    numpy array with one row per trajectory and one field per attribute
+    of TrajectorySummary (positions of empty trajectories are NaN).
+    """
+    stamps, positions, offsets = packed
+    stamps = np.asarray(stamps).astype(np.int64)
+    positions = np.asarray(positions, np.float64)
+    sizes = np.diff(offsets)
+    summaries = np.zeros(len(sizes), _SUMMARY_DTYPE)
+    summaries["nb_points"] = sizes
+    for field in ("first_position", "last_position", "min_position", "max_position"):
+        summaries[field] = np.nan
+    not_empty = sizes > 0
+    if not np.any(not_empty):
+        return summaries
+    firsts = offsets[:-1][not_empty]
+    lasts = offsets[1:][not_empty] - 1
+    summaries["duration_us"][not_empty] = stamps[lasts] - stamps[firsts]
+    summaries["first_position"][not_empty] = positions[firsts]
+    summaries["last_position"][not_empty] = positions[lasts]
+    # empty trajectories have no point in the packed arrays, so each
+    # segment starting at a non empty trajectory covers exactly it
+    summaries["min_position"][not_empty] = np.minimum.reduceat(positions, firsts)
+    summaries["max_position"][not_empty] = np.maximum.reduceat(positions, firsts)
+    # speed between each point and the next one (0 for the last
+    # point of each trajectory and for duplicated time stamps)
+    speeds = np.zeros(len(stamps), np.float64)
+    dt = np.diff(stamps) * 1e-6
+    distances = np.sqrt((np.diff(positions, axis=0) ** 2).sum(axis=1))
+    np.divide(distances, dt, out=speeds[:-1], where=dt > 0)
+    speeds[lasts] = 0.0
+    summaries["max_speed"][not_empty] = np.maximum.reduceat(speeds, firsts)
+    return summaries
+
+
+def _to_summary(summary: np.void) -> TrajectorySummary:
+    """
+    Converts a row of the output of summarize_packed
+    to an instance of TrajectorySummary.
+    """
+    return TrajectorySummary(
+        int(summary["nb_points"]),
+        int(summary["duration_us"]),
+        *[
+            typing.cast(typing.Tuple[float, float, float], tuple(summary[field]))
+            for field in (
+                "first_position",
+                "last_position",
+                "min_position",
+                "max_position",
+            )
+        ],
+        float(summary["max_speed"]),
+    )
+
+
+def summarize(stamped_trajectory: StampedTrajectory) -> TrajectorySummary:
+    """
+    Returns the summary of the trajectory.
+    """
+    return _to_summary(summarize_packed(pack([stamped_trajectory]))[0])
+
+
+# kinds of events (see detect_events)
+EVENT_BOUNCE = 0
+EVENT_RACKET_HIT = 1
+EVENT_LANDING = 2
+
+# events, as returned by detect_events and stored in the hdf5 file
+EVENT_DTYPE = np.dtype(
+    [
+        ("trajectory", np.int64),
+        ("kind", np.int8),
+        ("index", np.int64),
+        ("time_stamp", np.int64),
+        ("position", np.float64, (3,)),
+    ]
+)
+
+
+def detect_events(
+    packed: PackedStampedTrajectories,
+    contact_flags: typing.Optional[npt.NDArray] = None,
+    table_height: typing.Optional[float] = None,
+    tolerance: float = 0.05,
+) -> npt.NDArray:
+    """
+    Detects, in one pass over all the packed trajectories, the events:
+
+    - EVENT_BOUNCE: the ball going down then up (at table_height
+      +/- tolerance, if table_height is not None)
+    - EVENT_RACKET_HIT: the first point of each sequence of points
+      flagged as a contact with the racket (contact_flags, one boolean
+      per point) or, if no contact flags are provided, the ball
+      reversing its direction along y
+    - EVENT_LANDING: the first bounce following each racket hit (and
+      preceding the next hit)
+
+    Returns a structured array (EVENT_DTYPE) with one row per event:
+    the index of the trajectory, the kind of event, the index of the
+    point in the trajectory, its time stamp and its position, sorted
+    per trajectory then per point.
+    """
+    stamps, positions, offsets = packed
+    stamps = np.asarray(stamps).astype(np.int64)
+    positions = np.asarray(positions, np.float64)
+    offsets = np.asarray(offsets, np.int64)
+    sizes = np.diff(offsets)
+    total = len(stamps)
+    trajectories = np.repeat(np.arange(len(sizes)), sizes)
+    indexes = np.arange(total)
+    firsts = offsets[:-1][trajectories]
+    lasts = offsets[1:][trajectories] - 1
+
+    # displacement from the previous point and to the next point
+    # (0 at the extremities of each trajectory)
+    before = np.zeros((total, 3))
+    after = np.zeros((total, 3))
+    if total > 1:
+        differences = np.diff(positions, axis=0)
+        inner = indexes[:-1] < lasts[:-1]
+        after[:-1][inner] = differences[inner]
+        inner = indexes[1:] > firsts[1:]
+        before[1:][inner] = differences[inner]
+
+    bounces = (before[:, 2] < 0) & (after[:, 2] > 0)
+    if table_height is not None:
+        bounces &= np.abs(positions[:, 2] - table_height) <= tolerance
+
+    if contact_flags is not None:
+        flags = np.asarray(contact_flags, bool)
+        if len(flags) != total:
+            raise ValueError(
+                "detect_events: {} contact flags for {} points".format(
+                    len(flags), total
+                )
+            )
+        hits = flags.copy()
+        hits[1:] &= ~flags[:-1] | (indexes[1:] == firsts[1:])
+    else:
+        hits = before[:, 1] * after[:, 1] < 0
+
+    # landing: first bounce after each hit, if before the next hit
+    # (and in the same trajectory)
+    bounce_indexes = np.flatnonzero(bounces)
+    hit_indexes = np.flatnonzero(hits)
+    candidates = np.searchsorted(bounce_indexes, hit_indexes, side="right")
+    found = candidates < len(bounce_indexes)
+    landing_indexes = bounce_indexes[candidates[found]]
+    next_hits = np.append(hit_indexes[1:], total)[found]
+    valid = (landing_indexes < next_hits) & (
+        trajectories[landing_indexes] == trajectories[hit_indexes[found]]
+    )
+    landing_indexes = landing_indexes[valid]
+
+    kinds = np.concatenate(
+        (
+            np.full(len(bounce_indexes), EVENT_BOUNCE, np.int8),
+            np.full(len(hit_indexes), EVENT_RACKET_HIT, np.int8),
+            np.full(len(landing_indexes), EVENT_LANDING, np.int8),
+        )
+    )
+    points = np.concatenate((bounce_indexes, hit_indexes, landing_indexes))
+    order = np.lexsort((kinds, points))
+    kinds, points = kinds[order], points[order]
+    events = np.zeros(len(points), EVENT_DTYPE)
+    events["trajectory"] = trajectories[points]
+    events["kind"] = kinds
+    events["index"] = points - offsets[:-1][trajectories[points]]
+    events["time_stamp"] = stamps[points]
+    events["position"] = positions[points]
+    return events
+
+
+def rotation_matrix(alpha: float, beta: float, gamma: float) -> npt.NDArray:
+    """
+    Returns the 3x3 rotation matrix corresponding to the rotations
+    around x (alpha), y (beta) and z (gamma), using the same convention
+    as context::Rotation (i.e. Rx * Ry * Rz).
+    """
+    ca, sa = math.cos(alpha), math.sin(alpha)
+    cb, sb = math.cos(beta), math.sin(beta)
+    cg, sg = math.cos(gamma), math.sin(gamma)
+    rx = np.array([[1.0, 0.0, 0.0], [0.0, ca, -sa], [0.0, sa, ca]])
+    ry = np.array([[cb, 0.0, sb], [0.0, 1.0, 0.0], [-sb, 0.0, cb]])
+    rz = np.array([[cg, -sg, 0.0], [sg, cg, 0.0], [0.0, 0.0, 1.0]])
+    return rx @ ry @ rz
+
+
+def transform_positions(
+    positions: Trajectory, rotation: npt.NDArray, translation: typing.Sequence[float]
+) -> Trajectory:
+    """
+    Returns the positions (one per row) rotated then translated
+    (as context::Transform), computed in double precision and returned
+    with the dtype of the input.
+    """
+    positions = np.asarray(positions)
+    transformed = positions.astype(np.float64) @ np.asarray(rotation).T
+    transformed += np.asarray(translation, np.float64)
+    return transformed.astype(positions.dtype, copy=False)
+
+
+def _transform_dataset(
+    dset: h5py.Dataset,
+    offsets: Offsets,
+    rotation: npt.NDArray,
+    translation: typing.Sequence[float],
+    chunk_size: int,
+) -> typing.Tuple[npt.NDArray, npt.NDArray]:
+    """
+    Transforms in place the positions of the dataset, chunk_size
+    rows at a time. Returns the min and max positions of each
+    trajectory (as delimited by the offsets) after transformation.
+    """
+    nb_trajectories = len(offsets) - 1
+    mins = np.full((nb_trajectories, 3), np.inf)
+    maxs = np.full((nb_trajectories, 3), -np.inf)
+    not_empty = np.diff(offsets) > 0
+    for start in range(0, dset.shape[0], chunk_size):
+        end = min(start + chunk_size, dset.shape[0])
+        block = transform_positions(dset[start:end], rotation, translation)
+        dset[start:end] = block
+        # trajectories (partially) in the block, and where they start in it
+        first = np.searchsorted(offsets, start, side="right") - 1
+        last = np.searchsorted(offsets, end - 1, side="right") - 1
+        indexes = np.arange(first, last + 1)
+        starts = np.maximum(offsets[first : last + 1], start) - start
+        keep = not_empty[indexes]
+        indexes, starts = indexes[keep], starts[keep]
+        mins[indexes] = np.minimum(mins[indexes], np.minimum.reduceat(block, starts))
+        maxs[indexes] = np.maximum(maxs[indexes], np.maximum.reduceat(block, starts))
+    mins[~not_empty] = np.nan
+    maxs[~not_empty] = np.nan
+    return mins, maxs
+
+
 def to_stamped_trajectory(input: DurationTrajectory) -> StampedTrajectory:
 
     """
@@ -83,16 +937,357 @@ def to_stamped_trajectory(input: DurationTrajectory) -> StampedTrajectory:
     return stamps, positions
 
 
-def to_duration_trajectory(input: StampedTrajectory) -> DurationTrajectory:
+# available velocity estimators (see estimate_velocities)
+VELOCITY_ESTIMATORS = ("forward", "central", "savgol", "velocity_compute")
+
+# default window of the estimators using one
+_DEFAULT_WINDOWS = {"savgol": 7, "velocity_compute": 1}
+
+
+def _savgol_derivative_coefficients(window: int, order: int) -> npt.NDArray:
+    """
+    Returns the (window, window) array which row j holds the coefficients
+    which, applied to window uniformly sampled values (unit period),
+    returns the derivative at sample j of the polynomial of the given
+    order fitted (least squares) to these values.
+    """
+    x = np.arange(window, dtype=np.float64)
+    powers = np.arange(order + 1)
+    fit = np.linalg.pinv(x[:, np.newaxis] ** powers)
+    derivatives = np.zeros((window, order + 1))
+    derivatives[:, 1:] = powers[1:] * x[:, np.newaxis] ** (powers[1:] - 1)
+    return derivatives @ fit
+
+
+def estimate_velocities(
+    packed: PackedStampedTrajectories,
+    estimator: str = "forward",
+    window: typing.Optional[int] = None,
+    order: int = 2,
+) -> npt.NDArray:
+    """
+    Returns the velocities (meters per second, one row per point) of
+    all the packed trajectories, estimated in a single vectorized pass by:
+
+    - "forward": forward finite differences (backward for the last point
+      of each trajectory)
+    - "central": central finite differences (one sided for the first and
+      last points of each trajectory)
+    - "savgol": Savitzky-Golay derivative filter (polynomial of given
+      order fitted over window points, default 7), assuming a uniform
+      sampling at the mean period of each trajectory. Trajectories
+      shorter than the window use central differences.
+    - "velocity_compute": the estimation performed online by
+      context.Ball (i.e. VelocityCompute): backward finite differences
+      (0 for the first point and for duplicated time stamps) averaged
+      over a moving window of (at most) window points (default 1),
+      computed as context.Ball does (same results, in meters per
+      microsecond, before conversion to meters per second).
+    """
+    if estimator not in VELOCITY_ESTIMATORS:
+        raise ValueError(
+            "unknown velocity estimator: {} (one of {})".format(
+                estimator, ", ".join(VELOCITY_ESTIMATORS)
+            )
+        )
+    if window is None:
+        window = _DEFAULT_WINDOWS.get(estimator, 1)
+    if window < 1:
+        raise ValueError("window should be at least 1 ({} given)".format(window))
+    time_stamps, positions, offsets = packed
+    time_stamps = np.asarray(time_stamps)
+    positions = np.asarray(positions)
+    total = len(time_stamps)
+    velocities = np.zeros((total, 3))
+    if total < 2:
+        return velocities
+    sizes = np.diff(offsets)
+    indexes = np.arange(total)
+    firsts = np.repeat(offsets[:-1], sizes)
+    lasts = np.repeat(offsets[1:], sizes) - 1
+
+    # finite differences between successive points (the ones
+    # between 2 trajectories are ignored)
+    dt = np.diff(time_stamps) * 1e-6
+    dp = np.diff(positions, axis=0)
+
+    if estimator == "forward":
+        following = np.minimum(indexes, np.maximum(lasts - 1, firsts))
+        ok = lasts > firsts
+        velocities[ok] = (dp[following[ok]].T / dt[following[ok]]).T
+        return velocities
+
+    if estimator == "velocity_compute":
+        # same units (meters per microsecond) and sequence of floating
+        # point operations as VelocityCompute::get and LowPassFilter::get
+        dt_us = np.diff(time_stamps.astype(np.int64)).astype(np.float64)
+        dp = np.diff(positions.astype(np.float64), axis=0)
+        differences = np.zeros((total, 3))
+        inner = indexes[1:][firsts[1:] < indexes[1:]]
+        moving = dt_us[inner - 1] != 0
+        differences[inner[moving]] = (
+            dp[inner[moving] - 1].T / dt_us[inner[moving] - 1]
+        ).T
+        # the filter keeps a running sum (subtracting the value leaving
+        # the window, then adding the new one), recomputed exactly from the
+        # window each time its ring buffer wraps around, i.e. at the last
+        # point of each block of window points
+        local = indexes - firsts
+        rows = local % window
+        sums = np.zeros((total, 3))
+        ends = indexes[rows == window - 1]
+        for shift in range(window):
+            sums[ends] += differences[ends - window + 1 + shift]
+        for row in range(window - 1):
+            points = indexes[rows == row]
+            if row > 0:
+                sums[points] = sums[points - 1]
+            else:
+                # running sum of the previous block, if any
+                full = points[local[points] >= window]
+                sums[full] = sums[full - 1]
+            full = points[local[points] >= window]
+            sums[full] -= differences[full - window]
+            sums[points] += differences[points]
+        counts = np.minimum(local + 1, window)
+        return sums / counts[:, np.newaxis] * 1e6
+
+    # central differences (also used by savgol for short trajectories)
+    previous = np.maximum(indexes - 1, firsts)
+    following = np.minimum(indexes + 1, lasts)
+    durations = (time_stamps[following].astype(np.int64) - time_stamps[previous]) * 1e-6
+    ok = durations > 0
+    velocities[ok] = (
+        (positions[following[ok]] - positions[previous[ok]]).T / durations[ok]
+    ).T
+    if estimator == "central":
+        return velocities
+
+    # savitzky-golay: for each point, the window starts at the point
+    # minus half the window, shifted to fit in its trajectory
+    long_enough = (lasts - firsts + 1) >= window
+    points = indexes[long_enough]
+    if not points.size:
+        return velocities
+    coefficients = _savgol_derivative_coefficients(window, min(order, window - 1))
+    starts = np.clip(
+        points - window // 2, firsts[long_enough], lasts[long_enough] - window + 1
+    )
+    windows = positions[starts[:, np.newaxis] + np.arange(window)]
+    trajectory_indexes = np.repeat(np.arange(len(sizes)), sizes)[long_enough]
+    periods = np.zeros(len(sizes))
+    not_single = sizes > 1
+    periods[not_single] = (
+        (
+            time_stamps[offsets[1:][not_single] - 1].astype(np.int64)
+            - time_stamps[offsets[:-1][not_single]]
+        )
+        * 1e-6
+        / (sizes[not_single] - 1)
+    )
+    periods = periods[trajectory_indexes]
+    ok = periods > 0
+    derivatives = np.einsum(
+        "nw,nwd->nd", coefficients[points - starts], windows.astype(np.float64)
+    )
+    velocities[points[ok]] = derivatives[ok] / periods[ok, np.newaxis]
+    return velocities
+
+
+def to_duration_trajectory(
+    input: StampedTrajectory,
+    estimator: str = "forward",
+    window: typing.Optional[int] = None,
+) -> DurationTrajectory:
     """
     Converts a StampedTrajectories to a DurationTrajectory.
-    The velocities are estimated by performing finite differences.
+    The velocities are estimated by performing finite differences
+    (see estimate_velocities for the other estimators).
     """
     dt = np.diff(input[0])
-    dp = np.diff(input[1], axis=0)
-    velocities = (dp.T / (dt * 1e-6)).T
     positions = input[1][:-1, :]
-    return dt, positions, velocities
+    if estimator == "forward":
+        dp = np.diff(input[1], axis=0)
+        velocities = (dp.T / (dt * 1e-6)).T
+        return dt, positions, velocities
+    velocities = estimate_velocities(pack([input]), estimator, window)
+    return dt, positions, velocities[:-1]
+
+
+def to_duration_trajectories(
+    packed: PackedStampedTrajectories,
+    estimator: str = "forward",
+    window: typing.Optional[int] = None,
+) -> PackedDurationTrajectories:
+    """
+    Batch version of to_duration_trajectory: converts all the packed
+    stamped trajectories to packed duration trajectories (see
+    unpack_durations), the last point of each trajectory being dropped.
+    """
+    time_stamps, positions, offsets = packed
+    velocities = estimate_velocities(packed, estimator, window)
+    sizes = np.diff(offsets)
+    keep = np.ones(len(time_stamps), bool)
+    keep[offsets[1:][sizes > 0] - 1] = False
+    durations = np.zeros(len(time_stamps), np.int64)
+    durations[:-1] = np.diff(np.asarray(time_stamps).astype(np.int64))
+    new_offsets = np.zeros(len(offsets), np.int64)
+    new_offsets[1:] = np.cumsum(np.maximum(sizes - 1, 0))
+    return (
+        durations[keep].astype(np.uint),
+        np.asarray(positions)[keep],
+        velocities[keep],
+        new_offsets,
+    )
+
+
+def _resample_packed_values(
+    stamps: npt.NDArray,
+    values: npt.NDArray,
+    offsets: Offsets,
+    period_us: int,
+    method: str,
+) -> typing.Tuple[npt.NDArray, npt.NDArray, Offsets]:
+    """
+    Resample values (2d array, one row per time stamp) of packed
+    trajectories at fixed period, using linear interpolation or cubic
+    Hermite interpolation (tangents estimated by finite differences).
+    Returns the new time stamps (int64), values (float64) and offsets.
+    """
+    if method not in ("linear", "cubic"):
+        raise ValueError(
+            "unknown interpolation method: {} (linear or cubic)".format(method)
+        )
+    if period_us <= 0:
+        raise ValueError("period should be positive ({} given)".format(period_us))
+    stamps = np.asarray(stamps).astype(np.int64)
+    values = np.asarray(values, np.float64)
+    sizes = np.diff(offsets)
+    trajectory_indexes = np.repeat(np.arange(len(sizes)), sizes)
+
+    # removing duplicated time stamps (first sample kept)
+    keep = np.ones(len(stamps), bool)
+    keep[1:] = np.diff(stamps) > 0
+    keep[offsets[:-1][sizes > 0]] = True
+    stamps, values = stamps[keep], values[keep]
+    trajectory_indexes = trajectory_indexes[keep]
+    sizes = np.bincount(trajectory_indexes, minlength=len(sizes))
+    offsets = np.zeros(len(sizes) + 1, np.int64)
+    offsets[1:] = np.cumsum(sizes)
+    not_empty = sizes > 0
+
+    # time relative to the start of each trajectory, and number
+    # of resampled points of each trajectory
+    firsts = np.zeros(len(sizes), np.int64)
+    firsts[not_empty] = stamps[offsets[:-1][not_empty]]
+    durations = np.zeros(len(sizes), np.int64)
+    durations[not_empty] = stamps[offsets[1:][not_empty] - 1] - firsts[not_empty]
+    nb_samples = np.where(not_empty, durations // period_us + 1, 0)
+    new_offsets = np.zeros(len(sizes) + 1, np.int64)
+    new_offsets[1:] = np.cumsum(nb_samples)
+    new_trajectory_indexes = np.repeat(np.arange(len(sizes)), nb_samples)
+    new_relative = (
+        np.arange(new_offsets[-1]) - new_offsets[new_trajectory_indexes]
+    ) * period_us
+
+    # all trajectories on a single time line (each trajectory shifted
+    # so that it does not overlap with the others), so that all
+    # interpolation segments are found by a single search
+    span = int(durations.max(initial=0)) + 1
+    relative = stamps - firsts[trajectory_indexes]
+    timeline = relative + trajectory_indexes * span
+    queries = new_relative + new_trajectory_indexes * span
+    starts = offsets[:-1][new_trajectory_indexes]
+    lasts = offsets[1:][new_trajectory_indexes] - 1
+    lows = np.searchsorted(timeline, queries, side="right") - 1
+    lows = np.clip(lows, starts, np.maximum(lasts - 1, starts))
+    highs = np.minimum(lows + 1, lasts)
+    h = (timeline[highs] - timeline[lows]).astype(np.float64)
+    w = np.divide(
+        (queries - timeline[lows]).astype(np.float64),
+        h,
+        out=np.zeros(len(queries)),
+        where=h > 0,
+    )[:, np.newaxis]
+
+    if method == "linear":
+        new_values = values[lows] + w * (values[highs] - values[lows])
+    else:
+        # tangents: central differences, one sided at the extremities
+        # of each trajectory
+        previous = np.maximum(
+            np.arange(len(stamps)) - 1, offsets[:-1][trajectory_indexes]
+        )
+        following = np.minimum(
+            np.arange(len(stamps)) + 1, offsets[1:][trajectory_indexes] - 1
+        )
+        dt = (relative[following] - relative[previous]).astype(np.float64)
+        tangents = np.divide(
+            values[following] - values[previous],
+            dt[:, np.newaxis],
+            out=np.zeros(values.shape),
+            where=dt[:, np.newaxis] > 0,
+        )
+        w2, w3 = w**2, w**3
+        h = h[:, np.newaxis]
+        new_values = (
+            (2 * w3 - 3 * w2 + 1) * values[lows]
+            + (w3 - 2 * w2 + w) * h * tangents[lows]
+            + (-2 * w3 + 3 * w2) * values[highs]
+            + (w3 - w2) * h * tangents[highs]
+        )
+
+    new_stamps = new_relative + firsts[new_trajectory_indexes]
+    return new_stamps, new_values, new_offsets
+
+
+def resample_packed(
+    packed: PackedStampedTrajectories, period_us: int, method: str = "linear"
+) -> PackedStampedTrajectories:
+    """
+    Resample all the packed trajectories at a fixed period (microseconds),
+    using either "linear" or "cubic" (Hermite) interpolation, in a single
+    vectorized pass. Each resampled trajectory starts at the first time
+    stamp of the original trajectory, and ends at or before its last time
+    stamp. Samples with duplicated time stamps are ignored.
+    """
+    stamps, positions, offsets = _resample_packed_values(
+        packed[0], packed[1], packed[2], period_us, method
+    )
+    return stamps.astype(np.uint), positions.astype(np.float32), offsets
+
+
+def resample(
+    input: typing.Union[StampedTrajectory, DurationTrajectory],
+    period_us: int,
+    method: str = "linear",
+) -> typing.Union[StampedTrajectory, DurationTrajectory]:
+    """
+    Resample the trajectory at a fixed period (microseconds), using
+    either "linear" or "cubic" (Hermite) interpolation
+    (see resample_packed). If the input is a stamped trajectory,
+    the resampled stamped trajectory is returned. If the input is a
+    duration trajectory, its positions and velocities are resampled,
+    and a duration trajectory (all durations being the period) is returned.
+    """
+    if len(input) == 2:
+        stamps, positions, _ = resample_packed(
+            pack([typing.cast("StampedTrajectory", input)]), period_us, method
+        )
+        return stamps, positions
+    durations, positions, velocities = typing.cast("DurationTrajectory", input)
+    stamps = to_stamped_trajectory((durations, positions, velocities))[0]
+    offsets = np.array([0, len(stamps)], np.int64)
+    values = np.concatenate((positions, velocities), axis=1)
+    new_stamps, new_values, _ = _resample_packed_values(
+        stamps, values, offsets, period_us, method
+    )
+    new_values = new_values.astype(np.float32)
+    return (
+        np.full(len(new_stamps), period_us, np.uint),
+        new_values[:, :3],
+        new_values[:, 3:],
+    )
 
 
 class RecordedBallTrajectories:
@@ -107,6 +1302,19 @@ class RecordedBallTrajectories:
     To get related list of 3d positions:
     d[group name: str][index: int]["trajectory"]
 
+    Alternatively, a group may use the "packed" layout (group attribute
+    "layout" set to "packed"), in which all the trajectories of the group
+    are concatenated in contiguous datasets:
+    d[group name: str]["time_stamps"]: all time stamps
+    d[group name: str]["trajectory"]: all 3d positions
+    d[group name: str]["offsets"]: index of the first point of each
+    trajectory (plus the total number of points as last item)
+    Both layouts are supported transparently by all methods.
+
+    Trajectories written by MutableRecordedBallTrajectories also store
+    their summary (see TrajectorySummary), either as attributes of
+    the trajectory group or as the "summary" dataset (packed layout).
+
     To ensure the hdf5 file is properly closed, it is
     adviced to use the context manager of this class
     (i.e. ```with RecordedBallTrajectories() as rbt ...```)
@@ -125,15 +1333,38 @@ class RecordedBallTrajectories:
       method provided by the class. See the subclass
       MutableRecordedBallTrajectories for methods that will
       update the file.
+    profile: (optional)
+      if True (or a Profiler instance, possibly shared with other
+      instances), the wall time, bytes read and written and number of
+      trajectories processed are recorded per stage (see profile_stats).
+      Disabled by default (at the cost of a no-op call per stage).
     """
 
     _TIME_STAMPS = "time_stamps"
     _TRAJECTORY = "trajectory"
-
-    def __init__(self, path: pathlib.Path = None, file_mode: str = "r"):
+    _OFFSETS = "offsets"
+    _SUMMARY = "summary"
+    _EVENTS = "events"
+    _STORAGE = "storage_"
+    _CLEANING = "cleaning_"
+    _LAYOUT = "layout"
+    _PACKED = "packed"
+
+    def __init__(
+        self,
+        path: pathlib.Path = None,
+        file_mode: str = "r",
+        profile: typing.Union[bool, Profiler] = False,
+    ):
         if path is None:
             path = self.get_default_path()
-        self._f = h5py.File(path, file_mode)
+        self._profiler = _profiler(profile)
+        with self._profiler.stage("open"):
+            import h5py
+
+            self._f = h5py.File(path, file_mode)
+        # offsets of the packed groups, read once
+        self._offsets: typing.Dict[str, Offsets] = {}
 
     @staticmethod
     def get_default_path(create: bool = False) -> pathlib.Path:
@@ -150,6 +1381,8 @@ class RecordedBallTrajectories:
           default location. If create is False and the file does
           not exists, a FileNotFoundError is raised.
         """
+        import pam_configuration
+
         path = (
             pathlib.Path(pam_configuration.get_path())
             / "context"
@@ -162,6 +1395,13 @@ class RecordedBallTrajectories:
                 )
         return path
 
+    def profile_stats(self) -> ProfileStats:
+        """
+        Returns the statistics recorded since the instance was created
+        (empty if profiling is disabled, see the profile argument).
+        """
+        return self._profiler.stats()
+
     def get_groups(self) -> typing.Tuple[str, ...]:
         """
         Returns all the group contained by the file
@@ -169,11 +1409,65 @@ class RecordedBallTrajectories:
         """
         return tuple(self._f.keys())
 
+    def is_packed(self, group: str) -> bool:
+        """
+        Returns True if the group uses the packed layout,
+        or raise a KeyError if no such group.
+        """
+        return self._f[group].attrs.get(self._LAYOUT) == self._PACKED
+
+    def get_storage_options(self, group: str) -> StorageOptions:
+        """
+        Returns the storage options of the group (as set when the
+        group was created), or raise a KeyError if no such group.
+        """
+        attrs = self._f[group].attrs
+        values = {}
+        for field in StorageOptions._fields:
+            key = self._STORAGE + field
+            if key in attrs:
+                value = attrs[key]
+                values[field] = value.item() if isinstance(value, np.generic) else value
+        return StorageOptions(**values)
+
+    def get_cleaning_parameters(
+        self, group: str
+    ) -> typing.Optional[CleaningParameters]:
+        """
+        Returns the parameters used to clean the trajectories of the group
+        when they were imported, or None if they were not cleaned.
+        Raise a KeyError if no such group.
+        """
+        attrs = self._f[group].attrs
+        keys = [self._CLEANING + field for field in CleaningParameters._fields]
+        if not any(key in attrs for key in keys):
+            return None
+        values = {}
+        for field, key in zip(CleaningParameters._fields, keys):
+            value = attrs[key] if key in attrs else None
+            values[field] = value.item() if isinstance(value, np.generic) else value
+        return CleaningParameters(**values)
+
+    def _get_offsets(self, group: str) -> Offsets:
+        """
+        Returns the offsets of a packed group.
+        """
+        try:
+            return self._offsets[group]
+        except KeyError:
+            with self._profiler.stage("read") as stage:
+                offsets = self._f[group][self._OFFSETS][()].astype(np.int64)
+                stage.add(bytes_read=offsets.nbytes)
+            self._offsets[group] = offsets
+            return offsets
+
     def get_indexes(self, group: str) -> typing.Tuple[int, ...]:
         """
         Returns all the indexes of the specified group, or
-        raise a ValueError if no such group.
+        raise a KeyError if no such group.
         """
+        if self.is_packed(group):
+            return tuple(range(self._f[group][self._OFFSETS].shape[0] - 1))
         g = self._f[group]
         return tuple([int(index) for index in g.keys()])
 
@@ -181,41 +1475,146 @@ class RecordedBallTrajectories:
         self, group: str, index: int, direct: bool = False
     ) -> StampedTrajectory:
         """
-        Returns a the stamped trajectory, or raise a ValueError
+        Returns a the stamped trajectory, or raise a KeyError
         if no such group, or no such index in the group.
         If not direct, a tuple of h5py data instances will be
         returned (can not be accessed once the file is closed). Otherwise
         a tuple of numpy arrays is returned.
+        (for groups using the packed layout, numpy arrays are always
+        returned)
         """
+        if self.is_packed(group):
+            offsets = self._get_offsets(group)
+            if not 0 <= index < len(offsets) - 1:
+                raise KeyError("No trajectory {} in group {}".format(index, group))
+            start, end = offsets[index], offsets[index + 1]
+            with self._profiler.stage("read") as stage:
+                g = self._f[group]
+                time_stamps = g[self._TIME_STAMPS][start:end].astype(np.uint)
+                trajectory = g[self._TRAJECTORY][start:end].astype(np.float32)
+                stage.add(time_stamps.nbytes + trajectory.nbytes, 0, 1)
+            return time_stamps, trajectory
         g = self._f[group][str(index)]
         # returning directly the h5py datasets
         if not direct:
             return g[self._TIME_STAMPS], g[self._TRAJECTORY]
         # converting the h5py datasets into numpy arrays
-        time_stamps_dset = g[self._TIME_STAMPS]
-        trajectory_dset = g[self._TRAJECTORY]
-        time_stamps = np.zeros(time_stamps_dset.shape, np.uint)
-        trajectory = np.zeros(trajectory_dset.shape, np.float32)
-        time_stamps_dset.read_direct(time_stamps)
-        trajectory_dset.read_direct(trajectory)
+        with self._profiler.stage("read") as stage:
+            time_stamps_dset = g[self._TIME_STAMPS]
+            trajectory_dset = g[self._TRAJECTORY]
+            time_stamps = np.zeros(time_stamps_dset.shape, np.uint)
+            trajectory = np.zeros(trajectory_dset.shape, np.float32)
+            time_stamps_dset.read_direct(time_stamps)
+            trajectory_dset.read_direct(trajectory)
+            stage.add(time_stamps.nbytes + trajectory.nbytes, 0, 1)
         return time_stamps, trajectory
 
     def get_stamped_trajectories(
         self, group: str, direct: bool = False
     ) -> typing.Dict[int, StampedTrajectory]:
         """
-        Returns all trajectories of the group, or raise a ValueError
+        Returns all trajectories of the group, or raise a KeyError
         if no such group.
         If not direct, a tuple of h5py data instances will be
         returned (can not be accessed once the file is closed). Otherwise
         a tuple of numpy arrays is returned.
+        (for groups using the packed layout, numpy arrays are always
+        returned, as views over two arrays read in bulk)
         """
+        if self.is_packed(group):
+            return dict(enumerate(unpack(self.get_packed_trajectories(group))))
         indexes = self.get_indexes(group)
         return {
             int(index): self.get_stamped_trajectory(group, index, direct=direct)
             for index in indexes
         }
 
+    def get_summary(self, group: str) -> typing.Dict[int, TrajectorySummary]:
+        """
+        Returns the summary of all trajectories of the group, or raise
+        a KeyError if no such group. The summaries are read from the
+        metadata of the file; summaries of trajectories written without
+        metadata (older files) are computed from the trajectories.
+        """
+        g = self._f[group]
+        if self.is_packed(group):
+            if self._SUMMARY in g:
+                summaries = g[self._SUMMARY][()]
+            else:
+                summaries = summarize_packed(self.get_packed_trajectories(group))
+            return {
+                index: _to_summary(summary) for index, summary in enumerate(summaries)
+            }
+        r: typing.Dict[int, TrajectorySummary] = {}
+        fields = _SUMMARY_DTYPE.names
+        for index in self.get_indexes(group):
+            attrs = g[str(index)].attrs
+            if all([field in attrs for field in fields]):
+                summary = np.zeros((), _SUMMARY_DTYPE)
+                for field in fields:
+                    summary[field] = attrs[field]
+                r[index] = _to_summary(summary)
+            else:
+                r[index] = summarize(
+                    self.get_stamped_trajectory(group, index, direct=True)
+                )
+        return r
+
+    def get_events(self, group: str) -> typing.Dict[int, npt.NDArray]:
+        """
+        Returns, per trajectory index, the events (see detect_events) saved
+        by MutableRecordedBallTrajectories.add_events (a KeyError is raised
+        if no such group or if no events were saved for the group).
+        """
+        g = self._f[group]
+        if self.is_packed(group):
+            events = g[self._EVENTS][()]
+            nb_trajectories = len(self._get_offsets(group)) - 1
+            splits = np.searchsorted(
+                events["trajectory"], np.arange(1, nb_trajectories)
+            )
+            return dict(enumerate(np.split(events, splits)))
+        return {
+            index: g[str(index)].attrs[self._EVENTS]
+            for index in self.get_indexes(group)
+        }
+
+    def get_resampled_trajectories(
+        self, group: str, period_us: int, method: str = "linear"
+    ) -> PackedStampedTrajectories:
+        """
+        Returns all trajectories of the group, resampled at a fixed
+        period (see resample_packed) in one batch.
+        """
+        return resample_packed(self.get_packed_trajectories(group), period_us, method)
+
+    def get_packed_trajectories(self, group: str) -> PackedStampedTrajectories:
+        """
+        Returns all trajectories of the group, concatenated in two
+        numpy arrays (time stamps and positions), along with the offsets
+        of each trajectory, sorted per index. Raise a KeyError if no such
+        group.
+        """
+        if not self.is_packed(group):
+            stamped_trajectories = self.get_stamped_trajectories(group, direct=True)
+            with self._profiler.stage("convert") as stage:
+                stage.add(trajectories=len(stamped_trajectories))
+                return pack(
+                    [stamped_trajectories[i] for i in sorted(stamped_trajectories)]
+                )
+        offsets = self._get_offsets(group)
+        with self._profiler.stage("read") as stage:
+            g = self._f[group]
+            time_stamps_dset = g[self._TIME_STAMPS]
+            trajectory_dset = g[self._TRAJECTORY]
+            time_stamps = np.zeros(time_stamps_dset.shape, np.uint)
+            trajectory = np.zeros(trajectory_dset.shape, np.float32)
+            if time_stamps.size:
+                time_stamps_dset.read_direct(time_stamps)
+                trajectory_dset.read_direct(trajectory)
+            stage.add(time_stamps.nbytes + trajectory.nbytes, 0, len(offsets) - 1)
+        return time_stamps, trajectory, offsets
+
     def close(self):
         """
         Close the hdf5 file
@@ -247,8 +1646,16 @@ class MutableRecordedBallTrajectories(RecordedBallTrajectories):
     "r+" mode.
     """
 
-    def __init__(self, path: pathlib.Path = None):
-        super().__init__(path, file_mode="r+")
+    # default number of points per chunk of the groups created by
+    # append_stamped_trajectories
+    APPEND_CHUNKS = 4096
+
+    def __init__(
+        self,
+        path: pathlib.Path = None,
+        profile: typing.Union[bool, Profiler] = False,
+    ):
+        super().__init__(path, file_mode="r+", profile=profile)
 
     def rm_group(self, group: str) -> None:
         """
@@ -258,99 +1665,523 @@ class MutableRecordedBallTrajectories(RecordedBallTrajectories):
         if group not in self.get_groups():
             raise KeyError("No such group: {}".format(group))
         del self._f[group]
+        self._offsets.pop(group, None)
 
-    def overwrite(
-        self, group: str, index: int, stamped_trajectory: StampedTrajectory
+    def _set_storage_options(
+        self, group: h5py._hl.group.Group, storage: StorageOptions
     ) -> None:
         """
-        Overwrite the trajectory at the given group
-        and index.
+        Save the storage options as attributes of the group.
         """
-        g = self._f[group]
-        del g[str(index)]
-        traj_group = g.create_group(str(index))
-        time_stamps = stamped_trajectory[0]
-        positions = stamped_trajectory[1]
-        traj_group.create_dataset(self._TIME_STAMPS, data=time_stamps)
-        traj_group.create_dataset(self._TRAJECTORY, data=positions)
-
-    def add_tennicam_trajectories(
-        self, group_name: str, tennicam_path: pathlib.Path
+        for field, value in storage._asdict().items():
+            key = self._STORAGE + field
+            if value is None:
+                if key in group.attrs:
+                    del group.attrs[key]
+            else:
+                group.attrs[key] = value
+
+    def _set_cleaning_parameters(
+        self, group: h5py._hl.group.Group, parameters: CleaningParameters
+    ) -> None:
+        """
+        Save the cleaning parameters as attributes of the group
+        (None values, i.e. disabled steps, are not saved).
+        """
+        for field, value in parameters._asdict().items():
+            if value is not None:
+                group.attrs[self._CLEANING + field] = value
+
+    def _save_trajectory(
+        self,
+        group: h5py._hl.group.Group,
+        index: int,
+        stamped_trajectory: StampedTrajectory,
+        storage: StorageOptions,
     ) -> int:
         """
-        It is assumed that tennicam_path is a directory hosting (non recursively)
-        a collection of files named tennicam_* that have been generated by the
-        executable tennicam_client_logger (package tennicam_client). This function
-        will parse all these files and add them to the hdf5 under the specified
-        group name (or raise a FileNotFoundError if tennicam_path does not
-        exists).
-
-        Returns
-        -------
-        The number of trajectories added to the file.
+        Create in the group a new subgroup named according to the index
+        and add to it 2 datasets, "time_stamps" (list of microseconds
+        time stamps) and "trajectory" (list of corresponding 3d positions).
+        Returns the number of bytes of the datasets.
         """
-
-        def _read_trajectory(tennicam_file: pathlib.Path) -> StampedTrajectory:
-            """
-            Parse the file and returned the corresponding
-            stamped trajectory.
-            """
-            time_stamps = []
-            trajectory = []
-            start_time = None
-            for ball_id, time_stamp, position, _ in tennicam_client.parse(
-                tennicam_file
-            ):
-                if ball_id >= 0:
-                    time_stamp = int(time_stamp * 1e-3)  # from nano to micro seconds
-                    if start_time is None:
-                        start_time = time_stamp
-                    time_stamp -= start_time
-                    time_stamps.append(time_stamp)
-                    trajectory.append(position)
-            return np.array(time_stamps, np.uint), np.array(trajectory, np.float32)
-
-        def _read_folder(tennicam_path: pathlib.Path) -> StampedTrajectories:
-            """
-            List all the file in tennicam_path that have the tennicam_ prefix,
-            parse them and returns the corresponding list of stamped trajectories.
-            """
-            files = _list_files(tennicam_path, prefix="tennicam_")
-            stamped_trajectories = [_read_trajectory(tennicam_path / f) for f in files]
-            return stamped_trajectories
-
-        def _save_trajectory(
-            group: h5py._hl.group.Group,
-            index: int,
-            stamped_trajectory: StampedTrajectory,
-        ):
-            """
-            Create in the group a new subgroup named according to the index
-            and add to it 2 datasets, "time_stamps" (list of microseconds
-            time stamps) and "trajectory" (list of corresponding 3d positions)
+        # creating a new group for this trajectory
+        traj_group = group.create_group(str(index))
+        # adding 2 datasets: time_stamps and positions
+        time_stamps = storage.convert_stamps(stamped_trajectory[0])
+        positions = np.asarray(stamped_trajectory[1])
+        traj_group.create_dataset(
+            self._TIME_STAMPS, data=time_stamps, **storage.dataset_kwargs(time_stamps)
+        )
+        traj_group.create_dataset(
+            self._TRAJECTORY, data=positions, **storage.dataset_kwargs(positions)
+        )
+        # adding the summary as attributes
+        summary = summarize_packed(pack([stamped_trajectory]))[0]
+        for field in _SUMMARY_DTYPE.names:
+            traj_group.attrs[field] = summary[field]
+        return time_stamps.nbytes + positions.nbytes
+
+    def _save_packed(
+        self,
+        group: h5py._hl.group.Group,
+        packed: PackedStampedTrajectories,
+        storage: StorageOptions,
+    ) -> int:
+        """
+        Add to the group the 4 datasets of the packed layout
+        ("time_stamps", "trajectory", "offsets" and "summary").
+        Returns the number of bytes of the datasets.
+        """
+        _, positions, offsets = packed
+        time_stamps = storage.convert_stamps(packed[0])
+        group.attrs[self._LAYOUT] = self._PACKED
+        group.create_dataset(
+            self._TIME_STAMPS, data=time_stamps, **storage.dataset_kwargs(time_stamps)
+        )
+        group.create_dataset(
+            self._TRAJECTORY, data=positions, **storage.dataset_kwargs(positions)
+        )
+        summary = summarize_packed(packed)
+        group.create_dataset(self._OFFSETS, data=offsets)
+        group.create_dataset(self._SUMMARY, data=summary)
+        return time_stamps.nbytes + positions.nbytes + offsets.nbytes + summary.nbytes
+
+    def _list_files(
+        self, dir_path: pathlib.Path, extension: str = "", prefix: str = ""
+    ) -> typing.List[pathlib.Path]:
+        """
+        Profiled version of the function _list_files.
+        """
+        with self._profiler.stage("list_files"):
+            return _list_files(dir_path, extension, prefix)
+
+    def _parse_files(
+        self,
+        parse: typing.Callable[[pathlib.Path], _Result],
+        files: typing.Sequence[pathlib.Path],
+        jobs: typing.Optional[int],
+    ) -> typing.List[_Result]:
+        """
+        Returns the results of parse applied to each file
+        (see _parallel_map).
+        """
+        with self._profiler.stage("parse") as stage:
+            results = _parallel_map(parse, files, jobs)
+            stage.add(trajectories=len(files))
+        if self._profiler.enabled:
+            stage.add(bytes_read=sum(f.stat().st_size for f in files))
+        return results
+
+    def _write_group(
+        self,
+        group_name: str,
+        stamped_trajectories: StampedTrajectories,
+        packed: bool,
+        storage: typing.Optional[StorageOptions],
+    ) -> None:
+        """
+        Create a new group and save the trajectories in it,
+        using either the packed layout or one subgroup per
+        trajectory.
+        """
+        if storage is None:
+            storage = StorageOptions()
+        group = self._f.create_group(group_name)
+        self._offsets.pop(group_name, None)
+        self._set_storage_options(group, storage)
+        if packed:
+            with self._profiler.stage("convert") as stage:
+                packed_trajectories = pack(stamped_trajectories)
+                stage.add(trajectories=len(stamped_trajectories))
+            with self._profiler.stage("write") as stage:
+                nb_bytes = self._save_packed(group, packed_trajectories, storage)
+                stage.add(0, nb_bytes, len(stamped_trajectories))
+            return
+        with self._profiler.stage("write") as stage:
+            for index, stamped_trajectory in enumerate(stamped_trajectories):
+                nb_bytes = self._save_trajectory(
+                    group, index, stamped_trajectory, storage
+                )
+                stage.add(0, nb_bytes, 1)
+
+    def add_stamped_trajectories(
+        self,
+        group_name: str,
+        stamped_trajectories: StampedTrajectories,
+        packed: bool = False,
+        storage: typing.Optional[StorageOptions] = None,
+    ) -> int:
+        """
+        Add a new group to the file hosting the stamped trajectories
+        (indexes starting at 0). If packed is True, the group will use
+        the packed layout. The datasets are created according to the
+        storage options (h5py's default if None), which are kept as
+        attributes of the group and reused for later updates of the group.
+
+        Returns
+        -------
+        The number of trajectories added to the file.
+        """
+        self._write_group(group_name, stamped_trajectories, packed, storage)
+        return len(stamped_trajectories)
+
+    def overwrite(
+        self, group: str, index: int, stamped_trajectory: StampedTrajectory
+    ) -> None:
+        """
+        Overwrite the trajectory at the given group
+        and index. For groups using the packed layout, the trajectory
+        is written in place if its number of points is unchanged,
+        otherwise the points of the following trajectories are moved
+        (resizable datasets are resized, the others are recreated with
+        the storage options of the group). If events were saved for the
+        group (see add_events), the events of the trajectory are detected
+        again, with the same parameters.
+        """
+        g = self._f[group]
+        storage = self.get_storage_options(group)
+        if not self.is_packed(group):
+            del g[str(index)]
+            self._save_trajectory(g, index, stamped_trajectory, storage)
+            time_stamps = storage.convert_stamps(stamped_trajectory[0])
+            events = self._detect_trajectory_events(
+                g, (time_stamps, stamped_trajectory[1])
+            )
+            if events is not None:
+                g[str(index)].attrs[self._EVENTS] = events
+            return
+
+        offsets = self._get_offsets(group)
+        if not 0 <= index < len(offsets) - 1:
+            raise KeyError("No trajectory {} in group {}".format(index, group))
+        time_stamps = storage.convert_stamps(stamped_trajectory[0])
+        positions = np.asarray(stamped_trajectory[1])
+        start, end = offsets[index], offsets[index + 1]
+        summary = summarize_packed(pack([(time_stamps, positions)]))
+        g[self._SUMMARY][index] = summary[0]
+
+        if len(time_stamps) == end - start:
+            g[self._TIME_STAMPS][start:end] = time_stamps
+            g[self._TRAJECTORY][start:end] = positions
+        else:
+            new_offsets = offsets.copy()
+            new_offsets[index + 1 :] += len(time_stamps) - (end - start)
+            for name, data in (
+                (self._TIME_STAMPS, time_stamps),
+                (self._TRAJECTORY, positions),
+            ):
+                dset = g[name]
+                data = np.concatenate((data.astype(dset.dtype), dset[end:]))
+                if dset.maxshape[0] is None:
+                    dset.resize(new_offsets[-1], axis=0)
+                    dset[start:] = data
+                else:
+                    data = np.concatenate((dset[:start], data))
+                    del g[name]
+                    g.create_dataset(name, data=data, **storage.dataset_kwargs(data))
+            g[self._OFFSETS][...] = new_offsets
+            self._offsets.pop(group, None)
+
+        events = self._detect_trajectory_events(g, (time_stamps, positions))
+        if events is not None:
+            all_events = g[self._EVENTS][()]
+            first, last = np.searchsorted(all_events["trajectory"], [index, index + 1])
+            events["trajectory"] = index
+            all_events = np.concatenate((all_events[:first], events, all_events[last:]))
+            del g[self._EVENTS]
+            g.create_dataset(self._EVENTS, data=all_events)
+
+    def _detect_trajectory_events(
+        self, group: h5py._hl.group.Group, stamped_trajectory: StampedTrajectory
+    ) -> typing.Optional[npt.NDArray]:
+        """
+        Returns the events of the trajectory (as read from the file, i.e.
+        in single precision), detected with the parameters saved by
+        add_events (None if no events were saved for the group).
+        """
+        if "events_tolerance" not in group.attrs:
+            return None
+        time_stamps, positions = stamped_trajectory
+        return detect_events(
+            pack([(time_stamps, np.asarray(positions, np.float32))]),
+            table_height=group.attrs.get("events_table_height", None),
+            tolerance=group.attrs["events_tolerance"],
+        )
+
+    def transform(
+        self,
+        group: str,
+        alpha: float = 0.0,
+        beta: float = 0.0,
+        gamma: float = 0.0,
+        translation: typing.Sequence[float] = (0.0, 0.0, 0.0),
+        chunk_size: int = 65536,
+    ) -> int:
+        """
+        Apply to all positions of all trajectories of the group the
+        rotation (around x, y and z, same convention as context::Transform)
+        followed by the translation. The datasets are updated in place,
+        chunk_size points at a time, and the summaries and events (see
+        add_events) of the trajectories are updated accordingly. If the
+        rotation keeps the z axis, the table height used for detecting
+        the events is translated along z, otherwise the table is no longer
+        horizontal and the table height is removed (i.e. events detected
+        later on, e.g. by overwrite, do not check the height of bounces).
+
+        Returns
+        -------
+        The number of trajectories of the group.
+        """
+        rotation = rotation_matrix(alpha, beta, gamma)
+        g = self._f[group]
+
+        def _transform_summary(
+            summary: npt.NDArray, mins: npt.NDArray, maxs: npt.NDArray
+        ):
+            # the max speed is invariant (up to the float32 rounding of the
+            # transformed positions), the first and last positions
+            # are transformed as the points of the datasets (i.e. in
+            # the same precision)
+            for field in ("first_position", "last_position"):
+                summary[field] = transform_positions(
+                    summary[field].astype(np.float32), rotation, translation
+                )
+            summary["min_position"] = mins
+            summary["max_position"] = maxs
+
+        def _transform_events(events: npt.NDArray) -> npt.NDArray:
+            # (positions of the events being read from the datasets)
+            events["position"] = transform_positions(
+                events["position"].astype(np.float32), rotation, translation
+            )
+            return events
+
+        if "events_table_height" in g.attrs:
+            if np.array_equal(rotation[2], [0.0, 0.0, 1.0]):
+                g.attrs["events_table_height"] += translation[2]
+            else:
+                del g.attrs["events_table_height"]
+
+        if self.is_packed(group):
+            offsets = self._get_offsets(group)
+            mins, maxs = _transform_dataset(
+                g[self._TRAJECTORY], offsets, rotation, translation, chunk_size
+            )
+            if self._SUMMARY in g:
+                summaries = g[self._SUMMARY][()]
+                _transform_summary(summaries, mins, maxs)
+                g[self._SUMMARY][...] = summaries
+            if self._EVENTS in g:
+                g[self._EVENTS][...] = _transform_events(g[self._EVENTS][()])
+            return len(offsets) - 1
+
+        indexes = self.get_indexes(group)
+        fields = _SUMMARY_DTYPE.names
+        for index in indexes:
+            traj_group = g[str(index)]
+            dset = traj_group[self._TRAJECTORY]
+            offsets = np.array([0, dset.shape[0]], np.int64)
+            mins, maxs = _transform_dataset(
+                dset, offsets, rotation, translation, chunk_size
+            )
+            if all([field in traj_group.attrs for field in fields]):
+                summary = np.zeros((), _SUMMARY_DTYPE)
+                for field in fields:
+                    summary[field] = traj_group.attrs[field]
+                _transform_summary(summary, mins[0], maxs[0])
+                for field in fields:
+                    traj_group.attrs[field] = summary[field]
+            if self._EVENTS in traj_group.attrs:
+                traj_group.attrs[self._EVENTS] = _transform_events(
+                    traj_group.attrs[self._EVENTS]
+                )
+        return len(indexes)
+
+    def add_events(
+        self,
+        group: str,
+        table_height: typing.Optional[float] = None,
+        tolerance: float = 0.05,
+    ) -> int:
+        """
+        Detects the events of all the trajectories of the group (see
+        detect_events, racket hits being detected from the direction
+        of the ball) and saves them, as a dataset ("events") for a group
+        using the packed layout, as an attribute of each trajectory
+        otherwise (see get_events). The detection parameters are saved as
+        attributes of the group ("events_table_height", if not None, and
+        "events_tolerance").
+
+        Returns
+        -------
+        The total number of events.
+        """
+        packed = self.get_packed_trajectories(group)
+        events = detect_events(packed, table_height=table_height, tolerance=tolerance)
+        g = self._f[group]
+        if self.is_packed(group):
+            if self._EVENTS in g:
+                del g[self._EVENTS]
+            g.create_dataset(self._EVENTS, data=events)
+        else:
+            splits = np.searchsorted(
+                events["trajectory"], np.arange(1, len(packed[2]) - 1)
+            )
+            for index, trajectory_events in zip(
+                sorted(self.get_indexes(group)), np.split(events, splits)
+            ):
+                g[str(index)].attrs[self._EVENTS] = trajectory_events
+        if table_height is None:
+            g.attrs.pop("events_table_height", None)
+        else:
+            g.attrs["events_table_height"] = table_height
+        g.attrs["events_tolerance"] = tolerance
+        return len(events)
+
+    def add_resampled_group(
+        self,
+        group: str,
+        resampled_group: str,
+        period_us: int,
+        method: str = "linear",
+        storage: typing.Optional[StorageOptions] = None,
+    ) -> int:
+        """
+        Resample all the trajectories of the group (see resample_packed)
+        and save them in a new group (packed layout). The attributes
+        "resampled_from", "period_us" and "method" of the new group
+        record how it has been derived.
+
+        Returns
+        -------
+        The number of trajectories added to the file.
+        """
+        packed = self.get_resampled_trajectories(group, period_us, method)
+        self._write_group(resampled_group, unpack(packed), True, storage)
+        attrs = self._f[resampled_group].attrs
+        attrs["resampled_from"] = group
+        attrs["period_us"] = period_us
+        attrs["method"] = method
+        return len(packed[2]) - 1
+
+    def pack_group(
+        self, group: str, storage: typing.Optional[StorageOptions] = None
+    ) -> int:
+        """
+        Convert the group to the packed layout (no effect if the group
+        is already packed). The indexes of the group are expected to
+        be 0 to (number of trajectories - 1), a ValueError is raised
+        otherwise. If storage is None, the storage options of the group
+        are kept. Events saved per trajectory (see add_events) are
+        concatenated into the "events" dataset of the packed group.
+
+        Returns
+        -------
+        The number of trajectories of the group.
+        """
+        indexes = self.get_indexes(group)
+        if self.is_packed(group):
+            return len(indexes)
+        if sorted(indexes) != list(range(len(indexes))):
+            raise ValueError(
+                "Can not pack group {}: indexes are not contiguous".format(group)
+            )
+        packed = self.get_packed_trajectories(group)
+        # writing the packed group first, so that the original group
+        # is deleted only once the packed one is complete
+        if storage is None:
+            storage = self.get_storage_options(group)
+        tmp_name = "{}.packing".format(group)
+        tmp_group = self._f.create_group(tmp_name)
+        for key, value in self._f[group].attrs.items():
+            tmp_group.attrs[key] = value
+        self._set_storage_options(tmp_group, storage)
+        self._save_packed(tmp_group, packed, storage)
+        if "events_tolerance" in tmp_group.attrs:
+            # events saved per trajectory, concatenated (sorted per index)
+            g = self._f[group]
+            events = []
+            for index, stamped_trajectory in enumerate(unpack(packed)):
+                if self._EVENTS in g[str(index)].attrs:
+                    trajectory_events = g[str(index)].attrs[self._EVENTS]
+                else:
+                    trajectory_events = self._detect_trajectory_events(
+                        tmp_group, stamped_trajectory
+                    )
+                trajectory_events = trajectory_events.astype(EVENT_DTYPE)
+                trajectory_events["trajectory"] = index
+                events.append(trajectory_events)
+            tmp_group.create_dataset(
+                self._EVENTS, data=np.concatenate(events or [np.zeros(0, EVENT_DTYPE)])
+            )
+        del self._f[group]
+        self._f.move(tmp_name, group)
+        self._offsets.pop(group, None)
+        return len(indexes)
+
+    def add_tennicam_trajectories(
+        self,
+        group_name: str,
+        tennicam_path: pathlib.Path,
+        packed: bool = False,
+        jobs: typing.Optional[int] = 1,
+        storage: typing.Optional[StorageOptions] = None,
+        cleaning: typing.Optional[CleaningParameters] = None,
+    ) -> int:
+        """
+        It is assumed that tennicam_path is a directory hosting (non recursively)
+        a collection of files named tennicam_* that have been generated by the
+        executable tennicam_client_logger (package tennicam_client). This function
+        will parse all these files and add them to the hdf5 under the specified
+        group name (or raise a FileNotFoundError if tennicam_path does not
+        exists). If packed is True, the group will use the packed layout.
+        The files are parsed by a pool of jobs processes (one per CPU if
+        jobs is None), the hdf5 file being written only by the current
+        process. See add_stamped_trajectories for the storage options.
+        If cleaning parameters are provided, each recording is cleaned
+        (see clean_trajectory) by the parsing processes, possibly resulting
+        in several (or no) trajectories per file, and the parameters are
+        saved as attributes of the group (see get_cleaning_parameters).
+
+        Returns
+        -------
+        The number of trajectories added to the file.
+        """
+
+        def _read_folder(tennicam_path: pathlib.Path) -> StampedTrajectories:
+            """
+            List all the file in tennicam_path that have the tennicam_ prefix,
+            parse them (using jobs processes) and returns the corresponding list
+            of stamped trajectories.
             """
-            # creating a new group for this trajectory
-            traj_group = group.create_group(str(index))
-            # adding 2 datasets: time_stamps and positions
-            time_stamps = stamped_trajectory[0]
-            positions = stamped_trajectory[1]
-            traj_group.create_dataset(self._TIME_STAMPS, data=time_stamps)
-            traj_group.create_dataset(self._TRAJECTORY, data=positions)
+            files = self._list_files(tennicam_path, prefix="tennicam_")
+            if cleaning is None:
+                return self._parse_files(_read_tennicam_trajectory, files, jobs)
+            read = functools.partial(_read_clean_tennicam_trajectories, cleaning)
+            cleaned = self._parse_files(read, files, jobs)
+            return [
+                trajectory for trajectories in cleaned for trajectory in trajectories
+            ]
 
         # reading all trajectories present in the directory
         stamped_trajectories = _read_folder(tennicam_path)
 
-        # adding the new group to the hdf5 file
-        group = self._f.create_group(group_name)
-
-        # adding all trajectories as datasets to this group
-        for index, stamped_trajectory in enumerate(stamped_trajectories):
-            _save_trajectory(group, index, stamped_trajectory)
+        # adding the new group (and all its trajectories) to the hdf5 file
+        self._write_group(group_name, stamped_trajectories, packed, storage)
+        if cleaning is not None:
+            self._set_cleaning_parameters(self._f[group_name], cleaning)
 
         return len(stamped_trajectories)
 
     def add_json_trajectories(
-        self, group_name: str, json_path: pathlib.Path, sampling_rate_us: int
+        self,
+        group_name: str,
+        json_path: pathlib.Path,
+        sampling_rate_us: int,
+        packed: bool = False,
+        jobs: typing.Optional[int] = 1,
+        storage: typing.Optional[StorageOptions] = None,
     ) -> int:
         """
         It is assumed that json_path is a directory hosting (non recursively)
@@ -360,76 +2191,811 @@ class MutableRecordedBallTrajectories(RecordedBallTrajectories):
         This function will parse all these files and add them to the hdf5 under the
         specified group name (or raise a FileNotFoundError if json_path does not
         exists). (note: the velocities values are ignored, and the time stamp list
-        is created based on the sampling rate)
+        is created based on the sampling rate). If packed is True, the group will
+        use the packed layout. The files are parsed by a pool of jobs processes
+        (one per CPU if jobs is None), see parse_json_trajectory.
+        See add_stamped_trajectories for the storage options.
 
         Returns
         -------
         The number of trajectories added to the file.
         """
 
-        def _read_trajectory(json_file: pathlib.Path) -> Trajectory:
-            """
-            Parse the json file and return the trajectory it
-            hosts.
-            """
-            with open(json_file, "r") as f:
-                content_str = f.read()
-            content_str = content_str.strip()
-            content = eval(content_str)
-            trajectory = np.array(content["ob"], np.float32)[
-                :, :3
-            ]  # keeping only the position
-            return trajectory
-
         def _read_folder(json_path: pathlib.Path) -> Trajectories:
             """
             List the json files that are at the root of the path,
-            parse them and return the corresponding trajectories.
+            parse them (using jobs processes) and return the corresponding
+            trajectories.
             """
-            trajectories = [
-                _read_trajectory(json_path / f) for f in _list_files(json_path, ".json")
-            ]
-            return trajectories
+            files = self._list_files(json_path, ".json")
+            return self._parse_files(parse_json_trajectory, files, jobs)
 
-        def _save_trajectory(
-            group: h5py._hl.group.Group, index: int, trajectory: Trajectory
-        ):
+        def _stamp_trajectory(trajectory: Trajectory) -> StampedTrajectory:
             """
-            Create under the group a new subgroup named after the index,
-            and add 2 datasets, "time_stamps" (list of time stamps in
-            micro seconds inferred using the sample rate) and
-            "trajectory", the corresponding list of 3d positions.
+            Returns the trajectory with the list of time stamps
+            (in micro seconds) inferred using the sample rate.
             """
-            # creating a new group for this trajectory
-            traj_group = group.create_group(str(index))
-            # inferring time stamps
             time_stamps = np.array(
                 [i * sampling_rate_us for i in range(trajectory.shape[0])], np.int32
             )
-            # adding 2 datasets: time_stamps and positions
-            traj_group.create_dataset(self._TIME_STAMPS, data=time_stamps)
-            traj_group.create_dataset(self._TRAJECTORY, data=trajectory)
+            return time_stamps, trajectory
 
         # reading all trajectories present in the directory
         trajectories = _read_folder(json_path)
 
-        # adding the new group to the hdf5 file
-        group = self._f.create_group(group_name)
+        with self._profiler.stage("convert") as stage:
+            stamped_trajectories = [
+                _stamp_trajectory(trajectory) for trajectory in trajectories
+            ]
+            stage.add(trajectories=len(trajectories))
 
-        # adding all trajectories as datasets to this group
-        for index, trajectory in enumerate(trajectories):
-            _save_trajectory(group, index, trajectory)
+        # adding the new group (and all its trajectories) to the hdf5 file
+        self._write_group(group_name, stamped_trajectories, packed, storage)
 
         return len(trajectories)
 
+    def _create_appendable_group(self, group_name: str, storage: StorageOptions):
+        """
+        Create a packed group with empty resizable (chunked) datasets.
+        """
+        group = self._f.create_group(group_name)
+        self._offsets.pop(group_name, None)
+        self._set_storage_options(group, storage)
+        group.attrs[self._LAYOUT] = self._PACKED
+        chunks = storage.chunks or self.APPEND_CHUNKS
+        # (compression and shuffle filters)
+        kwargs = storage.dataset_kwargs(np.zeros(0))
+        group.create_dataset(
+            self._TIME_STAMPS,
+            shape=(0,),
+            maxshape=(None,),
+            chunks=(chunks,),
+            dtype=storage.stamp_dtype or np.uint,
+            **kwargs,
+        )
+        group.create_dataset(
+            self._TRAJECTORY,
+            shape=(0, 3),
+            maxshape=(None, 3),
+            chunks=(chunks, 3),
+            dtype=np.float32,
+            **kwargs,
+        )
+        group.create_dataset(
+            self._OFFSETS,
+            data=np.zeros(1, np.int64),
+            maxshape=(None,),
+            chunks=(self.APPEND_CHUNKS,),
+        )
+        group.create_dataset(
+            self._SUMMARY,
+            shape=(0,),
+            maxshape=(None,),
+            chunks=(self.APPEND_CHUNKS,),
+            dtype=_SUMMARY_DTYPE,
+        )
+
+    def append_stamped_trajectories(
+        self,
+        group_name: str,
+        stamped_trajectories: StampedTrajectories,
+        storage: typing.Optional[StorageOptions] = None,
+    ) -> int:
+        """
+        Add the stamped trajectories to the group, their indexes following
+        the ones of the trajectories already in the group. If the group
+        does not exist, it is created with the packed layout and resizable
+        datasets, chunked according to the storage options (chunks of
+        APPEND_CHUNKS points if storage.chunks is None). Groups using
+        the legacy layout can also be appended to (storage is then ignored),
+        but not the packed groups created by the other methods (datasets of
+        fixed size), for which a ValueError is raised.
+
+        Returns
+        -------
+        The number of trajectories added to the file.
+        """
+        if group_name not in self._f:
+            self._create_appendable_group(group_name, storage or StorageOptions())
+        group = self._f[group_name]
+        storage = self.get_storage_options(group_name)
+
+        if not self.is_packed(group_name):
+            start = max(self.get_indexes(group_name), default=-1) + 1
+            with self._profiler.stage("write") as stage:
+                for index, stamped_trajectory in enumerate(stamped_trajectories):
+                    nb_bytes = self._save_trajectory(
+                        group, start + index, stamped_trajectory, storage
+                    )
+                    stage.add(0, nb_bytes, 1)
+            return len(stamped_trajectories)
+
+        names = (self._TIME_STAMPS, self._TRAJECTORY, self._OFFSETS, self._SUMMARY)
+        if any(group[name].maxshape[0] is not None for name in names):
+            raise ValueError(
+                "Can not append to group {}: its datasets are not resizable".format(
+                    group_name
+                )
+            )
+        if not stamped_trajectories:
+            return 0
+
+        with self._profiler.stage("convert") as stage:
+            time_stamps, positions, offsets = pack(stamped_trajectories)
+            time_stamps = storage.convert_stamps(time_stamps)
+            summary = summarize_packed((time_stamps, positions, offsets))
+            stage.add(trajectories=len(stamped_trajectories))
+
+        with self._profiler.stage("write") as stage:
+            offsets = offsets[1:] + self._get_offsets(group_name)[-1]
+            for name, data in zip(names, (time_stamps, positions, offsets, summary)):
+                dset = group[name]
+                size = dset.shape[0]
+                dset.resize(size + len(data), axis=0)
+                dset[size:] = data
+                stage.add(bytes_written=data.nbytes)
+            stage.add(trajectories=len(stamped_trajectories))
+        self._offsets.pop(group_name, None)
+
+        return len(stamped_trajectories)
+
+
+# ball id, time stamp (nanoseconds), 3d position (further items,
+# e.g. the velocity, being ignored), as provided by tennicam_client
+Observation = typing.Sequence[typing.Any]
+
+
+class StreamingRecorder:
+    """
+    Records ball observations into a group of a hdf5 file while they
+    are produced (e.g. by tennicam_client), rather than parsing
+    log files afterwards.
+
+    Observations (see Observation) are consumed by a background thread,
+    either by calling source (which returns an observation, or None
+    if none is available) or by getting them from source (a queue.Queue,
+    or any object with a similar get method). Observations with a
+    negative ball id (no ball detected) are ignored. The observations
+    are segmented into throws: a throw ends when no (valid) observation
+    is received for more than max_gap_us microseconds (according to
+    the time stamps of the observations, or to the wall clock if the
+    source provides no observation at all). Throws of less than
+    min_points points are discarded.
+
+    Finished throws are added to the group (see
+    MutableRecordedBallTrajectories.append_stamped_trajectories, the
+    group being created if it does not exist) by a writer thread, in
+    batches of at most batch_size throws (a batch being written at
+    the latest flush_period_s seconds after its first throw is
+    finished). The time stamps of each throw start at 0. If cleaning
+    parameters are provided, the throws are cleaned before being
+    written (see clean_trajectory). The hdf5 file is open only while
+    a batch is written. Readers of the file must not keep it open
+    (HDF5 file locking): while the file can not be opened for writing,
+    the throws are kept in memory and the write is retried every
+    flush_period_s seconds.
+
+    Use the start and stop methods, or the context manager of this class.
+
+    Parameters
+    ----------
+    group:
+      name of the group of trajectories to append to
+    source:
+      callable or queue providing the observations
+    hdf5_path: optional
+      path to the hdf5 file (the default file if None, see
+      RecordedBallTrajectories.get_default_path)
+    """
+
+    def __init__(
+        self,
+        group: str,
+        source: typing.Union[
+            typing.Callable[[], typing.Optional[Observation]], queue.Queue
+        ],
+        hdf5_path: typing.Optional[pathlib.Path] = None,
+        max_gap_us: int = 100000,
+        min_points: int = 10,
+        batch_size: int = 10,
+        flush_period_s: float = 1.0,
+        poll_period_s: float = 0.001,
+        storage: typing.Optional[StorageOptions] = None,
+        cleaning: typing.Optional[CleaningParameters] = None,
+    ):
+        if hdf5_path is None:
+            hdf5_path = RecordedBallTrajectories.get_default_path()
+        if batch_size < 1:
+            raise ValueError(
+                "batch size should be at least 1 ({} given)".format(batch_size)
+            )
+        self._group = group
+        self._source = source
+        self._path = hdf5_path
+        self._max_gap_us = max_gap_us
+        self._min_points = min_points
+        self._batch_size = batch_size
+        self._flush_period_s = flush_period_s
+        self._poll_period_s = poll_period_s
+        self._storage = storage
+        self._cleaning = cleaning
+
+        # current throw
+        self._stamps: typing.List[int] = []
+        self._positions: typing.List[typing.Sequence[float]] = []
+        self._last_observation = 0.0
+
+        # finished throws (None: no more throws)
+        self._throws: queue.Queue = queue.Queue()
+        self._stop = threading.Event()
+        self._threads: typing.List[threading.Thread] = []
+        self._error: typing.Optional[BaseException] = None
+        self._nb_throws = 0
+        self._nb_written = 0
+
+    def start(self) -> None:
+        """
+        Starts the recording, or raise a ValueError if the group
+        can not be appended to.
+        """
+        if self._threads:
+            raise ValueError("StreamingRecorder: already started")
+        # creates the group (if need be), and checks it can be appended to
+        with MutableRecordedBallTrajectories(self._path) as rbt:
+            rbt.append_stamped_trajectories(self._group, [], self._storage)
+        self._stop.clear()
+        self._last_observation = time.monotonic()
+        self._threads = [
+            threading.Thread(target=self._read, daemon=True),
+            threading.Thread(target=self._write, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> int:
+        """
+        Stops the recording: the current throw is ended (observations
+        not consumed yet are ignored), and the method returns once all
+        the throws are written. Raises the error of the reader or
+        writer thread, if any.
+
+        Returns
+        -------
+        The number of trajectories written since the recording started.
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+        return self._nb_written
+
+    def nb_throws(self) -> int:
+        """
+        Returns the number of throws finished so far
+        (some of them possibly not written yet).
+        """
+        return self._nb_throws
+
+    def nb_written(self) -> int:
+        """
+        Returns the number of trajectories written so far.
+        """
+        return self._nb_written
+
+    def _next(self) -> typing.Optional[Observation]:
+        """
+        Returns the next observation of the source, or None
+        if none is available (after waiting the poll period).
+        """
+        if callable(self._source):
+            observation = self._source()
+            if observation is None:
+                self._stop.wait(self._poll_period_s)
+            return observation
+        try:
+            return self._source.get(timeout=self._poll_period_s)
+        except queue.Empty:
+            return None
+
+    def _process(self, observation: Observation) -> None:
+        ball_id, time_stamp, position = observation[:3]
+        # from nano to micro seconds
+        stamp = int(time_stamp * 1e-3)
+        if self._stamps and stamp - self._stamps[-1] > self._max_gap_us:
+            self._end_throw()
+        if ball_id < 0:
+            return
+        self._stamps.append(stamp)
+        self._positions.append(position)
+        self._last_observation = time.monotonic()
+
+    def _end_throw(self) -> None:
+        """
+        Sends the current throw to the writer thread (if it has
+        enough points) and starts a new one.
+        """
+        if len(self._stamps) >= self._min_points:
+            stamps = np.array(self._stamps, np.int64)
+            stamps -= stamps[0]
+            positions = np.array(self._positions, np.float32).reshape(-1, 3)
+            self._throws.put((stamps.astype(np.uint), positions))
+            self._nb_throws += 1
+        self._stamps, self._positions = [], []
+
+    def _read(self) -> None:
+        """
+        (reader thread) Consumes the observations until stopped.
+        """
+        max_gap_s = self._max_gap_us * 1e-6
+        try:
+            while not self._stop.is_set():
+                observation = self._next()
+                if observation is not None:
+                    self._process(observation)
+                elif (
+                    self._stamps
+                    and time.monotonic() - self._last_observation > max_gap_s
+                ):
+                    self._end_throw()
+            self._end_throw()
+        except BaseException as error:
+            self._error = error
+        finally:
+            self._throws.put(None)
+
+    def _next_batch(self, wait: bool) -> typing.Tuple[StampedTrajectories, bool]:
+        """
+        (writer thread) Returns the next batch of throws (at most
+        batch_size throws, waiting at most flush_period_s seconds
+        after the first one, or after the call if wait is False, in
+        which case the batch may be empty), cleaned if cleaning
+        parameters were provided, and whether the reader thread has
+        finished.
+        """
+        batch: StampedTrajectories = []
+        start = time.monotonic()
+        try:
+            throw = self._throws.get(timeout=None if wait else self._flush_period_s)
+        except queue.Empty:
+            return batch, False
+        if throw is None:
+            return batch, True
+        batch.append(throw)
+        done = False
+        deadline = (time.monotonic() if wait else start) + self._flush_period_s
+        while len(batch) < self._batch_size:
+            try:
+                throw = self._throws.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if throw is None:
+                done = True
+                break
+            batch.append(throw)
+        if self._cleaning is not None:
+            cleaning = self._cleaning
+            batch = [
+                trajectory
+                for throw in batch
+                for trajectory in clean_trajectory(throw, cleaning)
+            ]
+        return batch, done
+
+    def _write(self) -> None:
+        """
+        (writer thread) Writes the throws, per batch. If the file can not
+        be opened (OSError, e.g. kept open by a reader), the throws are
+        kept and written along with the next batch, the write being
+        retried at the latest flush_period_s seconds later. Once the
+        reader thread has finished, the error is raised if the
+        file still can not be opened.
+        """
+        pending: StampedTrajectories = []
+        done = False
+        try:
+            while not done:
+                batch, done = self._next_batch(wait=not pending)
+                pending += batch
+                if not pending:
+                    continue
+                try:
+                    self._append(pending)
+                except OSError:
+                    if done:
+                        raise
+                    continue
+                pending = []
+        except BaseException as error:
+            self._error = error
+            self._stop.set()
+
+    def _append(self, throws: StampedTrajectories) -> None:
+        with MutableRecordedBallTrajectories(self._path) as rbt:
+            rbt.append_stamped_trajectories(self._group, throws)
+        self._nb_written += len(throws)
+
+    def __enter__(self) -> StreamingRecorder:
+        self.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.stop()
+
+
+def _shared_memory(
+    name: str, create: bool = False, size: int = 0
+) -> shared_memory.SharedMemory:
+    """
+    Returns the (new or existing) shared memory segment, not tracked by
+    the multiprocessing resource tracker (which would otherwise unlink it
+    when the process exits, even if other processes still use it).
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    segment = shared_memory.SharedMemory(name, create, size)
+    resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore
+    return segment
+
+
+def _unlink_shared_memory(segment: shared_memory.SharedMemory) -> None:
+    """
+    Unlinks a segment created or attached via _shared_memory.
+    """
+    if sys.version_info < (3, 13):
+        # unlink unregisters the segment from the resource tracker,
+        # which expects it to be registered
+        resource_tracker.register(segment._name, "shared_memory")  # type: ignore
+    segment.unlink()
+
+
+@contextlib.contextmanager
+def _file_lock(path: pathlib.Path) -> typing.Generator[None, None, None]:
+    """
+    Inter-process lock, based on the lock of the file at path. The file
+    may be deleted by the holder of the lock, the processes waiting for
+    the lock then lock the file newly created at path.
+    """
+    while True:
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                locked = os.stat(path).st_ino == os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                locked = False
+            if not locked:
+                # the file has been deleted while waiting for the lock
+                fcntl.flock(f, fcntl.LOCK_UN)
+                continue
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            return
+
+
+def _is_alive(pid: int) -> bool:
+    """
+    Returns True if a process of this pid is running.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # running, but owned by another user
+        return True
+    return True
+
+
+def _drop_dead_users(users: npt.NDArray) -> None:
+    """
+    Frees the slots (see SharedTrajectories) of the users whose
+    process is no longer running (e.g. crashed before closing).
+    """
+    for slot in np.flatnonzero(users):
+        if not _is_alive(int(users[slot])):
+            users[slot] = 0
+
+
+def _release_shared(
+    header: shared_memory.SharedMemory,
+    data: shared_memory.SharedMemory,
+    lock_path: pathlib.Path,
+    slot: int,
+) -> None:
+    """
+    Frees the slot of the user of the shared segments, and unlinks
+    them (as well as the lock file) if there are no users left.
+    """
+    with _file_lock(lock_path):
+        users = SharedTrajectories._users(header)
+        users[slot] = 0
+        _drop_dead_users(users)
+        last_user = not users.any()
+        del users
+        if last_user:
+            _unlink_shared_memory(header)
+            _unlink_shared_memory(data)
+            lock_path.unlink()
+    for segment in (header, data):
+        try:
+            segment.close()
+        except BufferError:
+            # numpy views over the segment are still alive, the memory
+            # will be unmapped when the process exits
+            pass
+
+
+class SharedTrajectories:
+    """
+    Packed trajectories of a group (see RecordedBallTrajectories),
+    hosted in named shared memory, so that several processes can
+    access the same group without each loading it and holding its
+    own copy.
+
+    The first instance (in any process) related to a given group of
+    a given file reads the group and publishes it in shared memory.
+    Later instances attach to the shared memory segments (which takes
+    neither a read of the file nor memory allocation). Each instance
+    records the pid of its process in the segments (at most MAX_USERS
+    instances at a time). The segments are unlinked when the last
+    instance is closed (or garbage collected), instances of processes
+    which are no longer running (e.g. which crashed) being ignored.
+    Segments are named after the absolute path of the file, its
+    modification time and the group, so updating the file results in
+    new segments.
+
+    Parameters
+    ----------
+    group:
+      name of the group of trajectories
+    hdf5_path: optional
+      path to the hdf5 file (default file if None)
+    """
+
+    _PREFIX = "context_trajectories_"
+    MAX_USERS = 512
+
+    def __init__(self, group: str, hdf5_path: pathlib.Path = None):
+        if hdf5_path is None:
+            hdf5_path = RecordedBallTrajectories.get_default_path()
+        path = pathlib.Path(hdf5_path).resolve()
+        name = self._name(group, path)
+        lock_path = self._lock_path(name)
+
+        with _file_lock(lock_path):
+            try:
+                header = _shared_memory(name + "_h")
+                self.attached = True
+            except FileNotFoundError:
+                header = self._publish(name, group, path)
+                self.attached = False
+            # header: number of points, number of trajectories,
+            # pids of the users (0 for free slots)
+            nb_points, nb_trajectories = np.ndarray((2,), np.int64, header.buf)
+            users = self._users(header)
+            _drop_dead_users(users)
+            free_slots = np.flatnonzero(users == 0)
+            if not free_slots.size:
+                del users
+                header.close()
+                raise RuntimeError(
+                    "SharedTrajectories: more than {} users of group {}".format(
+                        self.MAX_USERS, group
+                    )
+                )
+            slot = int(free_slots[0])
+            users[slot] = os.getpid()
+            del users
+            data = _shared_memory(name + "_d")
+
+        self._finalizer = weakref.finalize(
+            self, _release_shared, header, data, lock_path, slot
+        )
+        self._packed, self._indexes = self._views(
+            data, int(nb_points), int(nb_trajectories)
+        )
+
+    @classmethod
+    def _name(cls, group: str, path: pathlib.Path) -> str:
+        """
+        Returns the name of the shared memory segments of the group of
+        the file (absolute path).
+        """
+        stat = path.stat()
+        key = "{}:{}:{}:{}".format(path, stat.st_mtime_ns, stat.st_size, group)
+        return cls._PREFIX + hashlib.sha1(key.encode()).hexdigest()[:24]
+
+    @staticmethod
+    def _lock_path(name: str) -> pathlib.Path:
+        """
+        Returns the path of the lock file of the shared memory segments.
+        """
+        return pathlib.Path(tempfile.gettempdir()) / "{}.lock".format(name)
+
+    @classmethod
+    def _users(cls, header: shared_memory.SharedMemory) -> npt.NDArray:
+        """
+        Returns the view over the pids of the users in the header segment.
+        """
+        return np.ndarray((cls.MAX_USERS,), np.int64, header.buf, 2 * 8)
+
+    @staticmethod
+    def _layout(nb_points: int, nb_trajectories: int) -> typing.List[int]:
+        """
+        Returns the positions, in the data segment, of the
+        time stamps, the offsets, the indexes and the positions
+        (and the total size).
+        """
+        stamps = 0
+        offsets = stamps + nb_points * 8
+        indexes = offsets + (nb_trajectories + 1) * 8
+        positions = indexes + nb_trajectories * 8
+        end = positions + nb_points * 3 * 4
+        return [stamps, offsets, indexes, positions, end]
+
+    @classmethod
+    def _views(
+        cls,
+        data: shared_memory.SharedMemory,
+        nb_points: int,
+        nb_trajectories: int,
+        writeable: bool = False,
+    ) -> typing.Tuple[PackedStampedTrajectories, npt.NDArray]:
+        """
+        Returns the numpy views over the data segment (packed
+        trajectories and indexes).
+        """
+        stamps, offsets, indexes, positions, _ = cls._layout(nb_points, nb_trajectories)
+        views = (
+            np.ndarray((nb_points,), np.uint64, data.buf, stamps),
+            np.ndarray((nb_points, 3), np.float32, data.buf, positions),
+            np.ndarray((nb_trajectories + 1,), np.int64, data.buf, offsets),
+        )
+        indexes_view = np.ndarray((nb_trajectories,), np.int64, data.buf, indexes)
+        for view in views + (indexes_view,):
+            view.flags.writeable = writeable
+        return views, indexes_view
+
+    @classmethod
+    def _publish(
+        cls, name: str, group: str, path: pathlib.Path
+    ) -> shared_memory.SharedMemory:
+        """
+        Reads the group and copies it in newly created shared memory
+        segments. Returns the header segment.
+        """
+        with RecordedBallTrajectories(path) as rbt:
+            packed = rbt.get_packed_trajectories(group)
+            indexes = rbt.get_indexes(group)
+        nb_points, nb_trajectories = len(packed[0]), len(packed[2]) - 1
+        size = cls._layout(nb_points, nb_trajectories)[-1]
+        data = _shared_memory(name + "_d", create=True, size=max(size, 1))
+        views, indexes_view = cls._views(
+            data, nb_points, nb_trajectories, writeable=True
+        )
+        for view, array in zip(views, packed):
+            view[...] = array
+        indexes_view[...] = indexes
+        del views, view, indexes_view
+        data.close()
+        header = _shared_memory(name + "_h", create=True, size=(2 + cls.MAX_USERS) * 8)
+        header_view = np.ndarray((2 + cls.MAX_USERS,), np.int64, header.buf)
+        header_view[:2] = (nb_points, nb_trajectories)
+        header_view[2:] = 0
+        del header_view
+        return header
+
+    def get(self) -> PackedStampedTrajectories:
+        """
+        Returns the packed trajectories (sorted per index), as read-only
+        numpy views over the shared memory (raises a ValueError if closed).
+        """
+        if not self._finalizer.alive:
+            raise ValueError("SharedTrajectories: already closed")
+        return self._packed
+
+    def get_indexes(self) -> typing.Tuple[int, ...]:
+        """
+        Returns the indexes of the trajectories of the group, in the order
+        of RecordedBallTrajectories.get_indexes (raises a ValueError if
+        closed).
+        """
+        if not self._finalizer.alive:
+            raise ValueError("SharedTrajectories: already closed")
+        return tuple(self._indexes.tolist())
+
+    def close(self) -> None:
+        """
+        Stop using the shared memory. Views returned by the get method
+        should not be used after this call.
+        """
+        self._packed = None  # type: ignore
+        self._indexes = None  # type: ignore
+        self._finalizer()
+
+    def __enter__(self) -> SharedTrajectories:
+        """
+        For the use of this class as a context manager
+        which closes the shared memory.
+        """
+        return self
+
+    def __exit__(self, type, value, traceback):
+        """
+        For the use of this class as a context manager
+        which closes the shared memory.
+        """
+        self.close()
+
+
+class _TrajectoryCache:
+    """
+    Least recently used cache of stamped trajectories,
+    keyed by trajectory index.
+    """
+
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError(
+                "trajectory cache: maxsize should be at least 1 ({} given)".format(
+                    maxsize
+                )
+            )
+        self._maxsize = maxsize
+        self._data: collections.OrderedDict[
+            int, StampedTrajectory
+        ] = collections.OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(
+        self, index: int, load: typing.Callable[[int], StampedTrajectory]
+    ) -> StampedTrajectory:
+        """
+        Returns the cached trajectory, or calls load
+        (and caches the result) if not present in the cache.
+        """
+        try:
+            stamped_trajectory = self._data[index]
+        except KeyError:
+            self._misses += 1
+            stamped_trajectory = load(index)
+            self._data[index] = stamped_trajectory
+            if len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+            return stamped_trajectory
+        self._hits += 1
+        self._data.move_to_end(index)
+        return stamped_trajectory
+
+    def info(self) -> CacheInfo:
+        """
+        Returns the hits/misses counters and the size of the cache.
+        """
+        return CacheInfo(self._hits, self._misses, self._maxsize, len(self._data))
+
 
 class BallTrajectories:
     """
     Convenience wrapper over a hdf5 file which contains
     sets ("groups") of ball trajectories.
 
-    The constructor loads a group of trajectories in the memory,
+    By default, the constructor loads a group of trajectories in the memory,
     and methods provide convenience functions to access them.
+    In lazy mode, only the list of indexes is read at construction, and
+    trajectories are read from the file when requested (the most recently
+    used ones being kept in a cache of bounded size). The hdf5 file then
+    stays open until the close method is called (or use the context
+    manager of this class).
+    In shared mode, the trajectories are hosted in shared memory and
+    are shared (read only) by all the instances using the same group of
+    the same file, including instances of other processes (see
+    SharedTrajectories). The shared memory is released by the close method
+    (or use the context manager of this class).
 
     A trajectory is tuple of two lists, one with time stamps
     (in microseconds) and one with related 3d positions.
@@ -443,44 +3009,165 @@ class BallTrajectories:
       the default file will be used (i.e. either
       ~/.mpi-is/pam/context/ball_trajectories.hdf5 or
       /opt/mpi-is/pam/context/ball_trajectories.hdf5
+    lazy: optional
+      if True, trajectories are read from the file on demand
+      rather than all loaded at construction
+    cache_size: optional
+      (lazy mode only) maximal number of trajectories kept
+      in memory
+    shared: optional
+      if True, the trajectories are hosted in shared memory
+      (can not be used along with lazy)
+    profile: optional
+      if True (or a Profiler instance), the reading of the trajectories
+      is profiled (see profile_stats)
     """
 
-    def __init__(self, group: str, hdf5_path: pathlib.Path = None):
+    DEFAULT_CACHE_SIZE = 128
+
+    def __init__(
+        self,
+        group: str,
+        hdf5_path: pathlib.Path = None,
+        lazy: bool = False,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        shared: bool = False,
+        profile: typing.Union[bool, Profiler] = False,
+    ):
+        if lazy and shared:
+            raise ValueError(
+                "BallTrajectories: lazy and shared modes are mutually exclusive"
+            )
         if hdf5_path is None:
             hdf5_path = RecordedBallTrajectories.get_default_path()
 
         self._path: pathlib.Path = hdf5_path
+        self._group = group
+        self._rbt: typing.Optional[RecordedBallTrajectories] = None
+        self._cache: typing.Optional[_TrajectoryCache] = None
+        self._shared: typing.Optional[SharedTrajectories] = None
+        self._data: typing.Dict[int, StampedTrajectory] = {}
+        self._profiler = _profiler(profile)
+
+        if lazy:
+            self._cache = _TrajectoryCache(cache_size)
+            self._rbt = RecordedBallTrajectories(hdf5_path, profile=self._profiler)
+            try:
+                self._indexes = self._rbt.get_indexes(group)
+            except KeyError:
+                self.close()
+                raise
+        elif shared:
+            with self._profiler.stage("shared") as stage:
+                self._shared = SharedTrajectories(group, hdf5_path)
+                self._indexes = self._shared.get_indexes()
+                # (packed trajectories sorted per index)
+                trajectories = dict(
+                    zip(sorted(self._indexes), unpack(self._shared.get()))
+                )
+                self._data = {index: trajectories[index] for index in self._indexes}
+                stage.add(trajectories=len(self._data))
+        else:
+            with RecordedBallTrajectories(hdf5_path, profile=self._profiler) as rbt:
+                self._data = rbt.get_stamped_trajectories(group, direct=True)
+            self._indexes = tuple(self._data.keys())
+
+    def is_lazy(self) -> bool:
+        """
+        Returns True if the trajectories are read from the
+        file on demand.
+        """
+        return self._cache is not None
 
-        with RecordedBallTrajectories(hdf5_path) as rbt:
-            self._data: typing.Dict[
-                int, StampedTrajectory
-            ] = rbt.get_stamped_trajectories(group, direct=True)
+    def profile_stats(self) -> ProfileStats:
+        """
+        Returns the statistics recorded since the instance was created
+        (empty if profiling is disabled, see the profile argument).
+        """
+        return self._profiler.stats()
+
+    def cache_info(self) -> CacheInfo:
+        """
+        Returns the hits/misses counters of the cache of
+        trajectories (lazy mode only, raises a ValueError otherwise).
+        """
+        if self._cache is None:
+            raise ValueError(
+                "BallTrajectories: cache information only available in lazy mode"
+            )
+        return self._cache.info()
+
+    def _read(self, index: int) -> StampedTrajectory:
+        """
+        (lazy mode) reads the trajectory from the file.
+        """
+        if self._rbt is None:
+            raise ValueError("BallTrajectories: hdf5 file already closed")
+        return self._rbt.get_stamped_trajectory(self._group, index, direct=True)
+
+    def _get(self, index: int) -> StampedTrajectory:
+        if self._cache is None:
+            return self._data[index]
+        return self._cache.get(index, self._read)
+
+    def close(self):
+        """
+        Close the hdf5 file (lazy mode) or release the shared memory
+        (shared mode). No effect otherwise.
+        """
+        if self._rbt is not None:
+            self._rbt.close()
+            self._rbt = None
+        if self._shared is not None:
+            self._data = {}
+            self._shared.close()
+            self._shared = None
+
+    def __enter__(self) -> BallTrajectories:
+        """
+        For the use of this class as a context manager
+        which closes the hdf5 (lazy mode) or releases the shared
+        memory (shared mode).
+        """
+        return self
+
+    def __exit__(self, type, value, traceback):
+        """
+        For the use of this class as a context manager
+        which closes the hdf5 (lazy mode) or releases the shared
+        memory (shared mode).
+        """
+        self.close()
 
     def size(self) -> int:
         """
-        Returns the number of trajectories that have been loaded.
+        Returns the number of trajectories of the group.
         """
-        return len(self._data)
+        return len(self._indexes)
 
     def get_all_trajectories(self) -> typing.Dict[int, StampedTrajectory]:
         """
         Returns a dictionary with key the index of the trajectory and
         the trajectories as values.
+        In lazy mode, all the trajectories are read from the file
+        (without being cached).
         """
+        if self._rbt is not None:
+            return {index: self._read(index) for index in self._indexes}
         return self._data
 
     def get_trajectory(self, index: int) -> StampedTrajectory:
         """
         Returns the trajectory at the requested index.
         """
-        return self._data[index]
+        return self._get(index)
 
     def random_trajectory(self) -> StampedTrajectory:
         """
         Returns one of the trajectory, randomly selected.
         """
-        index = random.choice(list(range(len(self._data.keys()))))
-        return self._data[index]
+        index = random.choice(list(range(self.size())))
+        return self._get(index)
 
     def get_different_random_trajectories(
         self, nb_trajectories: int
@@ -494,16 +3181,21 @@ class BallTrajectories:
                 "BallTrajectories: only {} trajectories "
                 "available ({} requested)".format(self.size(), nb_trajectories)
             )
-        indexes = list(self._data.keys())
+        indexes = list(self._indexes)
         random.shuffle(indexes)
-        return [self._data[index] for index in indexes[:nb_trajectories]]
+        return [self._get(index) for index in indexes[:nb_trajectories]]
 
     @staticmethod
-    def to_duration(input: StampedTrajectory) -> DurationTrajectory:
+    def to_duration(
+        input: StampedTrajectory,
+        estimator: str = "forward",
+        window: typing.Optional[int] = None,
+    ) -> DurationTrajectory:
         """
         Returns a corresponding duration trajectory
+        (see to_duration_trajectory)
         """
-        return to_duration_trajectory(input)
+        return to_duration_trajectory(input, estimator, window)
 
     @classmethod
     def iterate(
@@ -514,11 +3206,196 @@ class BallTrajectories:
         Yields tuples (duration in microseconds, state), state having
         a position and a velocity attribute.
         """
+        import o80
+
         durations, positions, velocities = cls.to_duration(input)
         for d, p, v in zip(durations, positions, velocities):
             yield d, o80.Item3dState(p, v)
         return
 
+    @classmethod
+    def iterate_chunks(
+        cls,
+        input: typing.Union[StampedTrajectory, DurationTrajectory],
+        chunk_size: int = 100,
+    ) -> typing.Generator[DurationTrajectory, None, None]:
+        """
+        Generator over the trajectory, by chunks of (at most) chunk_size
+        points. Yields tuples (durations in microseconds, positions,
+        velocities), which are views over contiguous arrays (no data
+        is copied). The input is either a stamped trajectory (converted
+        via to_duration) or a duration trajectory (e.g. the output of
+        to_duration, computed once and reused for several playbacks).
+        """
+        if chunk_size < 1:
+            raise ValueError(
+                "chunk size should be at least 1 ({} given)".format(chunk_size)
+            )
+        if len(input) == 2:
+            input = cls.to_duration(typing.cast("StampedTrajectory", input))
+        durations, positions, velocities = (
+            np.ascontiguousarray(array) for array in input
+        )
+        for start in range(0, len(durations), chunk_size):
+            end = start + chunk_size
+            yield durations[start:end], positions[start:end], velocities[start:end]
+        return
+
+    @classmethod
+    def feed(
+        cls,
+        frontend,
+        input: typing.Union[StampedTrajectory, DurationTrajectory],
+        chunk_size: int = 100,
+        pulse: bool = False,
+    ) -> int:
+        """
+        Adds to the o80 frontend one queued command per point of the
+        trajectory (position, velocity and duration), going over the
+        trajectory via iterate_chunks. o80 frontends do not provide
+        a bulk call adding several commands at once, so one add_command
+        call per point is still required, but the rows of the chunk
+        arrays are passed directly (i.e. no python list, numpy scalar
+        or o80.Item3dState is created per point).
+        If pulse is True, the frontend is pulsed after each chunk of
+        (at most) chunk_size commands (i.e. commands are sent to the
+        backend chunk per chunk), otherwise pulsing is left to the caller.
+
+        Returns
+        -------
+        The number of commands added to the frontend.
+        """
+        import o80
+
+        if chunk_size < 1:
+            raise ValueError(
+                "chunk size should be at least 1 ({} given)".format(chunk_size)
+            )
+        if len(input) == 2:
+            input = cls.to_duration(typing.cast("StampedTrajectory", input))
+        nb_commands = len(input[0])
+        if not pulse:
+            chunk_size = max(nb_commands, 1)
+
+        add_command = frontend.add_command
+        microseconds = o80.Duration_us.microseconds
+        queue = o80.Mode.QUEUE
+        for durations, positions, velocities in cls.iterate_chunks(input, chunk_size):
+            for duration, position, velocity in zip(
+                durations.tolist(), positions, velocities
+            ):
+                add_command(position, velocity, microseconds(duration), queue)
+            if pulse:
+                frontend.pulse()
+        return nb_commands
+
+
+def _line_trajectories(
+    starts: npt.NDArray,
+    ends: npt.NDArray,
+    durations: npt.NDArray,
+    sampling_rate: float,
+    min_nb_steps: int,
+) -> PackedDurationTrajectories:
+    """
+    Returns the packed duration trajectories corresponding to points
+    going from the starts to the ends (2d arrays, one row per trajectory)
+    over the durations (1d array, seconds) at constant velocity.
+    """
+    vectors = ends - starts
+
+    # the velocity vectors
+    velnd = (vectors / durations[:, np.newaxis]).astype(np.float32)
+
+    # discrete number of steps to go from start
+    # to end at given speed and sampling rate
+    nb_steps = ((durations / sampling_rate) + 0.5).astype(np.int64)
+    nb_steps = np.maximum(nb_steps, min_nb_steps)
+    offsets = np.zeros(len(nb_steps) + 1, np.int64)
+    offsets[1:] = np.cumsum(nb_steps)
+
+    # for each point: index of its trajectory and of its step
+    # in the trajectory (starting at 1, as the start point is not
+    # part of the trajectory)
+    trajectory_indexes = np.repeat(np.arange(len(nb_steps)), nb_steps)
+    steps = np.arange(offsets[-1]) - offsets[trajectory_indexes] + 1
+
+    # point at each step, translated from start along the vector
+    fractions = steps / nb_steps[trajectory_indexes]
+    positions = (
+        starts[trajectory_indexes]
+        + vectors[trajectory_indexes] * fractions[:, np.newaxis]
+    ).astype(np.float32)
+    velocities = velnd[trajectory_indexes]
+
+    # durations in microseconds
+    durations_us = np.full(offsets[-1], int(sampling_rate * 1e6))
+
+    return durations_us, positions, velocities, offsets
+
+
+def _as_points(points: typing.Sequence) -> npt.NDArray:
+    """
+    Returns the points (one point per row) as a 2d float64 array.
+    """
+    return np.atleast_2d(np.asarray(points, np.float64))
+
+
+def velocity_line_trajectories(
+    starts: typing.Sequence[typing.Sequence[float]],
+    ends: typing.Sequence[typing.Sequence[float]],
+    velocities: typing.Union[float, typing.Sequence[float]],
+    sampling_rate: float = 0.01,
+) -> PackedDurationTrajectories:
+    """
+    Batch version of velocity_line_trajectory: starts and ends
+    being sequences of n dimentional points and velocities either
+    a float (meter per seconds, applied to all trajectories) or one float
+    per trajectory, returns all the duration trajectories packed
+    into arrays, along with their offsets (see unpack_durations).
+    """
+    starts_, ends_ = _as_points(starts), _as_points(ends)
+    distances = np.sqrt(((ends_ - starts_) ** 2).sum(axis=1))
+    durations = distances / np.broadcast_to(
+        np.asarray(velocities, np.float64), distances.shape
+    )
+    return _line_trajectories(starts_, ends_, durations, sampling_rate, 0)
+
+
+def duration_line_trajectories(
+    starts: typing.Sequence[typing.Sequence[float]],
+    ends: typing.Sequence[typing.Sequence[float]],
+    durations_ms: typing.Union[float, typing.Sequence[float]],
+    sampling_rate: float = 0.01,
+) -> PackedDurationTrajectories:
+    """
+    Batch version of duration_line_trajectory: starts and ends
+    being sequences of n dimentional points and durations_ms either
+    a float (milliseconds, applied to all trajectories) or one float
+    per trajectory, returns all the duration trajectories packed
+    into arrays, along with their offsets (see unpack_durations).
+    """
+    starts_, ends_ = _as_points(starts), _as_points(ends)
+    durations = np.broadcast_to(
+        np.asarray(durations_ms, np.float64) / 1000.0, (starts_.shape[0],)
+    )
+    return _line_trajectories(starts_, ends_, durations, sampling_rate, 1)
+
+
+def unpack_durations(
+    packed: PackedDurationTrajectories,
+) -> typing.List[DurationTrajectory]:
+    """
+    Returns the list of duration trajectories (views over the
+    packed arrays) corresponding to the output of
+    velocity_line_trajectories or duration_line_trajectories.
+    """
+    durations, positions, velocities, offsets = packed
+    return [
+        (durations[start:end], positions[start:end], velocities[start:end])
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
 
 def velocity_line_trajectory(
     start: typing.Sequence[float],
@@ -526,7 +3403,6 @@ def velocity_line_trajectory(
     velocity: float,
     sampling_rate: float = 0.01,
 ) -> DurationTrajectory:
-
     """
     Start and end being n dimentional points, velocity
     a float value (meter per seconds) and the sampling
@@ -534,41 +3410,9 @@ def velocity_line_trajectory(
     trajectory corresponding to a point going from
     start to end at the given velocity
     """
-
-    # vector between end and start
-    vector = [e - s for e, s in zip(end, start)]
-
-    # distance between end and start
-    distance = math.sqrt(sum([v**2 for v in vector]))
-
-    # duration of motion between start and end,
-    # at constant velocity
-    duration = distance / velocity
-
-    # the velocity vector
-    velnd = np.array([v / duration for v in vector], np.float32)
-
-    # discrete number of steps to go from start
-    # to end at given speed and sampling rate
-    nb_steps = int((duration / sampling_rate) + 0.5)
-
-    # displacement vector of one step
-    step = [v / nb_steps for v in vector]
-
-    # creating the trajectory, translating
-    # one displacement vector per step
-    point = start
-    positions_list = []
-    for cstep in range(nb_steps):
-        point = [p + s for p, s in zip(point, step)]
-        positions_list.append(np.array(point, np.float32))
-    positions = np.array(positions_list, np.float32)
-    velocities = np.array([velnd] * len(positions), np.float32)
-
-    # durations in microseconds
-    durations = np.array([int(sampling_rate * 1e6)] * nb_steps)
-
-    # returning the trajectory
+    durations, positions, velocities, _ = velocity_line_trajectories(
+        [start], [end], velocity, sampling_rate
+    )
     return durations, positions, velocities
 
 
@@ -578,7 +3422,6 @@ def duration_line_trajectory(
     duration_ms: float,
     sampling_rate: float = 0.01,
 ) -> DurationTrajectory:
-
     """
     Start and end being n dimentional points, duration
     a float value (milliseconds) and the sampling
@@ -586,38 +3429,7 @@ def duration_line_trajectory(
     trajectory corresponding to a point going from
     start to end over the provided duration
     """
-
-    # vector between end and start
-    vector = [e - s for e, s in zip(end, start)]
-
-    # duration of motion between start and end,
-    # at constant velocity
-    duration = duration_ms / 1000.0
-
-    # the velocity vector
-    velnd = np.array([v / duration for v in vector], np.float32)
-
-    # discrete number of steps to go from start
-    # to end at given speed and sampling rate
-    nb_steps = int((duration / sampling_rate) + 0.5)
-    if nb_steps == 0:
-        nb_steps = 1
-
-    # displacement vector of one step
-    step = [v / nb_steps for v in vector]
-
-    # creating the trajectory, translating
-    # one displacement vector per step
-    point = start
-    positions_list = []
-    for cstep in range(nb_steps):
-        point = [p + s for p, s in zip(point, step)]
-        positions_list.append(np.array(point, np.float32))
-    positions = np.array(positions_list, np.float32)
-    velocities = np.array([velnd] * len(positions), np.float32)
-
-    # durations in microseconds
-    durations = np.array([int(sampling_rate * 1e6)] * nb_steps)
-
-    # returning the trajectory
+    durations, positions, velocities, _ = duration_line_trajectories(
+        [start], [end], duration_ms, sampling_rate
+    )
     return durations, positions, velocities
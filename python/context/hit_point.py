@@ -1,22 +1,26 @@
 class HitPoint:
+
+    # see context_wrp.CompactHitPoint for a native version
+    __slots__ = ("_table_height", "_default_position", "_hit_position", "_buffer")
+
     def __init__(self, table_height, default_position=[-10, -10, -10]):
         self._table_height = table_height
         self._default_position = default_position
-        self._hit_position = None
+        self.reset()
 
     def reset(self):
         self._hit_position = None
+        # the hit position is copied in this list (rather than keeping
+        # a reference to the caller's sequence)
+        self._buffer = [None] * 3
 
     def update(self, ball_position, racket_contact_information):
         if self._hit_position is not None:
             return self._hit_position
-        hit_racket = False
-        if racket_contact_information.contact_occured:
-            hit_racket = True
-        if not hit_racket:
+        if not racket_contact_information.contact_occured:
             return self._default_position
-        if hit_racket:
-            if ball_position[2] < (self._table_height + 0.02):
-                self._hit_position = ball_position
-                return self._hit_position
+        if ball_position[2] < (self._table_height + 0.02):
+            self._buffer[:] = ball_position
+            self._hit_position = self._buffer
+            return self._hit_position
         return self._default_position
@@ -0,0 +1,107 @@
+#include "context/ball_status.hpp"
+
+namespace context
+{
+BallStatus::BallStatus() : BallStatus(Coordinates{0, 0, 0})
+{
+}
+
+BallStatus::BallStatus(const Coordinates& target_position_,
+                       double target_distance_z_epsilon_)
+    : target_position(target_position_),
+      target_distance_z_epsilon(target_distance_z_epsilon_)
+{
+    reset();
+}
+
+void BallStatus::reset()
+{
+    double inf = std::numeric_limits<double>::infinity();
+    hit_racket = false;
+    min_position_ball_target = {0, 0, 0};
+    min_position_ball_target_set = false;
+    min_distance_ball_racket = inf;
+    min_distance_ball_target = inf;
+    max_ball_velocity = 0;
+    min_z = inf;
+    max_y = -inf;
+    ball_position = {0, 0, 0};
+    ball_velocity = {0, 0, 0};
+}
+
+void BallStatus::update(const State& ball_state,
+                        const ContactInformation& racket_contact_information)
+{
+    update(
+        ball_state.position, ball_state.velocity, racket_contact_information);
+}
+
+bool BallStatus::contact_occured() const
+{
+    return hit_racket;
+}
+
+void BallStatus::update(const Coordinates& ball_position_,
+                        const Coordinates& ball_velocity_,
+                        const ContactInformation& racket_contact_information)
+{
+    ball_position = ball_position_;
+    ball_velocity = ball_velocity_;
+
+    // lowest and furthest ever observed position of the ball
+    if (ball_position[2] < min_z)
+    {
+        min_z = ball_position[2];
+    }
+    if (ball_position[1] > max_y)
+    {
+        max_y = ball_position[1];
+    }
+
+    // min distance ball/racket (until contact)
+    if (racket_contact_information.contact_occured)
+    {
+        hit_racket = true;
+    }
+    else if (!hit_racket)
+    {
+        min_distance_ball_racket = racket_contact_information.minimal_distance;
+    }
+
+    if (!hit_racket)
+    {
+        return;
+    }
+
+    // post contact with the racket: min distance ball/target
+    // (at the height of the target) and max ball velocity
+    if (std::fabs(ball_position[2] - target_position[2]) <=
+        target_distance_z_epsilon)
+    {
+        double sum = 0;
+        for (int i = 0; i < 3; i++)
+        {
+            double d = target_position[i] - ball_position[i];
+            sum += d * d;
+        }
+        double distance = std::sqrt(sum);
+        if (distance <= min_distance_ball_target)
+        {
+            min_distance_ball_target = distance;
+            min_position_ball_target = ball_position;
+            min_position_ball_target_set = true;
+        }
+    }
+    double sum = 0;
+    for (int i = 0; i < 3; i++)
+    {
+        sum += ball_velocity[i] * ball_velocity[i];
+    }
+    double velocity = std::sqrt(sum);
+    if (velocity > max_ball_velocity)
+    {
+        max_ball_velocity = velocity;
+    }
+}
+
+}  // namespace context
@@ -0,0 +1,47 @@
+#include "context/hit_point.hpp"
+
+namespace context
+{
+HitPoint::HitPoint() : HitPoint(0)
+{
+}
+
+HitPoint::HitPoint(double table_height_, const Coordinates& default_position_)
+    : table_height(table_height_),
+      default_position(default_position_),
+      hit_position{0, 0, 0},
+      hit(false)
+{
+}
+
+void HitPoint::reset()
+{
+    hit = false;
+}
+
+const Coordinates& HitPoint::update(
+    const Coordinates& ball_position,
+    const ContactInformation& racket_contact_information)
+{
+    if (hit)
+    {
+        return hit_position;
+    }
+    if (racket_contact_information.contact_occured &&
+        ball_position[2] < table_height + 0.02)
+    {
+        hit_position = ball_position;
+        hit = true;
+        return hit_position;
+    }
+    return default_position;
+}
+
+const Coordinates& HitPoint::update(
+    const State& ball_state,
+    const ContactInformation& racket_contact_information)
+{
+    return update(ball_state.position, racket_contact_information);
+}
+
+}  // namespace context
@@ -1,36 +1,87 @@
 #include "context/low_pass_filter.hpp"
 
+#include <stdexcept>
+#include <string>
+
 namespace context
 {
-LowPassFilter::LowPassFilter() : average_size_(1), sum_(0)
+namespace
+{
+size_t checked_average_size(int average_size)
+{
+    if (average_size < 1)
+    {
+        throw std::invalid_argument(
+            "LowPassFilter: average size should be at least 1 (" +
+            std::to_string(average_size) + " given)");
+    }
+    return static_cast<size_t>(average_size);
+}
+}  // namespace
+
+LowPassFilter::LowPassFilter() : LowPassFilter(1)
 {
-    values_.resize(1);
 }
 
-LowPassFilter::LowPassFilter(size_t average_size)
-    : average_size_(average_size), sum_(0)
+LowPassFilter::LowPassFilter(int average_size)
+    : average_size_(checked_average_size(average_size)),
+      values_(average_size_, 0.0),
+      head_(0),
+      count_(0),
+      sum_(0)
 {
 }
 
-void LowPassFilter::set_average_size(size_t average_size)
+void LowPassFilter::set_average_size(int average_size)
 {
-    average_size_ = average_size;
-    values_.resize(average_size);
+    // the moving window restarts empty, i.e. averages are computed over
+    // the values received so far until the window is full (as for a
+    // filter constructed with this average size)
+    average_size_ = checked_average_size(average_size);
+    values_.assign(average_size_, 0.0);
+    head_ = 0;
+    count_ = 0;
+    sum_ = 0;
 }
 
 double LowPassFilter::get(double value)
 {
-    if (average_size_ == 1)
+    if (average_size_ <= 1)
     {
         return value;
     }
-    if (values_.size() == average_size_)
+    if (count_ == average_size_)
+    {
+        sum_ -= values_[head_];
+    }
+    else
     {
-        sum_ -= values_.front();
-        values_.pop_front();
+        count_++;
     }
+    values_[head_] = value;
     sum_ += value;
-    values_.push_back(value);
-    return sum_ / static_cast<double>(values_.size());
+    head_++;
+    if (head_ == average_size_)
+    {
+        head_ = 0;
+        // exact sum of the window, discarding the rounding
+        // errors of the successive additions and subtractions
+        sum_ = 0;
+        for (size_t i = 0; i < count_; i++)
+        {
+            sum_ += values_[i];
+        }
+    }
+    return sum_ / static_cast<double>(count_);
+}
+
+void LowPassFilter::filter(size_t nb_values,
+                           const double* input,
+                           double* output)
+{
+    for (size_t i = 0; i < nb_values; i++)
+    {
+        output[i] = get(input[i]);
+    }
 }
 }  // namespace context
@@ -38,7 +38,11 @@ Rotation::Rotation(double alpha, double beta, double gamma)
     rotation_ = rx * ry * rz;
 }
 
-void Rotation::rotate(Coordinates& coordinates)
+Rotation::Rotation(const Eigen::Matrix3d& matrix) : rotation_(matrix)
+{
+}
+
+void Rotation::rotate(Coordinates& coordinates) const
 {
     Eigen::Vector3d v(coordinates.data());
     v = rotation_ * v;
@@ -47,4 +51,19 @@ void Rotation::rotate(Coordinates& coordinates)
     coordinates[2] = v[2];
 }
 
+Rotation Rotation::inverse() const
+{
+    return Rotation(Eigen::Matrix3d(rotation_.transpose()));
+}
+
+Rotation Rotation::compose(const Rotation& other) const
+{
+    return Rotation(Eigen::Matrix3d(rotation_ * other.rotation_));
+}
+
+const Eigen::Matrix3d& Rotation::matrix() const
+{
+    return rotation_;
+}
+
 }  // namespace context
@@ -10,7 +10,12 @@ Transform::Transform(double alpha,
 {
 }
 
-void Transform::apply(Coordinates& coordinates)
+Transform::Transform(const Rotation& rotation, Coordinates translation)
+    : rotation_(rotation), translation_(translation)
+{
+}
+
+void Transform::apply(Coordinates& coordinates) const
 {
     rotation_.rotate(coordinates);
     for (int i = 0; i < 3; i++)
@@ -19,4 +24,35 @@ void Transform::apply(Coordinates& coordinates)
     }
 }
 
+Transform Transform::inverse() const
+{
+    // x = R^-1 (y - t) = R^-1 y - R^-1 t
+    Rotation inverse_rotation = rotation_.inverse();
+    Coordinates translation = translation_;
+    inverse_rotation.rotate(translation);
+    for (int i = 0; i < 3; i++)
+    {
+        translation[i] = -translation[i];
+    }
+    return Transform(inverse_rotation, translation);
+}
+
+Transform Transform::compose(const Transform& other) const
+{
+    // R1 (R2 x + t2) + t1 = R1 R2 x + (R1 t2 + t1)
+    Coordinates translation = other.translation_;
+    apply(translation);
+    return Transform(rotation_.compose(other.rotation_), translation);
+}
+
+const Rotation& Transform::rotation() const
+{
+    return rotation_;
+}
+
+const Coordinates& Transform::translation() const
+{
+    return translation_;
+}
+
 }  // namespace context
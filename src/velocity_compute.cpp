@@ -23,8 +23,13 @@ double VelocityCompute::get(long diff_time, double position)
         previous_position_ = position;
         initialized_ = true;
     }
-    double dx =
-        (position - previous_position_) / static_cast<double>(diff_time);
+    // no time elapsed (first call or duplicated time stamp):
+    // no motion (rather than a division by zero)
+    double dx = 0;
+    if (diff_time != 0)
+    {
+        dx = (position - previous_position_) / static_cast<double>(diff_time);
+    }
     previous_position_ = position;
     return filter_.get(dx);
 }
@@ -1,10 +1,19 @@
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <cstdint>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
 #include "context/ball.hpp"
+#include "context/ball_status.hpp"
 #include "context/contact_information.hpp"
 #include "context/coordinates.hpp"
+#include "context/hit_point.hpp"
 #include "context/low_pass_filter.hpp"
 #include "context/rotation.hpp"
+#include "context/stamped_trajectory_chunk.hpp"
 #include "context/state.hpp"
 #include "context/transform.hpp"
 #include "context/velocity_compute.hpp"
@@ -12,14 +21,512 @@
 
 using namespace context;
 
+template <typename T>
+using CArray = pybind11::array_t<T, pybind11::array::c_style>;
+
+/**
+ * Returns a new array of the given shape if out is None, or out if it
+ * is a C contiguous array of the given shape and of the T dtype
+ * (throws std::invalid_argument with the error message otherwise).
+ */
+template <typename T>
+CArray<T> output_array(pybind11::object out,
+                       const std::vector<pybind11::ssize_t>& shape,
+                       const std::string& error)
+{
+    if (out.is_none())
+    {
+        return CArray<T>(shape);
+    }
+    CArray<T> array = out.cast<CArray<T>>();
+    // (a copy is made if out is not C contiguous or of another dtype)
+    if (array.ptr() != out.ptr() ||
+        static_cast<std::size_t>(array.ndim()) != shape.size())
+    {
+        throw std::invalid_argument(error);
+    }
+    for (std::size_t i = 0; i < shape.size(); i++)
+    {
+        if (array.shape(i) != shape[i])
+        {
+            throw std::invalid_argument(error);
+        }
+    }
+    return array;
+}
+
+/**
+ * Ball::update_batch over numpy arrays: time stamps (N),
+ * positions (N x 3), and optionally the output array (N x 2 x 3,
+ * float64, allocated if None), which is returned.
+ * The arrays are not copied and the GIL is released while the
+ * ball is updated.
+ */
+template <typename Stamp, typename Real>
+pybind11::array_t<double> ball_update_batch(Ball& ball,
+                                            CArray<Stamp> time_stamps,
+                                            CArray<Real> positions,
+                                            pybind11::object out)
+{
+    if (time_stamps.ndim() != 1)
+    {
+        throw std::invalid_argument(
+            "Ball.update_batch: time stamps should be a 1d array");
+    }
+    std::size_t nb_points = static_cast<std::size_t>(time_stamps.shape(0));
+    if (positions.ndim() != 2 ||
+        static_cast<std::size_t>(positions.shape(0)) != nb_points ||
+        positions.shape(1) != 3)
+    {
+        throw std::invalid_argument(
+            "Ball.update_batch: positions should be a (N, 3) array, "
+            "N being the number of time stamps");
+    }
+    CArray<double> states = output_array<double>(
+        out,
+        {time_stamps.shape(0), 2, 3},
+        "Ball.update_batch: out should be a C contiguous (N, 2, 3) "
+        "float64 array, N being the number of time stamps");
+    const Stamp* stamps_data = time_stamps.data();
+    const Real* positions_data = positions.data();
+    double* states_data = states.mutable_data();
+    {
+        pybind11::gil_scoped_release release;
+        ball.update_batch(nb_points, stamps_data, positions_data, states_data);
+    }
+    return states;
+}
+
+/**
+ * LowPassFilter::filter over a 1d numpy array, the filtered values
+ * being written in out (allocated if None, may be values), which is
+ * returned. The GIL is released while filtering.
+ */
+pybind11::array_t<double> low_pass_filter_filter(LowPassFilter& filter,
+                                                 CArray<double> values,
+                                                 pybind11::object out)
+{
+    if (values.ndim() != 1)
+    {
+        throw std::invalid_argument(
+            "LowPassFilter.filter: values should be a 1d array");
+    }
+    CArray<double> filtered = output_array<double>(
+        out,
+        {values.shape(0)},
+        "LowPassFilter.filter: out should be a C contiguous float64 array "
+        "of the same size as values");
+    std::size_t nb_values = static_cast<std::size_t>(values.shape(0));
+    const double* input = values.data();
+    double* output = filtered.mutable_data();
+    {
+        pybind11::gil_scoped_release release;
+        filter.filter(nb_values, input, output);
+    }
+    return filtered;
+}
+
+template <typename Stamp, typename Real>
+void def_ball_update_batch(pybind11::class_<Ball>& ball)
+{
+    ball.def("update_batch",
+             &ball_update_batch<Stamp, Real>,
+             pybind11::arg("time_stamps"),
+             pybind11::arg("positions"),
+             pybind11::arg("out") = pybind11::none());
+}
+
+/**
+ * Apply function (Rotation::rotate or Transform::apply) to the
+ * points (N x 3 numpy array), the result being written in out
+ * (allocated if None, may be points), which is returned.
+ * The GIL is released while the points are transformed.
+ */
+template <typename Real, typename Function>
+CArray<Real> transform_points(CArray<Real> points,
+                              pybind11::object out,
+                              const std::string& name,
+                              Function function)
+{
+    if (points.ndim() != 2 || points.shape(1) != 3)
+    {
+        throw std::invalid_argument(name +
+                                    ": points should be a (N, 3) array");
+    }
+    CArray<Real> transformed = output_array<Real>(
+        out,
+        {points.shape(0), 3},
+        name + ": out should be a C contiguous array of the same shape "
+               "and dtype as points");
+    std::size_t nb_points = static_cast<std::size_t>(points.shape(0));
+    const Real* input = points.data();
+    Real* output = transformed.mutable_data();
+    {
+        pybind11::gil_scoped_release release;
+        function(nb_points, input, output);
+    }
+    return transformed;
+}
+
+/**
+ * Rotation from its 3 x 3 matrix (numpy array)
+ */
+Rotation rotation_from_matrix(CArray<double> matrix)
+{
+    if (matrix.ndim() != 2 || matrix.shape(0) != 3 || matrix.shape(1) != 3)
+    {
+        throw std::invalid_argument(
+            "Rotation: the matrix should be a (3, 3) array");
+    }
+    Eigen::Matrix3d m;
+    for (pybind11::ssize_t row = 0; row < 3; row++)
+    {
+        for (pybind11::ssize_t col = 0; col < 3; col++)
+        {
+            m(row, col) = matrix.at(row, col);
+        }
+    }
+    return Rotation(m);
+}
+
+/**
+ * The matrix of the rotation, as a 3 x 3 numpy array
+ */
+CArray<double> rotation_matrix(const Rotation& rotation)
+{
+    CArray<double> matrix({3, 3});
+    for (pybind11::ssize_t row = 0; row < 3; row++)
+    {
+        for (pybind11::ssize_t col = 0; col < 3; col++)
+        {
+            matrix.mutable_at(row, col) = rotation.matrix()(row, col);
+        }
+    }
+    return matrix;
+}
+
+template <typename Real>
+void def_rotate(pybind11::class_<Rotation>& rotation)
+{
+    rotation.def(
+        "rotate",
+        [](const Rotation& r, CArray<Real> points, pybind11::object out) {
+            return transform_points<Real>(
+                points,
+                out,
+                "Rotation.rotate",
+                [&r](std::size_t n, const Real* input, Real* output) {
+                    r.rotate(n, input, output);
+                });
+        },
+        pybind11::arg("points"),
+        pybind11::arg("out") = pybind11::none());
+}
+
+template <typename Real>
+void def_apply(pybind11::class_<Transform>& transform)
+{
+    transform.def(
+        "apply",
+        [](const Transform& t, CArray<Real> points, pybind11::object out) {
+            return transform_points<Real>(
+                points,
+                out,
+                "Transform.apply",
+                [&t](std::size_t n, const Real* input, Real* output) {
+                    t.apply(n, input, output);
+                });
+        },
+        pybind11::arg("points"),
+        pybind11::arg("out") = pybind11::none());
+}
+
+/**
+ * numpy view (no copy) over coordinates owned by the python object
+ * owner (kept alive by the view). Writing into the view updates the
+ * coordinates, unless not writeable.
+ */
+pybind11::array_t<double> coordinates_view(pybind11::object owner,
+                                           Coordinates& coordinates,
+                                           bool writeable)
+{
+    pybind11::array_t<double> view(
+        {3}, {sizeof(double)}, coordinates.data(), owner);
+    if (!writeable)
+    {
+        view.attr("setflags")(pybind11::arg("write") = false);
+    }
+    return view;
+}
+
+/**
+ * Add to the class the property name, a numpy view over the member
+ * (and a setter accepting any sequence of 3 floats, if writeable)
+ */
+template <class T>
+void def_coordinates_view(pybind11::class_<T>& cls,
+                          const char* name,
+                          Coordinates T::*member,
+                          bool writeable)
+{
+    auto getter = [member, writeable](pybind11::object self) {
+        T& instance = self.cast<T&>();
+        return coordinates_view(self, instance.*member, writeable);
+    };
+    if (!writeable)
+    {
+        cls.def_property_readonly(name, getter);
+        return;
+    }
+    cls.def_property(name, getter, [member](T& instance, Coordinates value) {
+        instance.*member = value;
+    });
+}
+
+/**
+ * Structured numpy dtype of the given (field name, number of doubles)
+ * fields, all fields being arrays of float64 but the ones of size 0,
+ * which are int64 scalars.
+ */
+pybind11::dtype structured_dtype(
+    const std::vector<std::pair<std::string, int>>& fields)
+{
+    pybind11::list descr;
+    for (const auto& field : fields)
+    {
+        if (field.second == 0)
+        {
+            descr.append(pybind11::make_tuple(field.first, "i8"));
+        }
+        else
+        {
+            descr.append(pybind11::make_tuple(
+                field.first, "f8", pybind11::make_tuple(field.second)));
+        }
+    }
+    return pybind11::dtype::from_args(descr);
+}
+
+pybind11::dtype state_dtype()
+{
+    return structured_dtype({{"position", 3}, {"velocity", 3}});
+}
+
+pybind11::dtype stamped_coordinates_dtype()
+{
+    return structured_dtype({{"stamp", 0}, {"coordinates", 3}});
+}
+
+/**
+ * New (zero initialized) array of the dtype
+ */
+pybind11::array zeros(std::size_t size, pybind11::dtype dtype)
+{
+    return pybind11::module_::import("numpy").attr("zeros")(size, dtype);
+}
+
+/**
+ * The array converted to a C contiguous array of the dtype
+ * (copied only if required)
+ */
+pybind11::array contiguous(pybind11::object array, pybind11::dtype dtype)
+{
+    return pybind11::module_::import("numpy").attr("ascontiguousarray")(
+        array, dtype);
+}
+
+pybind11::array states_to_array(const std::vector<State>& states)
+{
+    pybind11::array array = zeros(states.size(), state_dtype());
+    double* data = static_cast<double*>(array.mutable_data());
+    for (std::size_t i = 0; i < states.size(); i++)
+    {
+        std::copy(states[i].position.begin(),
+                  states[i].position.end(),
+                  data + 6 * i);
+        std::copy(states[i].velocity.begin(),
+                  states[i].velocity.end(),
+                  data + 6 * i + 3);
+    }
+    return array;
+}
+
+std::vector<State> states_from_array(pybind11::object values)
+{
+    pybind11::array array = contiguous(values, state_dtype());
+    const double* data = static_cast<const double*>(array.data());
+    std::vector<State> states(static_cast<std::size_t>(array.size()));
+    for (std::size_t i = 0; i < states.size(); i++)
+    {
+        std::copy(data + 6 * i, data + 6 * i + 3, states[i].position.begin());
+        std::copy(
+            data + 6 * i + 3, data + 6 * i + 6, states[i].velocity.begin());
+    }
+    return states;
+}
+
+pybind11::array stamped_coordinates_to_array(
+    const std::vector<StampedCoordinates>& stamped_coordinates)
+{
+    pybind11::array array =
+        zeros(stamped_coordinates.size(), stamped_coordinates_dtype());
+    char* data = static_cast<char*>(array.mutable_data());
+    for (std::size_t i = 0; i < stamped_coordinates.size(); i++)
+    {
+        // (stamp: int64, coordinates: 3 float64) per item
+        std::int64_t stamp = stamped_coordinates[i].stamp;
+        std::copy(reinterpret_cast<char*>(&stamp),
+                  reinterpret_cast<char*>(&stamp) + sizeof(stamp),
+                  data + 32 * i);
+        std::copy(
+            reinterpret_cast<const char*>(
+                stamped_coordinates[i].coordinates.data()),
+            reinterpret_cast<const char*>(
+                stamped_coordinates[i].coordinates.data() + 3),
+            data + 32 * i + 8);
+    }
+    return array;
+}
+
+std::vector<StampedCoordinates> stamped_coordinates_from_array(
+    pybind11::object values)
+{
+    pybind11::array array = contiguous(values, stamped_coordinates_dtype());
+    const char* data = static_cast<const char*>(array.data());
+    std::vector<StampedCoordinates> stamped_coordinates(
+        static_cast<std::size_t>(array.size()));
+    for (std::size_t i = 0; i < stamped_coordinates.size(); i++)
+    {
+        std::int64_t stamp;
+        std::copy(data + 32 * i,
+                  data + 32 * i + 8,
+                  reinterpret_cast<char*>(&stamp));
+        stamped_coordinates[i].stamp = static_cast<long>(stamp);
+        std::copy(
+            data + 32 * i + 8,
+            data + 32 * i + 32,
+            reinterpret_cast<char*>(stamped_coordinates[i].coordinates.data()));
+    }
+    return stamped_coordinates;
+}
+
+/**
+ * Binds StampedTrajectoryChunk<CAPACITY>. The chunk is filled from
+ * numpy arrays (time stamps (N), positions (N x 3) and optionally
+ * velocities (N x 3), only the CAPACITY first points being copied)
+ * and its stamps, positions and velocities properties are numpy views
+ * (no copy) over its size first points.
+ */
+template <int CAPACITY>
+void def_stamped_trajectory_chunk(pybind11::module_& m, const char* name)
+{
+    typedef StampedTrajectoryChunk<CAPACITY> Chunk;
+    pybind11::class_<Chunk>(m, name)
+        .def(pybind11::init<>())
+        .def_property_readonly_static(
+            "capacity", [](pybind11::object) { return CAPACITY; })
+        .def("size", &Chunk::size)
+        .def("__len__", &Chunk::size)
+        .def("full", &Chunk::full)
+        .def("has_velocities", &Chunk::has_velocities)
+        .def("clear", &Chunk::clear)
+        .def("push_back",
+             pybind11::overload_cast<long, const Coordinates&>(
+                 &Chunk::push_back))
+        .def("push_back",
+             pybind11::overload_cast<long,
+                                     const Coordinates&,
+                                     const Coordinates&>(&Chunk::push_back))
+        .def(
+            "fill",
+            [](Chunk& chunk,
+               pybind11::array_t<long, pybind11::array::c_style |
+                                           pybind11::array::forcecast> stamps,
+               pybind11::array_t<double,
+                                 pybind11::array::c_style |
+                                     pybind11::array::forcecast> positions,
+               pybind11::object velocities) {
+                std::size_t size = static_cast<std::size_t>(stamps.size());
+                if (stamps.ndim() != 1 || positions.ndim() != 2 ||
+                    positions.shape(0) != stamps.size() ||
+                    positions.shape(1) != 3)
+                {
+                    throw std::invalid_argument(
+                        "fill: expected time stamps of shape (N,) "
+                        "and positions of shape (N, 3)");
+                }
+                if (velocities.is_none())
+                {
+                    return chunk.fill(size, stamps.data(), positions.data());
+                }
+                auto v = velocities.cast<pybind11::array_t<
+                    double,
+                    pybind11::array::c_style | pybind11::array::forcecast>>();
+                if (v.ndim() != 2 || v.shape(0) != stamps.size() ||
+                    v.shape(1) != 3)
+                {
+                    throw std::invalid_argument(
+                        "fill: expected velocities of shape (N, 3)");
+                }
+                return chunk.fill(
+                    size, stamps.data(), positions.data(), v.data());
+            },
+            pybind11::arg("stamps"),
+            pybind11::arg("positions"),
+            pybind11::arg("velocities") = pybind11::none())
+        .def("stamp", &Chunk::stamp)
+        .def("position", &Chunk::position)
+        .def("velocity", &Chunk::velocity)
+        .def_property_readonly("stamps",
+                               [](pybind11::object self) {
+                                   Chunk& chunk = self.cast<Chunk&>();
+                                   return pybind11::array_t<long>(
+                                       {chunk.size()},
+                                       {sizeof(long)},
+                                       chunk.stamps(),
+                                       self);
+                               })
+        .def_property_readonly("positions",
+                               [](pybind11::object self) {
+                                   Chunk& chunk = self.cast<Chunk&>();
+                                   return pybind11::array_t<double>(
+                                       {chunk.size(), 3},
+                                       {3 * sizeof(double), sizeof(double)},
+                                       chunk.positions(),
+                                       self);
+                               })
+        .def_property_readonly(
+            "velocities", [](pybind11::object self) -> pybind11::object {
+                Chunk& chunk = self.cast<Chunk&>();
+                if (!chunk.has_velocities())
+                {
+                    return pybind11::none();
+                }
+                return pybind11::array_t<double>(
+                    {chunk.size(), 3},
+                    {3 * sizeof(double), sizeof(double)},
+                    chunk.velocities(),
+                    self);
+            });
+}
+
 PYBIND11_MODULE(context_wrp, m)
 {
     pybind11::class_<Coordinates>(m, "Coordinates").def(pybind11::init<>());
 
-    pybind11::class_<StampedCoordinates>(m, "StampedCoordinates")
-        .def(pybind11::init<>())
-        .def_readwrite("coordinates", &StampedCoordinates::coordinates)
-        .def_readwrite("stamp", &StampedCoordinates::stamp);
+    // coordinates attributes (of StampedCoordinates, State and
+    // ContactInformation) are lists (copies), also available as
+    // numpy views over the C++ instances under the name suffixed
+    // with "_array" (see def_coordinates_view)
+    pybind11::class_<StampedCoordinates> stamped_coordinates(
+        m, "StampedCoordinates");
+    stamped_coordinates.def(pybind11::init<>())
+        .def_readwrite("stamp", &StampedCoordinates::stamp)
+        .def_readwrite("coordinates", &StampedCoordinates::coordinates);
+    def_coordinates_view(stamped_coordinates,
+                         "coordinates_array",
+                         &StampedCoordinates::coordinates,
+                         true);
 
     pybind11::class_<VelocityCompute>(m, "VelocityCompute")
         .def(pybind11::init<>())
@@ -31,34 +538,160 @@ PYBIND11_MODULE(context_wrp, m)
         .def(pybind11::init<>())
         .def(pybind11::init<int>())
         .def("set_average_size", &LowPassFilter::set_average_size)
-        .def("get", &LowPassFilter::get);
+        .def("get", &LowPassFilter::get)
+        .def("filter",
+             &low_pass_filter_filter,
+             pybind11::arg("values"),
+             pybind11::arg("out") = pybind11::none());
 
-    pybind11::class_<State>(m, "State")
-        .def(pybind11::init<>())
+    pybind11::class_<State> state(m, "State");
+    state.def(pybind11::init<>())
         .def(pybind11::init<const Coordinates&, const Coordinates&>())
         .def_readwrite("position", &State::position)
         .def_readwrite("velocity", &State::velocity)
         .def("set_position", &State::set_position)
         .def("set_velocity", &State::set_velocity);
+    def_coordinates_view(state, "position_array", &State::position, true);
+    def_coordinates_view(state, "velocity_array", &State::velocity, true);
 
-    pybind11::class_<Ball>(m, "Ball")
-        .def(pybind11::init<int>())
+    // conversions of lists of State / StampedCoordinates from / to numpy
+    // structured arrays (fields position and velocity / stamp and
+    // coordinates)
+    m.def("states_to_array", &states_to_array);
+    m.def("states_from_array", &states_from_array);
+    m.def("stamped_coordinates_to_array", &stamped_coordinates_to_array);
+    m.def("stamped_coordinates_from_array", &stamped_coordinates_from_array);
+
+    pybind11::class_<Ball> ball(m, "Ball");
+    ball.def(pybind11::init<int>())
         .def("update", &Ball::update)
         .def("get", &Ball::get);
+    // overloads matching without conversion the dtypes of the
+    // recorded trajectories (uint64 / int64 stamps, float32 / float64
+    // positions), other dtypes being converted
+    def_ball_update_batch<std::uint64_t, float>(ball);
+    def_ball_update_batch<std::uint64_t, double>(ball);
+    def_ball_update_batch<std::int64_t, float>(ball);
+    def_ball_update_batch<std::int64_t, double>(ball);
 
-    pybind11::class_<Rotation>(m, "Rotation")
-        .def(pybind11::init<double, double, double>())
-        .def("rotate", &Rotation::rotate);
+    // rotate and apply: either of coordinates (the rotated / transformed
+    // coordinates being returned) or of a N x 3 numpy array (float64 or
+    // float32, see transform_points)
+    pybind11::class_<Rotation> rotation(m, "Rotation");
+    rotation.def(pybind11::init<double, double, double>())
+        .def(pybind11::init(&rotation_from_matrix))
+        .def("rotate",
+             [](const Rotation& r, Coordinates coordinates) {
+                 r.rotate(coordinates);
+                 return coordinates;
+             })
+        .def("inverse", &Rotation::inverse)
+        .def("compose", &Rotation::compose)
+        .def_property_readonly("matrix", &rotation_matrix);
+    def_rotate<double>(rotation);
+    def_rotate<float>(rotation);
 
-    pybind11::class_<Transform>(m, "Transform")
-        .def(pybind11::init<double, double, double, Coordinates>())
-        .def("apply", &Transform::apply);
+    pybind11::class_<Transform> transform(m, "Transform");
+    transform.def(pybind11::init<double, double, double, Coordinates>())
+        .def(pybind11::init<const Rotation&, Coordinates>())
+        .def("apply",
+             [](const Transform& t, Coordinates coordinates) {
+                 t.apply(coordinates);
+                 return coordinates;
+             })
+        .def("inverse", &Transform::inverse)
+        .def("compose", &Transform::compose)
+        .def_property_readonly("rotation", &Transform::rotation)
+        .def_property_readonly("translation", &Transform::translation);
+    def_apply<double>(transform);
+    def_apply<float>(transform);
 
-    pybind11::class_<ContactInformation>(m, "ContactInformation")
-        .def(pybind11::init<>())
+    pybind11::class_<ContactInformation> contact_information(
+        m, "ContactInformation");
+    def_coordinates_view(contact_information,
+                         "position_array",
+                         &ContactInformation::position,
+                         false);
+    contact_information.def(pybind11::init<>())
         .def_readonly("position", &ContactInformation::position)
         .def_readonly("contact_occured", &ContactInformation::contact_occured)
         .def_readonly("time_stamp", &ContactInformation::time_stamp)
         .def_readonly("minimal_distance",
                       &ContactInformation::minimal_distance);
+
+    // native versions of the python classes context.BallStatus and
+    // context.HitPoint (hence the different names)
+    pybind11::class_<BallStatus>(m, "CompactBallStatus")
+        .def(pybind11::init<>())
+        .def(pybind11::init<const Coordinates&, double>(),
+             pybind11::arg("target_position"),
+             pybind11::arg("target_distance_z_epsilon") = 0.05)
+        .def("reset", &BallStatus::reset)
+        // overloads: (state, contact information), the fastest (no
+        // conversion), or (position, velocity, contact information)
+        .def("update",
+             pybind11::overload_cast<const State&, const ContactInformation&>(
+                 &BallStatus::update))
+        .def("update",
+             pybind11::overload_cast<const Coordinates&,
+                                     const Coordinates&,
+                                     const ContactInformation&>(
+                 &BallStatus::update))
+        .def("contact_occured", &BallStatus::contact_occured)
+        .def_readwrite("target_position", &BallStatus::target_position)
+        .def_readwrite("target_distance_z_epsilon",
+                       &BallStatus::target_distance_z_epsilon)
+        .def_readonly("hit_racket", &BallStatus::hit_racket)
+        .def_property_readonly(
+            "min_position_ball_target",
+            [](const BallStatus& status) -> pybind11::object {
+                if (!status.min_position_ball_target_set)
+                {
+                    return pybind11::none();
+                }
+                return pybind11::cast(status.min_position_ball_target);
+            })
+        .def_property_readonly(
+            "min_distance_ball_racket",
+            [](const BallStatus& status) -> pybind11::object {
+                if (status.hit_racket)
+                {
+                    return pybind11::none();
+                }
+                return pybind11::cast(status.min_distance_ball_racket);
+            })
+        .def_readonly("min_distance_ball_target",
+                      &BallStatus::min_distance_ball_target)
+        .def_readonly("max_ball_velocity", &BallStatus::max_ball_velocity)
+        .def_readonly("min_z", &BallStatus::min_z)
+        .def_readonly("max_y", &BallStatus::max_y)
+        .def_readonly("ball_position", &BallStatus::ball_position)
+        .def_readonly("ball_velocity", &BallStatus::ball_velocity);
+
+    pybind11::class_<HitPoint>(m, "CompactHitPoint")
+        .def(pybind11::init<>())
+        .def(pybind11::init<double, const Coordinates&>(),
+             pybind11::arg("table_height"),
+             pybind11::arg("default_position") = Coordinates{-10, -10, -10})
+        .def("reset", &HitPoint::reset)
+        .def("update",
+             pybind11::overload_cast<const State&, const ContactInformation&>(
+                 &HitPoint::update))
+        .def("update",
+             pybind11::overload_cast<const Coordinates&,
+                                     const ContactInformation&>(
+                 &HitPoint::update))
+        .def_readwrite("table_height", &HitPoint::table_height)
+        .def_readwrite("default_position", &HitPoint::default_position)
+        .def_property_readonly(
+            "hit_position", [](const HitPoint& hit_point) -> pybind11::object {
+                if (!hit_point.hit)
+                {
+                    return pybind11::none();
+                }
+                return pybind11::cast(hit_point.hit_position);
+            });
+
+    // (other capacities may be bound the same way, under other names)
+    def_stamped_trajectory_chunk<100>(m, "StampedTrajectoryChunk");
 }
@@ -1,10 +1,16 @@
 #include "gtest/gtest.h"
 
 #include <math.h>
+#include <limits>
+#include <stdexcept>
+#include <vector>
 
 #include "context/ball.hpp"
+#include "context/ball_status.hpp"
+#include "context/hit_point.hpp"
 #include "context/low_pass_filter.hpp"
 #include "context/rotation.hpp"
+#include "context/stamped_trajectory_chunk.hpp"
 #include "context/transform.hpp"
 #include "context/velocity_compute.hpp"
 
@@ -56,6 +62,71 @@ TEST_F(context_tests, low_path_filter_manual_test_2)
     ASSERT_EQ(v, (2.0 + 3.0 + 4.0 + 5.0) / 4.0);
 }
 
+TEST_F(context_tests, low_path_filter_set_average_size)
+{
+    LowPassFilter f(2);
+    f.get(10.0);
+    f.get(10.0);
+    f.set_average_size(3);
+    // no value remaining from before the reset
+    ASSERT_EQ(f.get(1.0), 1.0);
+    ASSERT_EQ(f.get(2.0), 1.5);
+    ASSERT_EQ(f.get(3.0), 2.0);
+    ASSERT_EQ(f.get(4.0), 3.0);
+}
+
+TEST_F(context_tests, low_path_filter_invalid_average_size)
+{
+    ASSERT_THROW(LowPassFilter(0), std::invalid_argument);
+    ASSERT_THROW(LowPassFilter(-1), std::invalid_argument);
+    LowPassFilter f(2);
+    f.get(1.0);
+    ASSERT_THROW(f.set_average_size(0), std::invalid_argument);
+    // the filter is unchanged
+    ASSERT_EQ(f.get(3.0), 2.0);
+}
+
+TEST_F(context_tests, low_path_filter_no_drift)
+{
+    // large values followed by small ones: an incrementally
+    // updated sum would retain the rounding errors of the
+    // large values
+    LowPassFilter f(10);
+    for (int i = 0; i < 1000000; i++)
+    {
+        f.get(1e12 + 0.1 * static_cast<double>(i % 7));
+    }
+    double v = 0;
+    for (int i = 0; i < 100; i++)
+    {
+        v = f.get(0.125);
+    }
+    ASSERT_EQ(v, 0.125);
+}
+
+TEST_F(context_tests, low_path_filter_batch)
+{
+    std::vector<double> values(1000);
+    for (std::size_t i = 0; i < values.size(); i++)
+    {
+        values[i] = std::sin(static_cast<double>(i));
+    }
+    LowPassFilter f(7);
+    LowPassFilter batch_f(7);
+    std::vector<double> filtered(values.size());
+    batch_f.filter(values.size(), values.data(), filtered.data());
+    for (std::size_t i = 0; i < values.size(); i++)
+    {
+        ASSERT_EQ(filtered[i], f.get(values[i]));
+    }
+    // in place
+    batch_f.filter(values.size(), values.data(), values.data());
+    for (std::size_t i = 0; i < values.size(); i++)
+    {
+        ASSERT_EQ(values[i], f.get(std::sin(static_cast<double>(i))));
+    }
+}
+
 TEST_F(context_tests, velocity_compute_no_motion)
 {
     VelocityCompute vc;
@@ -113,6 +184,77 @@ TEST_F(context_tests, ball)
     }
 }
 
+TEST_F(context_tests, ball_average)
+{
+    long time_stamp = 0;
+    long int t_diff = 10;
+    int average_size = 4;
+    Coordinates position = {0.0, 0.0, 0.0};
+    Coordinates velocity = {0.1, 0.2, 0.3};
+    Ball ball(average_size);
+
+    for (int i = 0; i < 100; i++)
+    {
+        State s = ball.update(time_stamp, position);
+        // the first velocity (no previous position) is 0,
+        // and is averaged with the next ones until the
+        // window is full
+        double ratio = 1.0;
+        if (i < average_size)
+        {
+            ratio = static_cast<double>(i) / static_cast<double>(i + 1);
+        }
+        for (int d = 0; d < 3; d++)
+        {
+            ASSERT_NEAR(s.velocity[d], velocity[d] * ratio, 1e-9);
+            position[d] += velocity[d] * static_cast<double>(t_diff);
+        }
+        time_stamp += t_diff;
+    }
+    // duplicated time stamp: no motion
+    State s = ball.update(time_stamp - t_diff, position);
+    ASSERT_FALSE(std::isnan(s.velocity[0]));
+}
+
+TEST_F(context_tests, ball_update_batch)
+{
+    const std::size_t nb_points = 50;
+    std::vector<long> time_stamps(nb_points);
+    std::vector<float> positions(3 * nb_points);
+    for (std::size_t i = 0; i < nb_points; i++)
+    {
+        time_stamps[i] = static_cast<long>(i * 10 + i % 3);
+        for (std::size_t d = 0; d < 3; d++)
+        {
+            positions[3 * i + d] = static_cast<float>(std::sin(i + d));
+        }
+    }
+
+    Ball ball(3);
+    Ball batch_ball(3);
+    std::vector<double> states(6 * nb_points);
+    batch_ball.update_batch(
+        nb_points, time_stamps.data(), positions.data(), states.data());
+    for (std::size_t i = 0; i < nb_points; i++)
+    {
+        Coordinates position;
+        for (std::size_t d = 0; d < 3; d++)
+        {
+            position[d] = positions[3 * i + d];
+        }
+        State s = ball.update(time_stamps[i], position);
+        for (std::size_t d = 0; d < 3; d++)
+        {
+            ASSERT_EQ(states[6 * i + d], s.position[d]);
+            ASSERT_EQ(states[6 * i + 3 + d], s.velocity[d]);
+        }
+    }
+    for (std::size_t d = 0; d < 3; d++)
+    {
+        ASSERT_EQ(batch_ball.get().velocity[d], ball.get().velocity[d]);
+    }
+}
+
 TEST_F(context_tests, rotation_z)
 {
     double alpha = 0;
@@ -196,3 +338,161 @@ TEST_F(context_tests, transform)
     ASSERT_NEAR(c[1], 1, 1e-10);
     ASSERT_NEAR(c[2], 0, 1e-10);
 }
+
+TEST_F(context_tests, transform_batch)
+{
+    Coordinates translation = {1, -2, 0.5};
+    Transform t(0.3, -1.2, 2.0, translation);
+
+    const std::size_t nb_points = 10;
+    std::vector<double> points(3 * nb_points);
+    std::vector<float> float_points(3 * nb_points);
+    for (std::size_t i = 0; i < points.size(); i++)
+    {
+        points[i] = std::sin(static_cast<double>(i));
+        float_points[i] = static_cast<float>(points[i]);
+    }
+    std::vector<double> transformed(points.size());
+    t.apply(nb_points, points.data(), transformed.data());
+    // in place
+    t.apply(nb_points, float_points.data(), float_points.data());
+
+    for (std::size_t i = 0; i < nb_points; i++)
+    {
+        Coordinates c = {points[3 * i], points[3 * i + 1], points[3 * i + 2]};
+        t.apply(c);
+        for (std::size_t d = 0; d < 3; d++)
+        {
+            ASSERT_NEAR(transformed[3 * i + d], c[d], 1e-10);
+            ASSERT_NEAR(float_points[3 * i + d], c[d], 1e-5);
+        }
+    }
+}
+
+TEST_F(context_tests, transform_inverse_compose)
+{
+    Transform t1(0.3, -1.2, 2.0, {1, -2, 0.5});
+    Transform t2(-0.7, 0.1, 0.4, {0, 3, -1});
+    Transform t1_t2 = t1.compose(t2);
+    Transform inverse = t1.inverse();
+
+    Coordinates c = {0.2, -0.4, 1.5};
+    Coordinates expected = c;
+    t2.apply(expected);
+    t1.apply(expected);
+    Coordinates composed = c;
+    t1_t2.apply(composed);
+    Coordinates back = c;
+    t1.apply(back);
+    inverse.apply(back);
+
+    for (std::size_t d = 0; d < 3; d++)
+    {
+        ASSERT_NEAR(composed[d], expected[d], 1e-10);
+        ASSERT_NEAR(back[d], c[d], 1e-10);
+    }
+}
+
+TEST_F(context_tests, ball_status)
+{
+    Coordinates target = {0.5, 2.0, -0.4};
+    BallStatus status(target);
+    ContactInformation contact;
+    ASSERT_EQ(status.min_z, std::numeric_limits<double>::infinity());
+
+    // before contact
+    contact.register_distance(0.3);
+    status.update({0, 1, 0.2}, {1, 2, 2}, contact);
+    contact.register_distance(0.1);
+    status.update({0, 1.5, -0.1}, {0, 0, 1}, contact);
+    ASSERT_FALSE(status.contact_occured());
+    ASSERT_EQ(status.min_distance_ball_racket, 0.1);
+    ASSERT_EQ(status.max_ball_velocity, 0);
+    ASSERT_FALSE(status.min_position_ball_target_set);
+
+    // contact, then ball flying to the target
+    contact.register_contact({0, 1.5, -0.1}, 1.0);
+    status.update({0, 1.5, -0.1}, {0, 1, 0}, contact);
+    ASSERT_TRUE(status.contact_occured());
+    ASSERT_EQ(status.max_ball_velocity, 1);
+    status.update(State({0.5, 2.1, -0.42}, {0, 2, 0}), contact);
+    status.update({0.5, 2.5, -0.41}, {0, 0.5, 0}, contact);
+    status.update({0.5, 2.6, -0.8}, {0, 0.5, 0}, contact);
+
+    ASSERT_EQ(status.min_z, -0.8);
+    ASSERT_EQ(status.max_y, 2.6);
+    ASSERT_EQ(status.max_ball_velocity, 2);
+    ASSERT_TRUE(status.min_position_ball_target_set);
+    ASSERT_EQ(status.min_position_ball_target[1], 2.1);
+    ASSERT_NEAR(status.min_distance_ball_target,
+                std::sqrt(0.1 * 0.1 + 0.02 * 0.02),
+                1e-12);
+
+    status.reset();
+    ASSERT_FALSE(status.contact_occured());
+    ASSERT_EQ(status.max_y, -std::numeric_limits<double>::infinity());
+}
+
+TEST_F(context_tests, hit_point)
+{
+    HitPoint hit_point(0.7);
+    ContactInformation contact;
+    Coordinates p = hit_point.update({0, 0, 0.5}, contact);
+    ASSERT_EQ(p[0], -10);
+    contact.register_contact({0, 0, 0.8}, 1.0);
+    p = hit_point.update({0, 0, 0.8}, contact);
+    ASSERT_EQ(p[0], -10);
+    p = hit_point.update({1, 2, 0.71}, contact);
+    ASSERT_EQ(p[0], 1);
+    // first hit position kept
+    p = hit_point.update(State({3, 3, 0.5}, {0, 0, 0}), contact);
+    ASSERT_EQ(p[0], 1);
+    hit_point.reset();
+    p = hit_point.update(State({3, 3, 0.5}, {0, 0, 0}), contact);
+    ASSERT_EQ(p[0], 3);
+}
+
+TEST_F(context_tests, stamped_trajectory_chunk)
+{
+    StampedTrajectoryChunk<4> chunk;
+    ASSERT_EQ(chunk.size(), 0);
+    ASSERT_TRUE(chunk.push_back(10, {1, 2, 3}));
+    ASSERT_FALSE(chunk.has_velocities());
+    ASSERT_TRUE(chunk.push_back(20, {4, 5, 6}, {7, 8, 9}));
+    ASSERT_TRUE(chunk.has_velocities());
+    ASSERT_EQ(chunk.size(), 2);
+    ASSERT_EQ(chunk.stamp(1), 20);
+    ASSERT_EQ(chunk.position(1)[2], 6);
+    ASSERT_EQ(chunk.velocity(1)[0], 7);
+    ASSERT_THROW(chunk.stamp(2), std::out_of_range);
+    ASSERT_THROW(chunk.position(-1), std::out_of_range);
+
+    // velocity of a point added without velocity
+    ASSERT_TRUE(chunk.push_back(30, {1, 2, 3}));
+    ASSERT_TRUE(chunk.has_velocities());
+    ASSERT_EQ(chunk.velocity(2)[0], 0);
+    chunk.clear();
+    ASSERT_TRUE(chunk.push_back(20, {4, 5, 6}, {7, 8, 9}));
+    chunk.clear();
+    ASSERT_TRUE(chunk.push_back(10, {1, 2, 3}));
+    ASSERT_TRUE(chunk.push_back(20, {4, 5, 6}, {7, 8, 9}));
+    ASSERT_EQ(chunk.velocity(0)[0], 0);
+
+    // only the 4 first points are copied
+    std::vector<long> stamps{0, 1, 2, 3, 4, 5};
+    std::vector<float> positions(18);
+    for (std::size_t i = 0; i < positions.size(); i++)
+    {
+        positions[i] = static_cast<float>(i);
+    }
+    ASSERT_EQ(chunk.fill(stamps.size(), stamps.data(), positions.data()), 4);
+    ASSERT_TRUE(chunk.full());
+    ASSERT_FALSE(chunk.has_velocities());
+    ASSERT_FALSE(chunk.push_back(6, {0, 0, 0}));
+    ASSERT_EQ(chunk.stamp(3), 3);
+    ASSERT_EQ(chunk.position(3)[1], 10);
+    ASSERT_EQ(chunk.positions()[11], 11);
+
+    chunk.clear();
+    ASSERT_EQ(chunk.size(), 0);
+}
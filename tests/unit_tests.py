@@ -1,8 +1,18 @@
+import sys
+import time
 import h5py
+import random
+import queue
+import subprocess
+import concurrent.futures
+import json
 import pathlib
 import pytest
+import typing
 import numpy as np
 from context import ball_trajectories as bt
+from context import ball_status
+from context import hit_point
 
 
 # configuration of the stamped_trajectory fixture
@@ -225,6 +235,97 @@ def test_add_trajectories(
         np.testing.assert_almost_equal(trajectory[1], stamped_trajectory[1])
 
 
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_add_tennicam_trajectories_jobs(
+    working_directory: pathlib.Path, tennicam_trajectory: str, jobs: int
+):
+    """
+    Test tennicam files parsed by a pool of processes are added
+    to the hdf5 file in the order of the files.
+    """
+
+    # one more file with a shorter trajectory, to check the ordering
+    short_trajectory = "\n".join(tennicam_trajectory.split("\n")[:10])
+    with open(working_directory / "tennicam_{}".format(_NB_TENNICAMS), "w") as f:
+        f.write(short_trajectory)
+
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        nb_added = rbt.add_tennicam_trajectories(
+            _TENNICAM_GROUP, working_directory, jobs=jobs
+        )
+    assert nb_added == _NB_TENNICAMS + 1
+
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        sizes = [
+            len(rbt.get_stamped_trajectory(_TENNICAM_GROUP, index)[0])
+            for index in range(nb_added)
+        ]
+    assert sizes[-1] == 10
+    assert all([size > 10 for size in sizes[:-1]])
+
+
+def test_parse_json_trajectory(
+    working_directory: pathlib.Path,
+    duration_trajectory: bt.DurationTrajectory,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """
+    Test the parsing of json trajectory files, in python and json
+    formatting.
+    """
+
+    positions = duration_trajectory[1]
+    velocities = duration_trajectory[2]
+    entries = np.concatenate((positions, velocities), axis=1)
+
+    python_file = working_directory / _JSON_FILES[0]
+    json_file = working_directory / "trajectory.json"
+    with open(json_file, "w") as f:
+        json.dump({"ob": entries.tolist(), "other": [[1.0]]}, f)
+    indented_file = working_directory / "indented.json"
+    with open(indented_file, "w") as f:
+        json.dump({"ob": entries.tolist()}, f, indent=2, separators=(" ,", ": "))
+
+    # parsing at once, and in blocks of (less than) a few rows
+    for block_size in (bt._JSON_BLOCK_SIZE, 512, 16):
+        monkeypatch.setattr(bt, "_JSON_BLOCK_SIZE", block_size)
+        for path in (python_file, json_file, indented_file):
+            trajectory = bt.parse_json_trajectory(path)
+            assert trajectory.dtype == np.float32
+            assert trajectory.shape == positions.shape
+            np.testing.assert_array_equal(trajectory, positions)
+
+    empty_file = working_directory / "empty.json"
+    with open(empty_file, "w") as f:
+        f.write("{'ob': [ ]}")
+    assert bt.parse_json_trajectory(empty_file).shape == (0, 3)
+    empty_file.unlink()
+
+    malformed_file = working_directory / "malformed.json"
+    for content in (
+        "{'ob': [[1.0, 2.0, x], [1.0, 2.0, 3.0]]}",
+        "{'ob': [[1.0, 2.0]}",
+        "{'ob': [[1.0, 2.0, 3.0], [1.0, 2.0, 3.0, 4.0]]}",
+        # ragged rows, with the expected total number of values
+        "{'ob': [[1.0, 2.0, 3.0, 4.0], [1.0, 2.0, 3.0, 4.0, 5.0], [1.0, 2.0, 3.0]]}",
+        "",
+    ):
+        with open(malformed_file, "w") as f:
+            f.write(content)
+        with pytest.raises(ValueError):
+            bt.parse_json_trajectory(malformed_file)
+    malformed_file.unlink()
+    indented_file.unlink()
+
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        nb_added = rbt.add_json_trajectories(
+            _JSON_GROUP, working_directory, _SAMPLING_RATE, jobs=2
+        )
+    assert nb_added == _NB_JSONS + 1
+
+
 @pytest.mark.parametrize("formatting", [_JSON_GROUP, _TENNICAM_GROUP])
 def test_ball_trajectories(
     loaded_hdf5: pathlib.Path,
@@ -257,3 +358,1350 @@ def test_ball_trajectories(
     positions = stamped_trajectory[1]
     assert time_stamps.shape == (len(duration_trajectory[0]),)
     assert positions.shape == (len(duration_trajectory[0]), 3)
+
+
+def test_lazy_ball_trajectories(loaded_hdf5: pathlib.Path):
+    """
+    Test BallTrajectories in lazy mode returns the same trajectories
+    as in default mode, and that its cache is bounded.
+    """
+
+    ball_trajectories = bt.BallTrajectories(_JSON_GROUP, loaded_hdf5)
+
+    with bt.BallTrajectories(
+        _JSON_GROUP, loaded_hdf5, lazy=True, cache_size=2
+    ) as lazy_trajectories:
+        assert lazy_trajectories.is_lazy()
+        assert lazy_trajectories.size() == _NB_JSONS
+        for index in range(_NB_JSONS):
+            stamps, positions = lazy_trajectories.get_trajectory(index)
+            ref_stamps, ref_positions = ball_trajectories.get_trajectory(index)
+            assert np.array_equal(stamps, ref_stamps)
+            assert np.array_equal(positions, ref_positions)
+        lazy_trajectories.get_trajectory(_NB_JSONS - 1)
+        cache_info = lazy_trajectories.cache_info()
+        assert cache_info.misses == _NB_JSONS
+        assert cache_info.hits == 1
+        assert cache_info.currsize == 2
+        assert (
+            len(lazy_trajectories.get_different_random_trajectories(_NB_JSONS))
+            == _NB_JSONS
+        )
+        with pytest.raises(KeyError):
+            lazy_trajectories.get_trajectory(_NB_JSONS)
+
+    with pytest.raises(ValueError):
+        ball_trajectories.cache_info()
+
+
+@pytest.mark.parametrize("mode", ["default", "lazy", "shared"])
+def test_seeded_random_trajectories(loaded_hdf5: pathlib.Path, mode: str):
+    """
+    Test that, for a given seed, BallTrajectories randomly selects
+    the same trajectories as the shuffle of the indexes of the group.
+    """
+
+    group = "seeded"
+    nb_trajectories = 12
+    stamped_trajectories = [
+        (np.arange(5, dtype=np.int64) * 10 + index, np.full((5, 3), float(index)))
+        for index in range(nb_trajectories)
+    ]
+    with bt.MutableRecordedBallTrajectories(path=loaded_hdf5) as rbt:
+        rbt.add_stamped_trajectories(group, stamped_trajectories)
+        keys = list(rbt.get_stamped_trajectories(group).keys())
+
+    with bt.BallTrajectories(
+        group, loaded_hdf5, lazy=mode == "lazy", shared=mode == "shared"
+    ) as trajectories:
+        for seed in range(5):
+            random.seed(seed)
+            indexes = list(keys)
+            random.shuffle(indexes)
+            random.seed(seed)
+            selected = trajectories.get_different_random_trajectories(4)
+            assert [int(stamps[0]) for stamps, _ in selected] == indexes[:4]
+
+            random.seed(seed)
+            index = random.choice(list(range(nb_trajectories)))
+            random.seed(seed)
+            assert int(trajectories.random_trajectory()[0][0]) == index
+
+
+@pytest.mark.parametrize("formatting", [_JSON_GROUP, _TENNICAM_GROUP])
+def test_packed_layout(loaded_hdf5: pathlib.Path, formatting: str):
+    """
+    Test groups converted to the packed layout return the same
+    trajectories as before conversion.
+    """
+
+    with bt.RecordedBallTrajectories(loaded_hdf5) as rbt:
+        ref = rbt.get_stamped_trajectories(formatting, direct=True)
+        assert not rbt.is_packed(formatting)
+
+    with bt.MutableRecordedBallTrajectories(loaded_hdf5) as rbt:
+        assert rbt.pack_group(formatting) == len(ref)
+
+    with bt.RecordedBallTrajectories(loaded_hdf5) as rbt:
+        assert rbt.is_packed(formatting)
+        assert rbt.get_indexes(formatting) == tuple(range(len(ref)))
+        packed = rbt.get_stamped_trajectories(formatting, direct=True)
+        for index, (stamps, positions) in ref.items():
+            for stamped_trajectory in (
+                packed[index],
+                rbt.get_stamped_trajectory(formatting, index),
+            ):
+                assert np.array_equal(stamped_trajectory[0], stamps)
+                assert np.array_equal(stamped_trajectory[1], positions)
+        with pytest.raises(KeyError):
+            rbt.get_stamped_trajectory(formatting, len(ref))
+
+    stamps = np.array([10] * 5)
+    positions = np.array([np.array([2] * 3)] * 5)
+    with bt.MutableRecordedBallTrajectories(loaded_hdf5) as rbt:
+        rbt.overwrite(formatting, 1, (stamps, positions))
+
+    ball_trajectories = bt.BallTrajectories(formatting, loaded_hdf5)
+    assert ball_trajectories.size() == len(ref)
+    assert np.array_equal(ball_trajectories.get_trajectory(1)[0], stamps)
+    assert np.array_equal(ball_trajectories.get_trajectory(1)[1], positions)
+    assert np.array_equal(ball_trajectories.get_trajectory(0)[1], ref[0][1])
+
+
+def test_line_trajectories() -> None:
+    """
+    Test the batch versions of the line trajectory generators
+    are consistent with the single trajectory versions.
+    """
+
+    starts = [(0.0, 0.0, 0.0), _START_POSITION, (1.0, -1.0, 0.5)]
+    ends = [(1.0, -2.0, 3.0), _END_POSITION, (1.5, -1.0, 0.0)]
+    velocities = [1.0, _VELOCITY, 2.0]
+    durations_ms = [500.0, 1000.0, 1.0]
+    sampling_rate = float(_SAMPLING_RATE * 1e-6)
+
+    packed_velocity = bt.velocity_line_trajectories(
+        starts, ends, velocities, sampling_rate
+    )
+    packed_duration = bt.duration_line_trajectories(
+        starts, ends, durations_ms, sampling_rate
+    )
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        expected = (
+            bt.velocity_line_trajectory(start, end, velocities[index], sampling_rate),
+            bt.duration_line_trajectory(start, end, durations_ms[index], sampling_rate),
+        )
+        for packed, ref in zip((packed_velocity, packed_duration), expected):
+            trajectory = bt.unpack_durations(packed)[index]
+            for array, ref_array in zip(trajectory, ref):
+                assert np.array_equal(array, ref_array)
+
+    # the last point of the trajectory is the end point
+    durations, positions, velocities = bt.velocity_line_trajectory(
+        _START_POSITION, _END_POSITION, _VELOCITY, sampling_rate
+    )
+    np.testing.assert_almost_equal(positions[-1], _END_POSITION)
+    assert np.all(durations == _SAMPLING_RATE)
+    np.testing.assert_almost_equal(np.linalg.norm(velocities, axis=1), _VELOCITY)
+
+
+def test_iterate_chunks(duration_trajectory: bt.DurationTrajectory) -> None:
+    """
+    Test iterating by chunks over a trajectory covers all
+    the points of BallTrajectories.iterate.
+    """
+
+    stamped_trajectory = bt.to_stamped_trajectory(duration_trajectory)
+    points = list(bt.BallTrajectories.iterate(stamped_trajectory))
+    chunk_size = 7
+
+    for input in (stamped_trajectory, bt.to_duration_trajectory(stamped_trajectory)):
+        chunks = list(bt.BallTrajectories.iterate_chunks(input, chunk_size))
+        assert len(chunks) == (len(points) + chunk_size - 1) // chunk_size
+        assert all([len(chunk[0]) == chunk_size for chunk in chunks[:-1]])
+        durations = np.concatenate([chunk[0] for chunk in chunks])
+        positions = np.concatenate([chunk[1] for chunk in chunks])
+        assert np.array_equal(durations, [point[0] for point in points])
+        assert positions.shape == (len(points), 3)
+
+    class _Frontend:
+        def __init__(self):
+            self.positions = []
+            self.nb_pulses = 0
+
+        def add_command(self, position, velocity, duration, mode):
+            self.positions.append(position)
+
+        def pulse(self):
+            self.nb_pulses += 1
+
+    frontend = _Frontend()
+    assert bt.BallTrajectories.feed(
+        frontend, stamped_trajectory, chunk_size, pulse=True
+    ) == len(points)
+    assert frontend.nb_pulses == len(chunks)
+    np.testing.assert_almost_equal(frontend.positions, positions)
+
+    frontend = _Frontend()
+    assert bt.BallTrajectories.feed(
+        frontend, bt.to_duration_trajectory(stamped_trajectory), chunk_size
+    ) == len(points)
+    assert frontend.nb_pulses == 0
+    np.testing.assert_almost_equal(frontend.positions, positions)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_summary(
+    working_directory: pathlib.Path,
+    duration_trajectory: bt.DurationTrajectory,
+    packed: bool,
+):
+    """
+    Test the summaries of the trajectories written in the
+    hdf5 file.
+    """
+
+    stamped_trajectory = bt.to_stamped_trajectory(duration_trajectory)
+    stamps, positions = stamped_trajectory
+    hdf5_path = working_directory / _HDF5
+
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_tennicam_trajectories(_TENNICAM_GROUP, working_directory, packed=packed)
+        rbt.overwrite(_TENNICAM_GROUP, 1, (stamps[:10], positions[:10]))
+
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        summaries = rbt.get_summary(_TENNICAM_GROUP)
+
+    assert sorted(summaries.keys()) == list(range(_NB_TENNICAMS))
+    summary = summaries[0]
+    assert summary.nb_points == len(stamps)
+    assert summary.duration_us == pytest.approx(stamps[-1], abs=1)
+    np.testing.assert_almost_equal(summary.first_position, positions[0])
+    np.testing.assert_almost_equal(summary.last_position, positions[-1])
+    np.testing.assert_almost_equal(summary.min_position, positions.min(axis=0))
+    np.testing.assert_almost_equal(summary.max_position, positions.max(axis=0))
+    assert summary.max_speed == pytest.approx(_VELOCITY, rel=1e-3)
+    assert summaries[1].nb_points == 10
+    np.testing.assert_almost_equal(summaries[1].last_position, positions[9])
+    assert summaries[1] == bt.summarize((stamps[:10], positions[:10]))
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_storage_options(working_directory: pathlib.Path, packed: bool):
+    """
+    Test trajectories stored with compression, chunking and
+    a custom time stamps dtype are read back unchanged.
+    """
+
+    hdf5_path = working_directory / _HDF5
+    storage = bt.StorageOptions(
+        chunks=16,
+        compression="gzip",
+        compression_level=4,
+        shuffle=True,
+        stamp_dtype="uint32",
+    )
+
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_tennicam_trajectories(_TENNICAM_GROUP, working_directory)
+        rbt.add_tennicam_trajectories(
+            "compressed", working_directory, packed=packed, storage=storage
+        )
+        assert rbt.get_storage_options("compressed") == storage
+        assert rbt.get_storage_options(_TENNICAM_GROUP) == bt.StorageOptions()
+        stamps, positions = rbt.get_stamped_trajectory(_TENNICAM_GROUP, 0, direct=True)
+        rbt.overwrite("compressed", 1, (stamps[:5], positions[:5]))
+        with pytest.raises(ValueError):
+            rbt.add_stamped_trajectories(
+                "overflow",
+                [(np.array([0, 2**33], np.uint), positions[:2])],
+                storage=storage,
+            )
+
+    with h5py.File(hdf5_path, "r") as f:
+        group = f["compressed"] if packed else f["compressed"]["0"]
+        dset = group["time_stamps"]
+        assert dset.dtype == np.uint32
+        assert dset.compression == "gzip"
+        assert dset.chunks == (16,)
+
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        ref = rbt.get_stamped_trajectories(_TENNICAM_GROUP, direct=True)
+        compressed = rbt.get_stamped_trajectories("compressed", direct=True)
+    assert np.array_equal(compressed[0][0], ref[0][0])
+    assert np.array_equal(compressed[0][1], ref[0][1])
+    assert np.array_equal(compressed[1][1], ref[0][1][:5])
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_transform(working_directory: pathlib.Path, packed: bool):
+    """
+    Test the in place transformation of all the trajectories
+    of a group.
+    """
+
+    hdf5_path = working_directory / _HDF5
+    alpha, beta, gamma = 0.1, -0.4, 1.2
+    translation = (0.5, -1.0, 2.0)
+
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_tennicam_trajectories(_TENNICAM_GROUP, working_directory, packed=packed)
+        stamps, positions = rbt.get_stamped_trajectory(_TENNICAM_GROUP, 0, direct=True)
+        rbt.overwrite(_TENNICAM_GROUP, 1, (stamps[:5], positions[:5]))
+        ref = rbt.get_stamped_trajectories(_TENNICAM_GROUP, direct=True)
+        nb_transformed = rbt.transform(
+            _TENNICAM_GROUP, alpha, beta, gamma, translation, chunk_size=7
+        )
+    assert nb_transformed == _NB_TENNICAMS
+
+    # rotation as implemented by context::Rotation
+    rotation = bt.rotation_matrix(alpha, beta, gamma)
+    np.testing.assert_almost_equal(rotation @ rotation.T, np.eye(3))
+    np.testing.assert_almost_equal(
+        bt.rotation_matrix(0.0, 0.0, np.pi / 2.0) @ [1.0, 0.0, 0.0], [0.0, 1.0, 0.0]
+    )
+
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        transformed = rbt.get_stamped_trajectories(_TENNICAM_GROUP, direct=True)
+        summaries = rbt.get_summary(_TENNICAM_GROUP)
+    for index, (stamps, positions) in ref.items():
+        expected = positions.astype(np.float64) @ rotation.T + translation
+        assert np.array_equal(transformed[index][0], stamps)
+        np.testing.assert_allclose(transformed[index][1], expected, atol=1e-5)
+        # max speed is invariant, up to the float32 rounding of the positions
+        summary = bt.summarize(transformed[index])
+        assert summaries[index]._replace(max_speed=0) == summary._replace(max_speed=0)
+        assert summaries[index].max_speed == pytest.approx(summary.max_speed, rel=1e-3)
+
+
+def test_resample(working_directory: pathlib.Path):
+    """
+    Test the resampling of trajectories at fixed period.
+    """
+
+    # linear trajectory with irregular sampling and a duplicated stamp:
+    # both interpolations should be exact
+    stamps = np.array([1000, 1500, 1500, 4000, 4600, 7000], np.uint)
+    positions = np.array([[0.001 * t, -0.002 * t, 3.0] for t in stamps], np.float32)
+    for method in ("linear", "cubic"):
+        new_stamps, new_positions = bt.resample((stamps, positions), 1000, method)
+        assert list(new_stamps) == [1000, 2000, 3000, 4000, 5000, 6000, 7000]
+        np.testing.assert_allclose(new_positions[:, 0], 0.001 * new_stamps, rtol=1e-5)
+        np.testing.assert_allclose(new_positions[:, 1], -0.002 * new_stamps, rtol=1e-5)
+        np.testing.assert_allclose(new_positions[:, 2], 3.0)
+
+    # cubic interpolation follows a parabola more closely than linear
+    stamps = np.arange(0, 100000, 10000, dtype=np.uint)
+    positions = np.zeros((len(stamps), 3), np.float32)
+    positions[:, 2] = 1e-9 * stamps.astype(np.float64) ** 2
+    errors = {}
+    for method in ("linear", "cubic"):
+        new_stamps, new_positions = bt.resample((stamps, positions), 1000, method)
+        expected = 1e-9 * new_stamps.astype(np.float64) ** 2
+        errors[method] = np.abs(new_positions[:, 2] - expected).max()
+    assert errors["cubic"] < errors["linear"]
+
+    # duration trajectories
+    duration_trajectory = bt.to_duration_trajectory((stamps, positions))
+    durations, new_positions, velocities = bt.resample(duration_trajectory, 5000)
+    total = sum(duration_trajectory[0][:-1])
+    assert len(durations) == len(new_positions) == len(velocities)
+    assert len(durations) == total // 5000 + 1
+    assert np.all(durations == 5000)
+
+    with pytest.raises(ValueError):
+        bt.resample((stamps, positions), 1000, "quadratic")
+
+    # whole group, resampled in batch and saved as a derived group
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_tennicam_trajectories(_TENNICAM_GROUP, working_directory)
+        nb_added = rbt.add_resampled_group(_TENNICAM_GROUP, "resampled", 2000)
+    assert nb_added == _NB_TENNICAMS
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        originals = rbt.get_stamped_trajectories(_TENNICAM_GROUP, direct=True)
+        resampled = rbt.get_stamped_trajectories("resampled")
+        assert rbt.is_packed("resampled")
+        assert rbt._f["resampled"].attrs["resampled_from"] == _TENNICAM_GROUP
+        assert rbt._f["resampled"].attrs["period_us"] == 2000
+    for index, trajectory in originals.items():
+        expected = bt.resample(trajectory, 2000)
+        assert np.array_equal(resampled[index][0], expected[0])
+        np.testing.assert_allclose(resampled[index][1], expected[1], atol=1e-6)
+
+
+def test_clean_trajectory(working_directory: pathlib.Path):
+    """
+    Test the cleaning of raw recordings.
+    """
+
+    period = 10000
+    # ball still (20 points), thrown (50 points), lost for a while,
+    # then seen flying (30 points) and landing (10 still points)
+    still = np.zeros((20, 3))
+    flight1 = np.outer(np.arange(1, 51), [0.03, 0.0, 0.0])
+    flight2 = flight1[-1] + np.outer(np.arange(25, 55), [0.03, 0.0, 0.0])
+    landed = np.repeat(flight2[-1:], 10, axis=0)
+    positions = np.concatenate((still, flight1, flight2, landed)).astype(np.float32)
+    stamps = np.concatenate(
+        (np.arange(70) * period, (np.arange(40) + 94) * period)
+    ).astype(np.uint)
+    # an outlier and a duplicated stamp
+    positions[40] += (0.0, 0.0, 2.0)
+    stamps = np.insert(stamps, 30, stamps[30])
+    positions = np.insert(positions, 30, positions[30] + 0.5, axis=0)
+
+    cleaned = bt.clean_trajectory((stamps, positions))
+    assert len(cleaned) == 2
+    (stamps1, positions1), (stamps2, positions2) = cleaned
+    assert stamps1[0] == 0 and stamps2[0] == 0
+    # flight phase only (including the last still point before the throw),
+    # without the outlier and the duplicated sample (the first one of the
+    # duplicates being kept, the second one being an outlier)
+    assert len(stamps1) == 49
+    assert len(stamps2) == 30
+    np.testing.assert_array_equal(positions1[0], still[-1])
+    assert positions1[:, 2].max() == 0.0
+
+    # too few points
+    cleaned = bt.clean_trajectory(
+        (stamps, positions), bt.CleaningParameters(min_points=40)
+    )
+    assert len(cleaned) == 1
+
+    # all steps disabled (but duplicated stamps removal)
+    disabled = bt.CleaningParameters(None, None, None, 0)
+    cleaned = bt.clean_trajectory((stamps, positions), disabled)
+    assert len(cleaned) == 1
+    assert len(cleaned[0][0]) == len(stamps) - 1
+
+    # cleaning at import, parameters saved as attributes
+    hdf5_path = working_directory / _HDF5
+    parameters = bt.CleaningParameters(
+        max_gap_us=None, min_flight_speed=0.1, min_points=5
+    )
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_tennicam_trajectories(_TENNICAM_GROUP, working_directory)
+        nb_added = rbt.add_tennicam_trajectories(
+            "cleaned", working_directory, jobs=2, cleaning=parameters
+        )
+    assert nb_added == _NB_TENNICAMS
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        assert rbt.get_cleaning_parameters(_TENNICAM_GROUP) is None
+        assert rbt.get_cleaning_parameters("cleaned") == parameters
+        raw = rbt.get_stamped_trajectory(_TENNICAM_GROUP, 0, direct=True)
+        cleaned = rbt.get_stamped_trajectory("cleaned", 0, direct=True)
+    assert np.array_equal(cleaned[0], raw[0])
+
+
+@pytest.mark.parametrize("estimator", bt.VELOCITY_ESTIMATORS)
+def test_velocity_estimators(estimator: str):
+    """
+    Test the estimation of velocities, of single trajectories
+    and of groups of trajectories.
+    """
+
+    # parabola, irregular sampling (but for savgol, which assumes a
+    # uniform sampling, and central, exact only for uniform sampling)
+    rng = np.random.default_rng(0)
+    if estimator in ("central", "savgol"):
+        stamps = np.arange(0, 500000, 10000)
+    else:
+        stamps = np.cumsum(rng.integers(5000, 15000, 50)) - 5000
+    stamps = stamps.astype(np.uint)
+    t = stamps * 1e-6
+    positions = np.stack((t, 2.0 * t, -5.0 * t**2), axis=1).astype(np.float32)
+
+    durations, duration_positions, velocities = bt.to_duration_trajectory(
+        (stamps, positions), estimator
+    )
+    assert len(durations) == len(duration_positions) == len(velocities) == 49
+    np.testing.assert_array_equal(durations, np.diff(stamps))
+    # (velocity_compute: no velocity for the first point)
+    first = 1 if estimator == "velocity_compute" else 0
+    np.testing.assert_allclose(velocities[first:, 0], 1.0, rtol=1e-3)
+    np.testing.assert_allclose(velocities[first:, 1], 2.0, rtol=1e-3)
+    if estimator in ("central", "savgol"):
+        # exact derivative of a parabola (up to the float32 positions)
+        inner = slice(1, -1) if estimator == "central" else slice(None)
+        np.testing.assert_allclose(
+            velocities[inner, 2], -10.0 * t[:-1][inner], atol=1e-3
+        )
+
+    # group of trajectories, including a single point and
+    # an empty trajectory
+    trajectories = [
+        (stamps, positions),
+        (stamps[:1], positions[:1]),
+        (stamps[:0], positions[:0]),
+        (stamps[:20], positions[:20] + 1.0),
+    ]
+    packed = bt.to_duration_trajectories(bt.pack(trajectories), estimator)
+    unpacked = bt.unpack_durations(packed)
+    assert [len(d[0]) for d in unpacked] == [49, 0, 0, 19]
+    np.testing.assert_allclose(unpacked[0][2], velocities)
+    expected = bt.to_duration_trajectory(trajectories[3], estimator)
+    np.testing.assert_allclose(unpacked[3][2], expected[2])
+
+    if estimator in ("savgol", "velocity_compute"):
+        with pytest.raises(ValueError):
+            bt.to_duration_trajectory((stamps, positions), estimator, 0)
+
+
+@pytest.mark.parametrize("window", [1, 4, 7])
+def test_velocity_compute_estimator(window: int):
+    """
+    Test the velocity_compute estimator replicates context.Ball.
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "Ball"):
+        pytest.skip("context_wrp not available")
+
+    rng = np.random.default_rng(1)
+    stamps = np.cumsum(rng.integers(5000, 15000, 30)).astype(np.uint)
+    stamps[10] = stamps[9]  # duplicated time stamp
+    positions = rng.uniform(-1.0, 1.0, (30, 3)).astype(np.float32)
+
+    velocities = bt.estimate_velocities(
+        bt.pack([(stamps, positions)]), "velocity_compute", window
+    )
+    ball = context.Ball(window)
+    for stamp, position, velocity in zip(stamps, positions, velocities):
+        # time stamps in microseconds: velocities in meters per microsecond
+        state = ball.update(int(stamp), [float(p) for p in position])
+        np.testing.assert_array_equal(np.array(state.velocity) * 1e6, velocity)
+
+
+def test_ball_update_batch():
+    """
+    Test Ball.update_batch results in the same states as
+    successive calls to Ball.update.
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "Ball"):
+        pytest.skip("context_wrp not available")
+
+    rng = np.random.default_rng(2)
+    stamps = np.cumsum(rng.integers(5000, 15000, 50)).astype(np.uint)
+    positions = rng.uniform(-1.0, 1.0, (50, 3)).astype(np.float32)
+
+    ball, batch_ball = context.Ball(3), context.Ball(3)
+    states = batch_ball.update_batch(stamps[:30], positions[:30])
+    assert states.shape == (30, 2, 3)
+    out = np.zeros((20, 2, 3))
+    assert batch_ball.update_batch(stamps[30:], positions[30:], out) is out
+    states = np.concatenate((states, out))
+    for stamp, position, state in zip(stamps, positions, states):
+        expected = ball.update(int(stamp), [float(p) for p in position])
+        assert list(state[0]) == list(expected.position)
+        assert list(state[1]) == list(expected.velocity)
+    assert list(batch_ball.get().velocity) == list(ball.get().velocity)
+
+    with pytest.raises(ValueError):
+        batch_ball.update_batch(stamps, positions[:-1])
+
+
+def test_low_pass_filter():
+    """
+    Test LowPassFilter.filter results in the same values as
+    successive calls to LowPassFilter.get.
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "LowPassFilter"):
+        pytest.skip("context_wrp not available")
+
+    values = np.random.default_rng(3).uniform(-1.0, 1.0, 100)
+    low_pass_filter, batch_filter = context.LowPassFilter(5), context.LowPassFilter(5)
+    filtered = batch_filter.filter(values[:60])
+    out = values[60:].copy()
+    assert batch_filter.filter(out, out) is out
+    expected = [low_pass_filter.get(value) for value in values]
+    assert list(np.concatenate((filtered, out))) == expected
+
+
+def test_batch_transform():
+    """
+    Test Rotation.rotate and Transform.apply over numpy arrays.
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "Transform"):
+        pytest.skip("context_wrp not available")
+
+    alpha, beta, gamma = 0.1, -0.4, 1.2
+    translation = [0.5, -1.0, 2.0]
+    transform = context.Transform(alpha, beta, gamma, translation)
+    np.testing.assert_allclose(
+        transform.rotation.matrix, bt.rotation_matrix(alpha, beta, gamma)
+    )
+
+    points = np.random.default_rng(4).uniform(-1.0, 1.0, (100, 3))
+    expected = bt.transform_positions(
+        points, bt.rotation_matrix(alpha, beta, gamma), translation
+    )
+    np.testing.assert_allclose(transform.apply(points), expected)
+    np.testing.assert_allclose(transform.apply(list(points[0])), expected[0])
+    rotated = context.Rotation(alpha, beta, gamma).rotate(points)
+    np.testing.assert_allclose(rotated, expected - translation)
+
+    # in place, float32
+    float_points = points.astype(np.float32)
+    assert transform.apply(float_points, float_points) is float_points
+    np.testing.assert_allclose(float_points, expected, atol=1e-5)
+
+    # inverse and composition
+    inverse = transform.inverse()
+    np.testing.assert_allclose(inverse.apply(expected), points, atol=1e-12)
+    identity = inverse.compose(transform)
+    np.testing.assert_allclose(identity.apply(points), points, atol=1e-12)
+
+    with pytest.raises(ValueError):
+        transform.apply(points[:, :2])
+
+
+class _ContactInformation(typing.NamedTuple):
+    """
+    Mimics context.ContactInformation
+    """
+
+    contact_occured: bool
+    minimal_distance: float
+
+
+_BALL_STATUS_FIELDS = (
+    "hit_racket",
+    "min_position_ball_target",
+    "min_distance_ball_racket",
+    "min_distance_ball_target",
+    "max_ball_velocity",
+    "min_z",
+    "max_y",
+    "ball_position",
+    "ball_velocity",
+)
+
+
+def test_evaluate_ball_status():
+    """
+    Test the vectorized evaluation of episodes is bit-compatible
+    with the successive calls to BallStatus.update.
+    """
+    rng = np.random.default_rng(5)
+    target = [0.5, 2.0, -0.4]
+    nb_steps = [0, 1, 40, 40, 60, 25]
+    contacts = [None, 0, None, 10, 0, 24]
+    episodes = []
+    for nb, contact in zip(nb_steps, contacts):
+        positions = rng.uniform(-1.0, 1.0, (nb, 3)) + (0.5, 2.0, -0.4)
+        # some steps at the same (minimal) distance of the target
+        positions[nb // 2 :: 7] = (0.5, 2.01, -0.41)
+        velocities = rng.uniform(-5.0, 5.0, (nb, 3))
+        flags = np.zeros(nb, bool)
+        if contact is not None:
+            flags[contact] = True
+        min_distances = rng.uniform(0.0, 1.0, nb)
+        episodes.append((positions, velocities, flags, min_distances))
+
+    def _incremental(positions, velocities, flags, min_distances):
+        status = ball_status.BallStatus(target)
+        for position, velocity, flag, distance in zip(
+            positions, velocities, flags, min_distances
+        ):
+            status.update(
+                position.tolist(),
+                velocity.tolist(),
+                _ContactInformation(bool(flag), float(distance)),
+            )
+        return status
+
+    expected = [_incremental(*episode) for episode in episodes]
+    for episode, status in zip(episodes, expected):
+        evaluated = ball_status.evaluate(*episode, target)
+        for field in _BALL_STATUS_FIELDS:
+            assert getattr(evaluated, field) == getattr(status, field), field
+
+    # batch of episodes (concatenated)
+    offsets = np.cumsum([0] + nb_steps)
+    concatenated = [np.concatenate(arrays) for arrays in zip(*episodes)]
+    statuses = ball_status.evaluate_batch(*concatenated, target, offsets)
+    for evaluated, status in zip(statuses, expected):
+        for field in _BALL_STATUS_FIELDS:
+            assert getattr(evaluated, field) == getattr(status, field), field
+
+    # batch of episodes of the same length, one target per episode
+    same_length = [episode for episode in episodes if len(episode[0]) == 40]
+    arrays = [np.stack(arrays) for arrays in zip(*same_length)]
+    statuses = ball_status.evaluate_batch(*arrays, [target, target])
+    assert statuses[1].min_z == expected[3].min_z
+    assert statuses[1].max_ball_velocity == expected[3].max_ball_velocity
+
+
+def test_ball_status_copies_positions():
+    """
+    Test BallStatus and HitPoint keep copies of the positions they
+    are updated with, rather than references to the caller's lists.
+    """
+    target = [0.5, 2.0, -0.4]
+    status = ball_status.BallStatus(target)
+    assert status.min_position_ball_target is None
+    position = [0.5, 2.0, -0.41]
+    status.update(position, [1.0, 0.0, 0.0], _ContactInformation(True, 0.0))
+    min_position = status.min_position_ball_target
+    assert min_position == position and min_position is not position
+    position[0] = 10.0
+    assert status.min_position_ball_target == [0.5, 2.0, -0.41]
+    status.reset()
+    assert status.min_position_ball_target is None
+    # the list returned before the reset is left unchanged
+    status.update([0.5, 2.0, -0.42], [1.0, 0.0, 0.0], _ContactInformation(True, 0.0))
+    assert min_position == [0.5, 2.0, -0.41]
+
+    point = hit_point.HitPoint(0.7)
+    position = [0.0, 0.0, 0.1]
+    assert point.update(position, _ContactInformation(False, 1.0)) == [-10, -10, -10]
+    hit_position = point.update(position, _ContactInformation(True, 0.0))
+    assert hit_position == position and hit_position is not position
+    position[2] = 5.0
+    assert point.update(position, _ContactInformation(False, 1.0)) == [0.0, 0.0, 0.1]
+    point.reset()
+    assert point.update(position, _ContactInformation(False, 1.0)) == [-10, -10, -10]
+
+
+def test_compact_ball_status():
+    """
+    Test the native versions of BallStatus and HitPoint
+    (episodes without contact, as context.ContactInformation can
+    not register contacts from python).
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "CompactBallStatus"):
+        pytest.skip("context_wrp not available")
+
+    target = [0.5, 2.0, -0.4]
+    status = ball_status.BallStatus(target)
+    compact = context.CompactBallStatus(target)
+    compact_state = context.CompactBallStatus(target)
+    contact = context.ContactInformation()
+    rng = np.random.default_rng(6)
+    for position, velocity in zip(
+        rng.uniform(-1.0, 1.0, (20, 3)), rng.uniform(-1.0, 1.0, (20, 3))
+    ):
+        position, velocity = position.tolist(), velocity.tolist()
+        status.update(position, velocity, contact)
+        compact.update(position, velocity, contact)
+        compact_state.update(context.State(position, velocity), contact)
+    for instance in (compact, compact_state):
+        assert not instance.contact_occured()
+        assert instance.min_position_ball_target is None
+        for field in _BALL_STATUS_FIELDS:
+            assert getattr(instance, field) == getattr(status, field), field
+
+    hit_point = context.CompactHitPoint(0.7)
+    assert hit_point.update([0.0, 0.0, 0.1], contact) == [-10, -10, -10]
+    assert hit_point.hit_position is None
+
+
+def _bouncing_trajectory(table_height: float) -> bt.StampedTrajectory:
+    """
+    Ball bouncing on the table, hit by the racket (reversing its
+    direction along y), then bouncing again and landing on the floor.
+    """
+    stamps = np.arange(0, 2000000, 10000, dtype=np.uint)
+    t = stamps * 1e-6
+    y = np.where(t < 1.0, -t, t - 2.0)
+    z = table_height + np.abs(np.sin(np.pi * t / 0.5)) * 0.3
+    positions = np.stack((np.zeros(len(t)), y, z), axis=1).astype(np.float32)
+    return stamps, positions
+
+
+def test_detect_events(working_directory: pathlib.Path):
+    """
+    Test the detection of bounces, racket hits and landings.
+    """
+    table_height = 0.76
+    trajectory = _bouncing_trajectory(table_height)
+    packed = bt.pack([(trajectory[0][:10], trajectory[1][:10]), trajectory])
+
+    events = bt.detect_events(packed, table_height=table_height)
+    # no event in the first (short) trajectory
+    assert set(events["trajectory"]) == {1}
+    bounces = events[events["kind"] == bt.EVENT_BOUNCE]
+    assert list(bounces["index"]) == [50, 100, 150]
+    assert list(bounces["time_stamp"]) == [500000, 1000000, 1500000]
+    hits = events[events["kind"] == bt.EVENT_RACKET_HIT]
+    assert list(hits["index"]) == [100]
+    landings = events[events["kind"] == bt.EVENT_LANDING]
+    assert list(landings["index"]) == [150]
+    np.testing.assert_allclose(landings["position"][0], trajectory[1][150])
+
+    # contact flags
+    flags = np.zeros(len(packed[0]), bool)
+    flags[10 + 120 : 10 + 125] = True
+    events = bt.detect_events(packed, flags, table_height)
+    hits = events[events["kind"] == bt.EVENT_RACKET_HIT]
+    assert list(hits["index"]) == [120]
+    landings = events[events["kind"] == bt.EVENT_LANDING]
+    assert list(landings["index"]) == [150]
+
+    # bounces only at the height of the table
+    events = bt.detect_events(packed, table_height=table_height + 1.0)
+    assert not np.any(events["kind"] == bt.EVENT_BOUNCE)
+
+    # events saved in the hdf5 file
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        for packed_layout in (False, True):
+            group = "bouncing_{}".format(packed_layout)
+            rbt.add_stamped_trajectories(group, bt.unpack(packed), packed=packed_layout)
+            assert rbt.add_events(group, table_height) == 5
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        for packed_layout in (False, True):
+            events = rbt.get_events("bouncing_{}".format(packed_layout))
+            assert len(events[0]) == 0
+            assert list(events[1]["index"]) == [50, 100, 100, 150, 150]
+
+
+def test_overwrite_packed(working_directory: pathlib.Path):
+    """
+    Test the overwrite of trajectories, of the same or of a different
+    number of points, keeps the datasets of packed groups (written in
+    place or still resizable) and the events of the group.
+    """
+    table_height = 0.76
+    trajectory = _bouncing_trajectory(table_height)
+    short = (trajectory[0][:10], trajectory[1][:10])
+    trajectories = [trajectory, short, trajectory]
+    groups = ("fixed", "appendable", "legacy")
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_stamped_trajectories("fixed", trajectories, packed=True)
+        rbt.append_stamped_trajectories("appendable", trajectories)
+        rbt.add_stamped_trajectories("legacy", trajectories)
+        for group in groups:
+            rbt.add_events(group, table_height)
+
+    def _offset(group: str) -> int:
+        with h5py.File(hdf5_path, "r") as f:
+            return f[group]["time_stamps"].id.get_offset()
+
+    # same number of points: written in place
+    fixed_offset = _offset("fixed")
+    trajectories[1] = (short[0], short[1] + 1.0)
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        for group in groups:
+            rbt.overwrite(group, 1, trajectories[1])
+    assert _offset("fixed") == fixed_offset
+
+    # different number of points (the last bounce being cut off)
+    trajectories[0] = (trajectory[0][:120], trajectory[1][:120])
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        for group in groups:
+            rbt.overwrite(group, 0, trajectories[0])
+        rbt.add_stamped_trajectories("expected", trajectories, packed=True)
+        rbt.add_events("expected", table_height)
+
+    with bt.RecordedBallTrajectories(path=hdf5_path) as rbt:
+        expected_trajectories = rbt.get_stamped_trajectories("expected", direct=True)
+        expected_events = rbt.get_events("expected")
+        expected_summary = rbt.get_summary("expected")
+        assert list(expected_events[0]["index"]) == [50, 100, 100]
+        for group in groups:
+            stamped_trajectories = rbt.get_stamped_trajectories(group, direct=True)
+            events = rbt.get_events(group)
+            summary = rbt.get_summary(group)
+            for index in range(len(trajectories)):
+                for a, b in zip(
+                    stamped_trajectories[index], expected_trajectories[index]
+                ):
+                    assert np.array_equal(a, b)
+                assert np.array_equal(events[index], expected_events[index])
+                assert summary[index] == expected_summary[index]
+
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        assert rbt.append_stamped_trajectories("appendable", [short]) == 1
+        assert rbt.get_indexes("appendable") == tuple(range(len(trajectories) + 1))
+
+
+def test_pack_group_events(working_directory: pathlib.Path):
+    """
+    Test the events saved per trajectory are kept when packing the group.
+    """
+    table_height = 0.76
+    trajectory = _bouncing_trajectory(table_height)
+    short = (trajectory[0][:10], trajectory[1][:10])
+    trajectories = [trajectory, short, trajectory]
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        for group in ("legacy", "expected"):
+            rbt.add_stamped_trajectories(group, trajectories, packed=group != "legacy")
+            rbt.add_events(group, table_height)
+        expected_events = rbt.get_events("expected")
+        assert rbt.pack_group("legacy") == len(trajectories)
+        assert rbt.is_packed("legacy")
+        events = rbt.get_events("legacy")
+        assert len(events) == len(trajectories)
+        for index in range(len(trajectories)):
+            assert np.array_equal(events[index], expected_events[index])
+        # the events of the packed group are updated on overwrite
+        rbt.overwrite("legacy", 2, short)
+        assert len(rbt.get_events("legacy")[2]) == 0
+        assert np.array_equal(rbt.get_events("legacy")[0], expected_events[0])
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_transform_events(working_directory: pathlib.Path, packed: bool):
+    """
+    Test the transformation of a group updates its events and the
+    table height used for detecting them.
+    """
+    table_height = 0.76
+    translation = (0.5, -1.0, 1.0)
+    trajectory = _bouncing_trajectory(table_height)
+    translated = (trajectory[0], trajectory[1] + np.float32(translation))
+    hdf5_path = working_directory / _HDF5
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.add_stamped_trajectories("group", [trajectory], packed=packed)
+        rbt.add_events("group", table_height)
+        rbt.add_stamped_trajectories("expected", [translated], packed=packed)
+        rbt.add_events("expected", table_height + translation[2])
+        rbt.transform("group", translation=translation)
+        events = rbt.get_events("group")[0]
+        expected_events = rbt.get_events("expected")[0]
+        assert len(events) == 5
+        for field in ("kind", "index", "time_stamp"):
+            assert np.array_equal(events[field], expected_events[field])
+        np.testing.assert_allclose(
+            events["position"], expected_events["position"], atol=1e-6
+        )
+    with h5py.File(hdf5_path, "r") as f:
+        assert f["group"].attrs["events_table_height"] == pytest.approx(
+            table_height + translation[2]
+        )
+
+    # the table is no longer horizontal
+    with bt.MutableRecordedBallTrajectories(path=hdf5_path) as rbt:
+        rbt.transform("group", alpha=0.1)
+    with h5py.File(hdf5_path, "r") as f:
+        assert "events_table_height" not in f["group"].attrs
+
+
+def test_numpy_views():
+    """
+    Test the coordinates of State, StampedCoordinates and ContactInformation
+    (lists, and numpy views under the names suffixed with "_array"), and
+    the structured arrays conversions.
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "states_to_array"):
+        pytest.skip("context_wrp not available")
+
+    # lists (copies of the coordinates)
+    state = context.State([1.0, 2.0, 3.0], [4.0, 5.0, 6.0])
+    position = state.position
+    assert isinstance(position, list)
+    assert position == [1.0, 2.0, 3.0]
+    position[0] = 10.0
+    assert state.position == [1.0, 2.0, 3.0]
+    state.position = [10.0, 2.0, 3.0]
+    assert state.position == [10.0, 2.0, 3.0]
+    assert state.velocity == [4.0, 5.0, 6.0]
+
+    # views: in place writes update the state, and
+    # updates of the state are visible from the view
+    position = state.position_array
+    assert isinstance(position, np.ndarray)
+    position[0] = 11.0
+    state.velocity_array[:] = 0.0
+    assert state.position == [11.0, 2.0, 3.0]
+    assert state.velocity == [0.0, 0.0, 0.0]
+    state.set_position(7.0, 8.0, 9.0)
+    assert list(position) == [7.0, 8.0, 9.0]
+    state.position_array = [1.0, 1.0, 1.0]
+    assert list(position) == [1.0, 1.0, 1.0]
+
+    contact = context.ContactInformation()
+    assert contact.position == [0.0, 0.0, 0.0]
+    assert list(contact.position_array) == [0.0, 0.0, 0.0]
+    with pytest.raises(ValueError):
+        contact.position_array[0] = 1.0
+
+    states = [state, context.State([0.1, 0.2, 0.3], [0.4, 0.5, 0.6])]
+    array = context.states_to_array(states)
+    assert array.dtype.names == ("position", "velocity")
+    np.testing.assert_array_equal(array["velocity"][1], [0.4, 0.5, 0.6])
+    converted = context.states_from_array(array)
+    assert [s.position for s in converted] == [s.position for s in states]
+
+    stamped = context.StampedCoordinates()
+    stamped.stamp = 12
+    stamped.coordinates = [1.0, 2.0, 0.0]
+    stamped.coordinates_array[2] = 3.0
+    assert stamped.coordinates == [1.0, 2.0, 3.0]
+    array = context.stamped_coordinates_to_array([stamped, stamped])
+    assert list(array["stamp"]) == [12, 12]
+    converted = context.stamped_coordinates_from_array(array)
+    assert converted[1].stamp == 12
+    assert converted[1].coordinates == [1.0, 2.0, 3.0]
+
+
+def _shared_trajectories_size(hdf5_path: pathlib.Path) -> int:
+    """
+    Loads the tennicam group in shared memory
+    (in a process other than the test process)
+    """
+    with bt.BallTrajectories(_TENNICAM_GROUP, hdf5_path, shared=True) as trajectories:
+        return trajectories.size()
+
+
+def test_shared_ball_trajectories(loaded_hdf5: pathlib.Path):
+    """
+    Test BallTrajectories in shared mode, i.e. hosting the
+    trajectories in shared memory.
+    """
+
+    ref = bt.BallTrajectories(_TENNICAM_GROUP, loaded_hdf5)
+
+    first = bt.BallTrajectories(_TENNICAM_GROUP, loaded_hdf5, shared=True)
+    second = bt.SharedTrajectories(_TENNICAM_GROUP, loaded_hdf5)
+    assert second.attached
+    assert first.size() == ref.size()
+    for index in range(ref.size()):
+        stamps, positions = first.get_trajectory(index)
+        assert np.array_equal(stamps, ref.get_trajectory(index)[0])
+        assert np.array_equal(positions, ref.get_trajectory(index)[1])
+        assert not positions.flags.writeable
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        assert (
+            executor.submit(_shared_trajectories_size, loaded_hdf5).result()
+            == ref.size()
+        )
+
+    first.close()
+    packed = bt.pack([ref.get_trajectory(index) for index in range(ref.size())])
+    for array, ref_array in zip(second.get(), packed):
+        assert np.array_equal(array, ref_array)
+    second.close()
+
+    # last user closed: the shared memory has been released
+    third = bt.SharedTrajectories(_TENNICAM_GROUP, loaded_hdf5)
+    assert not third.attached
+    third.close()
+    lock_path = bt.SharedTrajectories._lock_path(
+        bt.SharedTrajectories._name(_TENNICAM_GROUP, loaded_hdf5.resolve())
+    )
+    assert not lock_path.exists()
+
+    # users which exited without closing are ignored
+    code = (
+        "import os; from context import ball_trajectories as bt; "
+        "shared = bt.SharedTrajectories({!r}, {!r}); os._exit(0)"
+    ).format(_TENNICAM_GROUP, str(loaded_hdf5))
+    subprocess.run([sys.executable, "-c", code], check=True)
+    fourth = bt.SharedTrajectories(_TENNICAM_GROUP, loaded_hdf5)
+    assert fourth.attached
+    fourth.close()
+    fifth = bt.SharedTrajectories(_TENNICAM_GROUP, loaded_hdf5)
+    assert not fifth.attached
+    fifth.close()
+
+    # the indexes of the group are kept
+    with h5py.File(loaded_hdf5, "r+") as f:
+        del f[_TENNICAM_GROUP]["0"]
+    ref = bt.BallTrajectories(_TENNICAM_GROUP, loaded_hdf5)
+    with bt.BallTrajectories(_TENNICAM_GROUP, loaded_hdf5, shared=True) as shared:
+        assert shared.size() == ref.size()
+        assert list(shared.get_all_trajectories()) == list(ref.get_all_trajectories())
+        for index in ref.get_all_trajectories():
+            stamps, positions = shared.get_trajectory(index)
+            assert np.array_equal(stamps, ref.get_trajectory(index)[0])
+            assert np.array_equal(positions, ref.get_trajectory(index)[1])
+        with pytest.raises(KeyError):
+            shared.get_trajectory(0)
+
+    with pytest.raises(ValueError):
+        bt.BallTrajectories(_TENNICAM_GROUP, loaded_hdf5, lazy=True, shared=True)
+
+
+def test_stamped_trajectory_chunk():
+    """
+    Test StampedTrajectoryChunk is filled from numpy arrays and exposes
+    its content as numpy views.
+    """
+    context = pytest.importorskip("context")
+    if not hasattr(context, "StampedTrajectoryChunk"):
+        pytest.skip("context_wrp not available")
+
+    capacity = context.StampedTrajectoryChunk.capacity
+    size = capacity + 5
+    stamps = np.arange(size, dtype=np.uint64) * 1000
+    positions = np.random.rand(size, 3).astype(np.float32)
+    velocities = np.random.rand(size, 3)
+
+    chunk = context.StampedTrajectoryChunk()
+    assert len(chunk) == 0
+    assert chunk.velocities is None
+    assert chunk.fill(stamps, positions) == capacity
+    assert chunk.full()
+    assert chunk.velocities is None
+    np.testing.assert_array_equal(chunk.stamps, stamps[:capacity])
+    np.testing.assert_array_equal(chunk.positions, positions[:capacity])
+
+    assert chunk.fill(stamps[:10], positions[:10], velocities[:10]) == 10
+    assert chunk.size() == 10
+    assert chunk.has_velocities()
+    np.testing.assert_array_equal(chunk.velocities, velocities[:10])
+    assert list(chunk.position(9)) == list(positions[9].astype(float))
+
+    # views over the chunk content
+    chunk.positions[0] = (1.0, 2.0, 3.0)
+    assert list(chunk.position(0)) == [1.0, 2.0, 3.0]
+
+    chunk.clear()
+    assert chunk.push_back(5, [0.0, 0.0, 1.0])
+    assert list(chunk.stamps) == [5]
+    for index in (-1, 1, capacity):
+        for accessor in (chunk.stamp, chunk.position, chunk.velocity):
+            with pytest.raises(IndexError):
+                accessor(index)
+
+    with pytest.raises(ValueError):
+        chunk.fill(stamps[:10], positions[:5])
+
+
+def test_profile(working_directory: pathlib.Path):
+    """
+    Test the profiling of the reading and writing of trajectories.
+    """
+    hdf5_file = working_directory / _HDF5
+
+    # disabled by default
+    with bt.MutableRecordedBallTrajectories(path=hdf5_file) as rbt:
+        rbt.add_json_trajectories(_JSON_GROUP, working_directory, _SAMPLING_RATE)
+        assert rbt.profile_stats().stages == {}
+
+    with bt.MutableRecordedBallTrajectories(path=hdf5_file, profile=True) as rbt:
+        rbt.add_tennicam_trajectories(_TENNICAM_GROUP, working_directory, packed=True)
+        stats = rbt.profile_stats().stages
+    assert set(stats) == {"open", "list_files", "parse", "convert", "write"}
+    assert stats["parse"].trajectories == _NB_TENNICAMS
+    assert stats["parse"].bytes_read == sum(
+        (working_directory / f).stat().st_size for f in _TENNICAM_FILES
+    )
+    assert stats["write"].trajectories == _NB_TENNICAMS
+    assert stats["write"].bytes_written > 0
+    assert all(s.calls == 1 and s.time_s >= 0.0 for s in stats.values())
+
+    # a profiler shared by several instances
+    profiler = bt.Profiler()
+    for group in (_JSON_GROUP, _TENNICAM_GROUP):
+        bt.BallTrajectories(group, hdf5_file, profile=profiler)
+    stats = profiler.stats().stages
+    assert stats["open"].calls == 2
+    assert stats["read"].trajectories == _NB_JSONS + _NB_TENNICAMS
+    nb_points = sum(
+        len(stamps)
+        for group in (_JSON_GROUP, _TENNICAM_GROUP)
+        for stamps, _ in bt.BallTrajectories(group, hdf5_file)
+        .get_all_trajectories()
+        .values()
+    )
+    # (uint64 time stamps and float32 positions)
+    assert stats["read"].bytes_read >= nb_points * (8 + 3 * 4)
+    assert "read" in profiler.stats().report()
+
+    with bt.BallTrajectories(_TENNICAM_GROUP, hdf5_file, lazy=True, profile=True) as b:
+        b.get_trajectory(0)
+        b.get_trajectory(0)
+        # cached: read once
+        assert b.profile_stats().stages["read"].trajectories == 1
+
+
+# modules which should not be loaded by importing context
+# (or context.ball_trajectories)
+_DEFERRED_MODULES = (
+    "h5py",
+    "o80",
+    "nptyping",
+    "pam_configuration",
+    "tennicam_client",
+    "context_wrp",
+)
+
+
+def _imported_modules(statement: str) -> typing.List[str]:
+    """
+    Runs the (import) statement in a new python process, returns
+    the modules in _DEFERRED_MODULES or numpy it loaded.
+    """
+    code = "\n".join(
+        [
+            "import sys",
+            statement,
+            "print(' '.join(m for m in {!r} if m in sys.modules))".format(
+                _DEFERRED_MODULES + ("numpy",)
+            ),
+        ]
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return output.split()
+
+
+def _import_duration(statement: str, repeat: int = 5) -> float:
+    """
+    Runs the (import) statement in new python processes, returns
+    the best (over repeat runs) duration of the statement (seconds,
+    python startup excluded).
+    """
+    code = "\n".join(
+        [
+            "import time",
+            "start = time.perf_counter()",
+            statement,
+            "print(time.perf_counter() - start)",
+        ]
+    )
+    return min(
+        float(
+            subprocess.run(
+                [sys.executable, "-c", code],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+        )
+        for _ in range(repeat)
+    )
+
+
+def test_deferred_imports():
+    """
+    Test heavy dependencies are imported only when used.
+    """
+    statement = "import context; context.BallStatus; context.HitPoint"
+    assert _imported_modules(statement) == []
+    # ~15ms (~170ms when numpy, h5py, ... were imported eagerly), the
+    # budget being generous to not depend on the load of the machine
+    assert _import_duration(statement) < 0.1
+    assert _imported_modules("import context.ball_trajectories") == ["numpy"]
+    # loaded on first access
+    assert _imported_modules(
+        "import context.ball_trajectories as bt; bt.StampedTrajectory"
+    ) == ["nptyping", "numpy"]
+
+
+def test_star_import():
+    """
+    Test "from context import *" imports the lazily exported names.
+    """
+    namespace: typing.Dict[str, typing.Any] = {}
+    exec("from context import *", namespace)
+    import context
+
+    for name in ("BallStatus", "HitPoint", "BallTrajectories"):
+        assert name in context.__all__
+        assert name in dir(context)
+        assert namespace[name] is getattr(context, name)
+    if hasattr(context, "Ball"):
+        assert "Ball" in context.__all__
+        assert namespace["Ball"] is context.Ball
+
+
+def _fake_observations(
+    nb_throws: int, nb_points: int
+) -> typing.Tuple[typing.List[typing.Tuple], typing.List[bt.Trajectory]]:
+    """
+    Returns the observations (ball id, nanoseconds time stamp, position)
+    of a fake tennicam producer (200Hz): throws separated by periods
+    without ball (negative ball id), one of them containing a throw
+    too short to be recorded, along with the positions of the throws.
+    """
+    observations = []
+    throws = []
+    time_stamp = 10**15
+    for throw in range(nb_throws):
+        positions = np.zeros((nb_points, 3), np.float32)
+        positions[:, 0] = throw
+        positions[:, 1] = np.arange(nb_points) * 0.01
+        throws.append(positions)
+        for position in positions:
+            observations.append((1, time_stamp, list(position), [0.0, 0.0, 0.0]))
+            time_stamp += 5000000
+        for index in range(100):
+            ball_id = 1 if throw == 0 and 40 <= index < 43 else -1
+            observations.append((ball_id, time_stamp, [0.0, 0.0, 0.0]))
+            time_stamp += 5000000
+    return observations, throws
+
+
+def test_streaming_recorder(working_directory: pathlib.Path):
+    """
+    Test the recording of observations (segmented into throws)
+    streamed from a queue or a callable.
+    """
+    hdf5_file = working_directory / _HDF5
+    group = "stream"
+    observations, throws = _fake_observations(3, 30)
+
+    source: queue.Queue = queue.Queue()
+    with bt.StreamingRecorder(group, source, hdf5_file, batch_size=2) as recorder:
+        for observation in observations:
+            source.put(observation)
+        while not source.empty():
+            time.sleep(0.01)
+    assert recorder.nb_throws() == 3
+    assert recorder.nb_written() == 3
+
+    # appending to the same group, from a callable
+    iterator = iter(observations)
+    with bt.StreamingRecorder(
+        group, lambda: next(iterator, None), hdf5_file, flush_period_s=0.01
+    ) as recorder:
+        # throws ended by the absence of observations
+        # (wall clock) before stop
+        start = time.monotonic()
+        while recorder.nb_written() < 3 and time.monotonic() - start < 5.0:
+            time.sleep(0.01)
+        assert recorder.nb_written() == 3
+
+    with bt.RecordedBallTrajectories(hdf5_file) as rbt:
+        assert rbt.is_packed(group)
+        assert rbt.get_indexes(group) == tuple(range(6))
+        summaries = rbt.get_summary(group)
+        for index, expected in enumerate(throws + throws):
+            stamps, positions = rbt.get_stamped_trajectory(group, index)
+            np.testing.assert_array_equal(positions, expected)
+            assert list(stamps) == [i * 5000 for i in range(30)]
+            assert summaries[index].nb_points == 30
+
+    # file kept open by a reader: the throws are written once it is closed
+    source = queue.Queue()
+    with bt.StreamingRecorder(
+        group, source, hdf5_file, flush_period_s=0.01
+    ) as recorder:
+        reader = h5py.File(hdf5_file, "r")
+        for observation in observations:
+            source.put(observation)
+        start = time.monotonic()
+        while recorder.nb_throws() < 3 and time.monotonic() - start < 5.0:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        assert recorder.nb_written() == 0
+        reader.close()
+        while recorder.nb_written() < 3 and time.monotonic() - start < 5.0:
+            time.sleep(0.01)
+    assert recorder.nb_written() == 3
+    with bt.RecordedBallTrajectories(hdf5_file) as rbt:
+        assert rbt.get_indexes(group) == tuple(range(9))
+
+    # legacy groups can be appended to, packed groups of fixed size can not
+    with bt.MutableRecordedBallTrajectories(hdf5_file) as rbt:
+        rbt.add_stamped_trajectories("legacy", [(stamps, positions)])
+        rbt.add_stamped_trajectories("packed", [(stamps, positions)], packed=True)
+        assert rbt.append_stamped_trajectories("legacy", [(stamps, positions)]) == 1
+        assert rbt.get_indexes("legacy") == (0, 1)
+        with pytest.raises(ValueError):
+            rbt.append_stamped_trajectories("packed", [(stamps, positions)])
+    with pytest.raises(ValueError):
+        bt.StreamingRecorder("packed", queue.Queue(), hdf5_file).start()